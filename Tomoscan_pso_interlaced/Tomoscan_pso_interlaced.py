@@ -1,9 +1,10 @@
 import numpy as np
 import math
 import struct
-import matplotlib.pyplot as plt
 import argparse
 
+from interlaced.quantization_error import analyze_quantization
+
 
 # ============================================================================
 #                     CLASSE INTERLACED SCAN
@@ -52,6 +53,7 @@ class InterlacedScan:
     # ----------------------------------------------------------------------
     def generate_interlaced_timbir(self):
 
+        import matplotlib.pyplot as plt
         bits = int(np.log2(self.K_interlace))
         theta = []
         group_indices = []
@@ -201,34 +203,38 @@ class InterlacedScan:
     # ----------------------------------------------------------------------
     # Converte angoli = impulsi
     # ----------------------------------------------------------------------
-    def convert_angles_to_counts(self):
+    def convert_angles_to_counts(self, max_rows=10):
+        """
+        Calcola gli impulsi ideali/taxi e stampa il riepilogo dell'errore di
+        quantizzazione (angoli ordinati e unwrapped). Vengono stampate al
+        massimo ``max_rows`` righe campione per tabella.
+        """
 
         pulses_per_degree = self.PSOCountsPerRotation / 360.0
 
-        self.PSOCountsIdeal = np.round(self.theta_interlaced * pulses_per_degree).astype(int)
+        self.PSOCountsIdeal = np.round(self.theta_interlaced * pulses_per_degree).astype(np.int64)
         self.PSOCountsTaxiCorrected = self.theta_real * pulses_per_degree
 
         self.PSOCountsFinal = self.PSOCountsTaxiCorrected.copy()
 
-        pulse_counts = np.round(self.theta_interlaced / 360.0 * self.PSOCountsPerRotation).astype(int)
-        actual_angles = pulse_counts / pulses_per_degree
-        angular_error = actual_angles - self.theta_interlaced
-
-        for a, p, act, err in zip(self.theta_interlaced, pulse_counts, actual_angles, angular_error):
-            print(f"Target: {a:8.2f} deg | Pulse: {p:6d} | Actual: {act:9.6f} deg | Error: {err:+.6f} deg")
+        self.quantization_report = analyze_quantization(
+            self.theta_interlaced, self.PSOCountsPerRotation, n_samples=max_rows)
+        print(self.quantization_report.summary())
+        print(self.quantization_report.format_rows())
 
         print('********************* unwrapped angles *********************')
-        pulse_counts = np.round(self.theta_interlaced_unwrapped / 360.0 * self.PSOCountsPerRotation).astype(int)
-        actual_angles = pulse_counts / pulses_per_degree
-        angular_error = actual_angles - self.theta_interlaced_unwrapped
-
-        for a, p, act, err in zip(self.theta_interlaced_unwrapped, pulse_counts, actual_angles, angular_error):
-            print(f"Target: {a:8.2f} deg | Pulse: {p:6d} | Actual: {act:9.6f} deg | Error: {err:+.6f} deg")
+        loops = np.floor(self.theta_interlaced_unwrapped / 360.0).astype(int)
+        self.quantization_report_unwrapped = analyze_quantization(
+            self.theta_interlaced_unwrapped, self.PSOCountsPerRotation,
+            loops=loops - loops.min(), n_samples=max_rows)
+        print(self.quantization_report_unwrapped.summary())
+        print(self.quantization_report_unwrapped.format_rows())
 
     # Plot comparativi
     # ----------------------------------------------------------------------
     def plot_all_comparisons(self):
 
+        import matplotlib.pyplot as plt
         ideal = self.PSOCountsIdeal
         real = self.PSOCountsTaxiCorrected
         final = self.PSOCountsFinal
@@ -257,9 +263,10 @@ class InterlacedScan:
         plt.show()
 
     def plot(self):
+        import matplotlib.pyplot as plt
         x1 = self.theta_interlaced
         x2 = self.theta_interlaced_unwrapped
-        pulse_counts = np.round(self.theta_interlaced_unwrapped / 360.0 * self.PSOCountsPerRotation).astype(int)
+        pulse_counts = np.round(self.theta_interlaced_unwrapped / 360.0 * self.PSOCountsPerRotation).astype(np.int64)
         y = pulse_counts
 
         fig, axs = plt.subplots(2, 1, figsize=(10, 8), sharey=True)
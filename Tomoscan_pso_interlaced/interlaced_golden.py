@@ -11,9 +11,10 @@ creando una nuova serie di angoli distribuiti uniformemente
 '''
 
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
 
+from interlaced.quantization_error import analyze_quantization
+
 PSOCountsPerRotation = 200  # numero di impulsi per rotaz completa
 # -----------------------------------
 # angoli interlacciati
@@ -86,6 +87,7 @@ def print_cumulative_angles_table(angles_all):
 # Plot tipo Timbir
 # -----------------------------------
 def plot_interlaced_circles(angles_all):
+    import matplotlib.pyplot as plt
     K_interlace = len(angles_all)
     plt.figure(figsize=(8, 8))
     ax = plt.subplot(111, polar=True)
@@ -104,27 +106,28 @@ def plot_interlaced_circles(angles_all):
 # -----------------------------------
 # conversione angoli in pulsazioni
 # -----------------------------------
-def convert_angles_to_pulses(angles_all, description=""):
-    pulses_per_degree = PSOCountsPerRotation / 360.0
-    pulses_loops = []
+def convert_angles_to_pulses(angles_all, description="", max_rows=10):
+    """
+    Converte gli angoli di ogni loop in impulsi e stampa il riepilogo
+    dell'errore (globale e per loop) con al massimo ``max_rows`` righe.
+    """
+    lengths = [len(angles) for angles in angles_all]
+    report = analyze_quantization(np.concatenate(angles_all), PSOCountsPerRotation,
+                                  loops=np.repeat(np.arange(len(angles_all)), lengths),
+                                  n_samples=max_rows)
+
     print(f"\n--- Conversione in pulsazioni: {description} ---")
-    for loop_idx, angles in enumerate(angles_all):
-        pulse_counts = np.round(angles * pulses_per_degree).astype(int)
-        pulses_loops.append(pulse_counts)
-        actual_angles = pulse_counts / pulses_per_degree
-        angular_error = actual_angles - angles
-
-        print(f"\nLoop {loop_idx + 1}:")
-        print(f"{'Target [deg]':>12} | {'Pulse':>5} | {'Actual [deg]':>12} | {'Error [deg]':>12}")
-        print("-" * 50)
-        for a, p, act, err in zip(angles, pulse_counts, actual_angles, angular_error):
-            print(f"{a:12.3f} | {p:5d} | {act:12.6f} | {err:12.6f}")
+    print(report.summary())
+    print(report.format_rows())
+
+    pulses_loops = np.split(report.pulses, np.cumsum(lengths)[:-1])
     return pulses_loops
 
 # -----------------------------------
 # Plot angoli vs pulsazioni
 # -----------------------------------
 def plot_angles_vs_pulses(angles_all, pulses_all, title="Angles vs Pulses"):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     for k, (angles, pulses) in enumerate(zip(angles_all, pulses_all)):
         plt.plot(angles, pulses, 'o-', label=f'Loop {k + 1}')
@@ -139,6 +142,7 @@ def plot_angles_vs_pulses(angles_all, pulses_all, title="Angles vs Pulses"):
 # Plot combinato cumulativo angoli vs pulsazioni
 # -----------------------------------
 def plot_combined_cumulative(angles_cumulative, pulses_cumulative):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     for k, (angles, pulses) in enumerate(zip(angles_cumulative, pulses_cumulative)):
         plt.plot(angles, pulses, 'o-', label=f'Loop {k + 1}')
@@ -1,6 +1,5 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
 
 # ============================================================================#
 #                     CLASSE INTERLACED SCAN
@@ -112,12 +111,13 @@ class InterlacedScan:
     def convert_angles_to_counts(self):
      
         pulses_per_degree = self.PSOCountsPerRotation / 360.0
-        self.PSOCountsIdeal = np.round(self.theta_interlaced * pulses_per_degree).astype(int)
+        self.PSOCountsIdeal = np.round(self.theta_interlaced * pulses_per_degree).astype(np.int64)
         self.PSOCountsTaxiCorrected = self.theta_real * pulses_per_degree
         self.PSOCountsFinal = self.PSOCountsTaxiCorrected.copy()
 
     def plot_all_comparisons(self):
       
+        import matplotlib.pyplot as plt
         ideal = self.PSOCountsIdeal
         real = self.PSOCountsTaxiCorrected
         final = self.PSOCountsFinal
@@ -147,9 +147,10 @@ class InterlacedScan:
 
     def plot(self):
         """Grafico finale"""
+        import matplotlib.pyplot as plt
         x1 = self.theta_interlaced
         x2 = self.theta_interlaced_unwrapped
-        pulse_counts = np.round(self.theta_interlaced_unwrapped / 360.0 * self.PSOCountsPerRotation).astype(int)
+        pulse_counts = np.round(self.theta_interlaced_unwrapped / 360.0 * self.PSOCountsPerRotation).astype(np.int64)
         y = pulse_counts
 
         fig, axs = plt.subplots(2, 1, figsize=(10, 8), sharey=True)
@@ -0,0 +1,94 @@
+"""
+Pianificazione delle scansioni interlacciate (TIMBIR) per 2-BM.
+
+Il nucleo di pianificazione (scan, quantizer, fpga_table, plan_export,
+quantization_error) dipende solo da NumPy. matplotlib, h5py e pyepics
+vengono importati solo al primo uso (grafici, HDF5, PV reali).
+
+Anche i sottomoduli sono caricati su richiesta: ``import interlaced``
+non importa nulla, ``interlaced.InterlacedScan`` carica solo ``scan``.
+
+    from interlaced import InterlacedScan
+    scan = InterlacedScan(N_theta=1024, K=4).compute()
+"""
+
+import importlib
+
+# nome pubblico -> sottomodulo che lo definisce
+_EXPORTS = {
+    "InterlacedScan": "scan",
+    "quantize_plan": "quantizer",
+    "max_angles": "quantizer",
+    "WRAP_MARKER": "fpga_table",
+    "to_counts": "fpga_table",
+    "encode_fpga_table": "fpga_table",
+    "decode_fpga_table": "fpga_table",
+    "write_fpga_table": "fpga_table",
+    "read_fpga_table": "fpga_table",
+    "export_plan": "plan_export",
+    "QuantizationReport": "quantization_error",
+    "analyze_quantization": "quantization_error",
+    "timbir_angles": "timbir",
+    "taxi_correct": "timbir",
+    "SCAN_PARAMETERS": "pv_access",
+    "read_pvs": "pv_access",
+    "read_scan_parameters": "pv_access",
+    "FakePVServer": "pv_access",
+    "PVPool": "pv_pool",
+    "MotorSnapshot": "pv_pool",
+    "default_pool": "pv_pool",
+    "program_pso": "pso",
+    "query_counts_per_rotation": "pso",
+    "cached_counts_per_rotation": "pso",
+    "refresh_counts_per_rotation": "pso",
+    "ControllerCache": "controller_cache",
+    "PlanScheduler": "scheduler",
+    "StageProfiler": "profiling",
+    "RingBuffer": "encoder_monitor",
+    "EncoderMonitor": "encoder_monitor",
+    "DriftTracker": "encoder_monitor",
+    "SyntheticEncoderPV": "encoder_monitor",
+    "ScanOrchestrator": "orchestrator",
+    "tomoscan_steps": "orchestrator",
+    "PSOSimulator": "pso_simulator",
+    "PolarBlur": "blur",
+    "rotation_blur": "blur",
+    "SinogramBlur": "blur",
+    "base_sinogram": "blur",
+    "motion_windows": "blur",
+    "system_matrix": "radon",
+    "project": "radon",
+    "project_plans": "radon",
+    "project_angles": "radon",
+    "ProjectionCache": "radon",
+    "Backprojector": "backprojection",
+    "backproject": "backprojection",
+    "FBP": "fbp",
+    "fbp": "fbp",
+    "sirt": "iterative",
+    "cgls": "iterative",
+    "WarmStartReconstructor": "iterative",
+    "StreamingReconstructor": "streaming",
+    "timbir_sequence": "streaming",
+    "SimulationPipeline": "interactive",
+    "BackgroundWorker": "interactive",
+    "phantom_volume": "volume",
+    "simulate_volume": "volume",
+    "allocate": "volume",
+    "open_volume": "volume",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value      # le chiamate successive non passano piu' di qui
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,147 @@
+"""
+Retroproiezione vettorizzata a blocchi di angoli.
+
+La ``simple_backprojection`` degli script showblur ricalcolava cos/sin e
+gli indici interi su tutta la meshgrid per ogni angolo, in un ciclo
+Python, con lookup al vicino piu' prossimo. Qui:
+
+- tabelle cos/sin e coordinate precalcolate una volta per (size, angoli);
+- t = x cos + y sin calcolato per un blocco di angoli in broadcast
+  (colonne e righe separate: una somma esterna invece di due prodotti
+  sull'immagine intera), con interpolazione lineare fra i bin;
+- blocchi limitati in memoria (``max_block_bytes``) ed eseguiti su un
+  pool di thread: NumPy rilascia il GIL nelle operazioni vettoriali, i
+  parziali dei blocchi si sommano alla fine.
+
+Stessa geometria di interlaced.radon (centro (size - 1) / 2), di cui e'
+l'aggiunto a meno del peso per angolo.
+
+    recon = backproject(sino, angles)          # media sugli angoli
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+MAX_BLOCK_BYTES = 1 << 20        # temporanei di un blocco: restano in cache
+_TEMPORARIES = 4                 # array (angoli, righe, size) vivi insieme
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool di thread condiviso per i calcoli (separato da quello dei PV)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="compute")
+        return _pool
+
+
+class Backprojector:
+    """
+    Retroproiettore per immagini (size, size) da sinogrammi (n_angoli, n_det).
+
+    Parametri:
+        size            : lato dell'immagine ricostruita
+        angles          : angoli delle righe del sinogramma [deg]
+        n_det           : bin del rivelatore (default size)
+        max_block_bytes : memoria massima dei temporanei di un blocco
+                          (righe x angoli); blocchi piccoli restano in cache
+        threads         : fasce di righe in parallelo sul pool (default: tutti i core)
+        dtype           : tipo dei calcoli (float32 dimezza memoria e banda)
+    """
+
+    def __init__(self, size, angles, n_det=None, max_block_bytes=MAX_BLOCK_BYTES,
+                 threads=None, dtype=np.float32):
+        self.size = int(size)
+        self.n_det = self.size if n_det is None else int(n_det)
+        self.angles = np.asarray(angles, dtype=np.float64).ravel()
+        self.dtype = np.dtype(dtype)
+        self.threads = threads or os.cpu_count() or 1
+
+        theta = np.deg2rad(self.angles)
+        self.cos = np.cos(theta).astype(self.dtype)
+        self.sin = np.sin(theta).astype(self.dtype)
+        c = (self.size - 1) / 2.0
+        self.coord = (np.arange(self.size) - c).astype(self.dtype)
+
+        # sinogramma allargato con zeri fino alla diagonale dell'immagine:
+        # ogni pixel cade dentro, niente clip ne' maschere
+        self.pad = int(np.ceil(max(0.0, (self.size - 1) * np.sqrt(2) - (self.n_det - 1)) / 2)) + 2
+        self.width = self.n_det + 2 * self.pad
+        self.offset = (self.n_det - 1) / 2.0 + self.pad
+        self.row_offset = np.arange(len(self.angles), dtype=np.int64) * self.width
+
+        # blocco = (angoli, righe, size) entro max_block_bytes
+        pairs = max(1, max_block_bytes // (_TEMPORARIES * self.size * self.dtype.itemsize))
+        self.block = int(max(1, min(len(self.angles), pairs)))      # angoli per blocco
+        self.rows = int(max(1, min(self.size, pairs // self.block)))  # righe per blocco
+
+    def __call__(self, sino, weights=None):
+        """
+        Somma sugli angoli di ``weights[a]`` * retroproiezione della riga a
+        (default: 1 / n_angoli, la media sugli angoli). Accetta anche
+        una pila (..., n_angoli, n_det) -> (..., size, size).
+        """
+        sino = np.asarray(sino)
+        n_angles = len(self.angles)
+        if sino.shape[-2:] != (n_angles, self.n_det):
+            raise ValueError(f"Sinogramma {sino.shape[-2:]} invece di ({n_angles}, {self.n_det})")
+        if weights is None:
+            weights = np.full(n_angles, 1.0 / max(n_angles, 1))
+        weights = np.broadcast_to(np.asarray(weights, dtype=self.dtype), (n_angles,))
+        if sino.ndim > 2:
+            lead = sino.shape[:-2]
+            out = [self(s, weights) for s in sino.reshape((-1,) + sino.shape[-2:])]
+            return np.stack(out).reshape(lead + (self.size, self.size))
+
+        # valori e differenze verso il bin successivo, gia' pesati per angolo:
+        # v = value[j] + frazione * delta[j]
+        value = np.zeros((n_angles, self.width), dtype=self.dtype)
+        value[:, self.pad:self.pad + self.n_det] = sino
+        value *= weights[:, None]
+        delta = np.zeros_like(value)
+        delta[:, :-1] = np.diff(value, axis=1)
+        value, delta = value.ravel(), delta.ravel()
+
+        recon = np.empty((self.size, self.size), dtype=self.dtype)
+        # ogni fascia di righe scrive solo le sue: nessuna riduzione fra thread
+        n_bands = min(self.threads, -(-self.size // self.rows))
+        bounds = np.linspace(0, self.size, n_bands + 1).astype(int)
+        bands = [slice(r0, r1) for r0, r1 in zip(bounds[:-1], bounds[1:])]
+        run = lambda band: self._band(value, delta, recon, band)
+        if n_bands > 1:
+            list(_get_pool().map(run, bands))
+        else:
+            run(bands[0])
+        return recon
+
+    def _band(self, value, delta, recon, band):
+        recon[band] = 0
+        for r0 in range(band.start, band.stop, self.rows):
+            rows = slice(r0, min(r0 + self.rows, band.stop))
+            y = self.coord[rows]
+            for a0 in range(0, len(self.angles), self.block):
+                a = slice(a0, a0 + self.block)
+                # t[a, riga, colonna] = x cos + y sin, come somma esterna
+                t = (y[None, :] * self.sin[a, None] + self.offset)[:, :, None] \
+                    + (self.coord[None, :] * self.cos[a, None])[:, None, :]
+                j = t.astype(np.intp)
+                t -= j                           # frazione verso il bin successivo
+                j += self.row_offset[a, None, None]
+                v = value.take(j)
+                t *= delta.take(j)
+                v += t
+                recon[rows] += v.sum(axis=0)
+
+
+def backproject(sino, angles, size=None, weights=None, **kwargs):
+    """Retroproiezione lineare di ``sino`` (n_angoli, n_det) su (size, size), size = n_det."""
+    sino = np.asarray(sino)
+    n_det = sino.shape[-1]
+    return Backprojector(size or n_det, angles, n_det, **kwargs)(sino, weights)
@@ -0,0 +1,143 @@
+"""
+Cache persistente dei metadati del controller PSO.
+
+A ogni avvio TomoScanPSO manda UNITSTOCOUNTS(asse, 360.0) su
+PSOCommand.BOUT (timeout 10 s) e aspetta la risposta su BINP, ma i counts
+per giro di un asse non cambiano fra una sessione e l'altra. Qui il
+valore viene salvato su disco con chiave (modello, asse):
+
+- all'avvio si usa il valore in cache, senza round-trip sincrono;
+- a programmazione finita un thread in background ripete la richiesta e
+  aggiorna solo la cache; se il controller risponde diversamente la voce
+  viene invalidata e la prossima programmazione rifa' la richiesta
+  sincrona;
+- ``invalidate`` cancella una voce o tutta la cache (es. dopo un cambio
+  di encoder o di configurazione del controller).
+
+Il file e' un JSON scritto in modo atomico (mkstemp + os.replace), di
+default in $XDG_CACHE_HOME/interlaced/controller.json.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .paths import cache_dir
+
+log = logging.getLogger(__name__)
+
+
+CACHE_VERSION = 1
+CACHE_FILE = "controller.json"
+
+
+def default_cache_path():
+    return cache_dir(CACHE_FILE)
+
+
+def cache_key(model, axis):
+    return f"{model}/{axis}"
+
+
+class ControllerCache:
+    """Metadati per (modello, asse), es. {"counts_per_rev": 11840200.0}."""
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.refresh_thread = None
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # lettura / scrittura
+    # ------------------------------------------------------------------
+    def get(self, model, axis, max_age=None):
+        """Voce in cache, oppure None se assente o piu' vecchia di ``max_age`` [s]."""
+        with self._lock:
+            entry = self._read().get(cache_key(model, axis))
+        if entry is None:
+            return None
+        if max_age is not None and time.time() - entry["timestamp"] > max_age:
+            return None
+        return entry
+
+    def put(self, model, axis, **metadata):
+        with self._lock:
+            entries = self._read()
+            entries[cache_key(model, axis)] = dict(metadata, timestamp=time.time())
+            self._write(entries)
+
+    def invalidate(self, model=None, axis=None):
+        """Cancella la voce (model, axis); senza argomenti svuota la cache."""
+        with self._lock:
+            if model is None and axis is None:
+                entries = {}
+            else:
+                entries = self._read()
+                entries.pop(cache_key(model, axis), None)
+            self._write(entries)
+
+    # ------------------------------------------------------------------
+    # aggiornamento in background
+    # ------------------------------------------------------------------
+    def refresh(self, model, axis, query, background=True):
+        """
+        Esegue ``query()`` (-> dict dei metadati, o None se non disponibili)
+        e salva il risultato; se diverso dalla voce in cache la invalida.
+        In background ritorna il thread avviato.
+        """
+        if not background:
+            return self._refresh(model, axis, query)
+        thread = threading.Thread(target=self._refresh, args=(model, axis, query),
+                                  name=f"refresh-{cache_key(model, axis)}", daemon=True)
+        thread.start()
+        self.refresh_thread = thread
+        return thread
+
+    def _refresh(self, model, axis, query):
+        from .pv_access import init_ca_thread
+        init_ca_thread()
+        try:
+            metadata = query()
+        except Exception as exc:
+            log.warning("Controller %s: aggiornamento della cache fallito (%r)", cache_key(model, axis), exc)
+            return None
+        if metadata is None:
+            return None
+
+        old = self.get(model, axis)
+        if old is not None:
+            changed = {k: (old.get(k), v) for k, v in metadata.items() if old.get(k) != v}
+            if changed:
+                log.error("Controller %s: metadati cambiati rispetto alla cache %s, voce invalidata",
+                          cache_key(model, axis), changed)
+                self.invalidate(model, axis)
+                return None
+        self.put(model, axis, **metadata)
+        return metadata
+
+    # ------------------------------------------------------------------
+    # file
+    # ------------------------------------------------------------------
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            log.warning("Cache %s illeggibile (%r), la ignoro", self.path, exc)
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _write(self, entries):
+        root = os.path.dirname(self.path) or "."
+        os.makedirs(root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=root, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
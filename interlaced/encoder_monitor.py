@@ -0,0 +1,329 @@
+"""
+Monitor ad alta frequenza dell'encoder e deriva dell'angolo durante la scansione.
+
+- ``RingBuffer``: due array NumPy preallocati (tempo, valore); il callback
+  del monitor scrive in posizione, senza creare oggetti per campione
+- ``EncoderMonitor``: si abbona al readback del rotary (callback di
+  monitor, pyepics o FakePV) e riempie il buffer
+- ``DriftTracker``: thread consumatore che legge i campioni nuovi, li
+  interpola ai tempi dei trigger del piano (InterlacedScan.t_interlaced_real)
+  e aggiorna l'errore misurato - theta_interlaced_real per loop; la
+  deriva si vede durante la scansione, non dopo la ricostruzione
+- ``SyntheticEncoderPV``: sorgente finta con la stessa interfaccia
+  add_callback di un PV, che segue il moto taxi del piano con rumore e
+  deriva configurabili (anche accelerata con ``time_scale``)
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from .pv_access import init_ca_thread
+
+log = logging.getLogger(__name__)
+
+
+# ============================================================================
+#                               RING BUFFER
+# ============================================================================
+class RingBuffer:
+    """
+    Un produttore (callback di monitor), un consumatore. ``head`` conta i
+    campioni scritti in totale: il consumatore ricorda fin dove ha letto
+    e ``read`` gli restituisce solo quelli nuovi.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = int(capacity)
+        self.times = np.empty(self.capacity, dtype=np.float64)
+        self.values = np.empty(self.capacity, dtype=np.float64)
+        self.head = 0
+
+    def append(self, value, timestamp):
+        i = self.head % self.capacity
+        self.values[i] = value
+        self.times[i] = timestamp
+        self.head += 1        # dopo la scrittura: il campione e' completo
+
+    def read(self, start):
+        """
+        Campioni con indice in [start, head) come copie (tempi, valori).
+        Se il consumatore e' rimasto indietro di piu' di ``capacity`` i
+        piu' vecchi sono gia' sovrascritti: ritorna anche l'indice da cui
+        parte davvero la lettura.
+        """
+        head = self.head
+        # margine di un campione: il produttore puo' star scrivendo il piu' vecchio
+        start = max(start, head - self.capacity + 1)
+        idx = np.arange(start, head) % self.capacity
+        return self.times[idx], self.values[idx], start, head
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+
+# ============================================================================
+#                           SOTTOSCRIZIONE AL PV
+# ============================================================================
+class EncoderMonitor:
+    """
+    Riempie ``buffer`` dai callback di monitor di ``pv``, un oggetto con
+    add_callback/remove_callback (epics.PV, FakePV, SyntheticEncoderPV),
+    oppure un nome da aprire con ``pool``.
+    """
+
+    def __init__(self, pv, capacity=1 << 16, pool=None):
+        if isinstance(pv, str):
+            from .pv_pool import default_pool
+            pv = (pool if pool is not None else default_pool()).get(pv)
+        self.pv = pv
+        self.buffer = RingBuffer(capacity)
+        self._index = None
+
+    def start(self):
+        if self._index is None:
+            self._index = self.pv.add_callback(self._on_value)
+        return self
+
+    def stop(self):
+        if self._index is not None:
+            self.pv.remove_callback(self._index)
+            self._index = None
+
+    def _on_value(self, value=None, timestamp=None, **kwargs):
+        self.buffer.append(value, timestamp if timestamp is not None else time.time())
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ============================================================================
+#                           DERIVA PER LOOP
+# ============================================================================
+class DriftTracker:
+    """
+    Errore angolare misurato - pianificato ai tempi dei trigger, per loop.
+
+    Parametri:
+        buffer     : RingBuffer del monitor
+        t_plan     : tempi dei trigger dall'inizio del moto [s]
+                     (InterlacedScan.t_interlaced_real)
+        theta_plan : angoli attesi [deg] (InterlacedScan.theta_interlaced_real)
+        loops      : loop TIMBIR di ogni trigger (InterlacedScan.loop_indices);
+                     obbligatorio: nel piano ordinato per angolo l'indice
+                     modulo K non e' il loop
+        t0         : istante di inizio del moto sull'orologio del monitor
+                     (default: primo campione ricevuto)
+        tolerance  : |errore| [deg] oltre cui si emette un warning per loop
+        period     : intervallo di aggiornamento del thread [s]
+    """
+
+    def __init__(self, buffer, t_plan, theta_plan, loops, t0=None, tolerance=None, period=0.05):
+        self.buffer = buffer
+        self.t_plan = np.asarray(t_plan, dtype=np.float64)
+        self.theta_plan = np.asarray(theta_plan, dtype=np.float64)
+        self.loops = np.asarray(loops, dtype=np.int64).ravel()
+        if len(self.loops) != len(self.t_plan):
+            raise ValueError(f"{len(self.loops)} loop per {len(self.t_plan)} trigger")
+        self.n_loops = int(self.loops.max()) + 1 if len(self.loops) else 0
+        self.t0 = t0
+        self.tolerance = tolerance
+        self.period = period
+
+        self.errors = np.full(len(self.t_plan), np.nan)
+        self.n = np.zeros(self.n_loops, dtype=np.int64)
+        self._sum = np.zeros(self.n_loops)
+        self._sumsq = np.zeros(self.n_loops)
+        self.max_abs = np.zeros(self.n_loops)
+        self.lost = 0                     # campioni persi per buffer pieno
+        self._flagged = np.zeros(self.n_loops, dtype=bool)
+
+        self._next_sample = 0
+        self._next_trigger = 0
+        self._last = None                 # ultimo campione del blocco precedente
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_scan(cls, buffer, scan, **kwargs):
+        """Dal piano di un InterlacedScan gia' calcolato, con i suoi loop TIMBIR."""
+        return cls(buffer, scan.t_interlaced_real, scan.theta_interlaced_real,
+                   scan.loop_indices(), **kwargs)
+
+    # ------------------------------------------------------------------
+    # aggiornamento
+    # ------------------------------------------------------------------
+    def update(self):
+        """Elabora i campioni nuovi; ritorna il numero di trigger valutati."""
+        with self._lock:
+            times, values, start, head = self.buffer.read(self._next_sample)
+            self.lost += start - self._next_sample
+            self._next_sample = head
+            if len(times) == 0:
+                return 0
+            if self._last is not None:
+                times = np.r_[self._last[0], times]
+                values = np.r_[self._last[1], values]
+            self._last = (times[-1], values[-1])
+            if self.t0 is None:
+                self.t0 = times[0]
+
+            # trigger coperti dai campioni disponibili
+            t_abs = self.t0 + self.t_plan
+            lo = self._next_trigger
+            hi = int(np.searchsorted(t_abs, times[-1], side="right"))
+            if hi <= lo:
+                return 0
+            self._next_trigger = hi
+
+            sel = np.arange(lo, hi)
+            sel = sel[t_abs[sel] >= times[0]]      # prima del primo campione: non misurabile
+            if len(sel) == 0:
+                return 0
+            err = np.interp(t_abs[sel], times, values) - self.theta_plan[sel]
+            self.errors[sel] = err
+
+            loops = self.loops[sel]
+            np.add.at(self.n, loops, 1)
+            np.add.at(self._sum, loops, err)
+            np.add.at(self._sumsq, loops, err ** 2)
+            np.maximum.at(self.max_abs, loops, np.abs(err))
+            self._check_tolerance()
+            return len(sel)
+
+    def _check_tolerance(self):
+        if self.tolerance is None:
+            return
+        new = (self.max_abs > self.tolerance) & ~self._flagged
+        for k in np.flatnonzero(new):
+            log.warning("Loop %d: errore angolare %.4g deg oltre la tolleranza %.4g deg",
+                        k + 1, self.max_abs[k], self.tolerance)
+        self._flagged |= new
+
+    def stats(self):
+        """dict con n, media, RMS e max |errore| per loop [deg]."""
+        with self._lock:
+            n = np.maximum(self.n, 1)
+            return {
+                "n": self.n.copy(),
+                "mean": np.where(self.n > 0, self._sum / n, np.nan),
+                "rms": np.where(self.n > 0, np.sqrt(self._sumsq / n), np.nan),
+                "max_abs": self.max_abs.copy(),
+                "lost": self.lost,
+            }
+
+    @property
+    def done(self):
+        return self._next_trigger >= len(self.t_plan)
+
+    # ------------------------------------------------------------------
+    # thread consumatore
+    # ------------------------------------------------------------------
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="drift-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.update()                 # ultimi campioni arrivati
+
+    def _run(self):
+        while not self._stop.wait(self.period):
+            self.update()
+            if self.done:
+                return
+
+
+# ============================================================================
+#                           SORGENTE SINTETICA
+# ============================================================================
+class SyntheticEncoderPV:
+    """
+    Readback finto del rotary: segue theta(t) del modello taxi e chiama i
+    callback registrati come un monitor pyepics (pvname, value, timestamp).
+
+    Parametri:
+        t_vec, theta_vec : moto da seguire (InterlacedScan.simulate_taxi_motion)
+        rate_hz          : frequenza dei campioni [Hz]
+        noise_deg        : rumore gaussiano [deg]
+        drift_deg_per_s  : deriva lineare aggiunta [deg/s]
+        time_scale       : accelerazione del tempo (10 = dieci volte piu' veloce);
+                           i timestamp restano sul tempo simulato
+        seed             : seme del rumore
+    """
+
+    def __init__(self, t_vec, theta_vec, rate_hz=1000.0, noise_deg=0.0, drift_deg_per_s=0.0,
+                 time_scale=1.0, seed=None, pvname="synthetic:encoder"):
+        self.pvname = pvname
+        self.t_vec = np.asarray(t_vec, dtype=np.float64)
+        self.theta_vec = np.asarray(theta_vec, dtype=np.float64)
+        self.rate_hz = rate_hz
+        self.noise_deg = noise_deg
+        self.drift_deg_per_s = drift_deg_per_s
+        self.time_scale = time_scale
+        self.rng = np.random.default_rng(seed)
+        self.t0 = None
+        self.n_samples = 0
+        self.finished = threading.Event()
+        self._callbacks = {}
+        self._next_index = 1
+        self._thread = None
+
+    @classmethod
+    def from_scan(cls, scan, **kwargs):
+        t_vec, theta_vec = scan.simulate_taxi_motion()
+        return cls(t_vec, theta_vec, **kwargs)
+
+    def add_callback(self, callback=None, index=None, **kwargs):
+        index = index or self._next_index
+        self._next_index = max(self._next_index, index) + 1
+        self._callbacks[index] = callback
+        return index
+
+    def remove_callback(self, index=None):
+        self._callbacks.pop(index, None)
+
+    def start(self, t0=None):
+        """Parte il moto; ``t0`` e' il timestamp dell'istante zero (default: ora)."""
+        self.t0 = time.time() if t0 is None else t0
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._run, name="synthetic-encoder", daemon=True)
+        self._thread.start()
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        init_ca_thread()
+        t_end = self.t_vec[-1]
+        dt = 1.0 / self.rate_hz
+        wall0 = time.perf_counter()
+        k = 0
+        while k * dt <= t_end:
+            # tutti i campioni il cui tempo simulato e' gia' passato
+            t_sim = min((time.perf_counter() - wall0) * self.time_scale, t_end)
+            k_end = int(t_sim / dt) + 1
+            t = np.arange(k, k_end) * dt
+            theta = np.interp(t, self.t_vec, self.theta_vec) + self.drift_deg_per_s * t
+            if self.noise_deg:
+                theta += self.rng.normal(0.0, self.noise_deg, len(t))
+            for ti, value in zip((self.t0 + t).tolist(), theta.tolist()):
+                for callback in list(self._callbacks.values()):
+                    callback(pvname=self.pvname, value=value, timestamp=ti)
+            self.n_samples += len(t)
+            k = k_end
+            time.sleep(min(dt / self.time_scale, 1e-3))
+        self.finished.set()
@@ -0,0 +1,108 @@
+"""
+Retroproiezione filtrata (FBP).
+
+La retroproiezione semplice ricostruisce l'immagine convoluta con 1/r:
+troppo sfocata per confrontare gli schemi di interlacciamento. Qui ogni
+riga del sinogramma viene filtrata con una rampa (rfft, zero-padding a
+lunghezza veloce >= 2 n_det contro l'aliasing circolare) finestrata:
+
+    ramp         |f|                        (Ram-Lak)
+    shepp-logan  |f| sinc(f / 2 f_max)
+    hann         |f| (1 + cos(pi f / f_max)) / 2
+
+La risposta in frequenza e' calcolata una volta per (n_det, filtro) e
+tenuta in cache. Gli angoli non uniformi (golden, TIMBIR, piani
+quantizzati) hanno ciascuno un peso pari alla meta' dell'arco verso i
+due vicini su [0, 180): con N angoli uniformi vale pi / N, e la
+retroproiezione usa lo stesso kernel di interlaced.backprojection.
+
+    recon = fbp(sino, angles, filter_name="shepp-logan")
+"""
+
+import functools
+
+import numpy as np
+
+from .backprojection import Backprojector
+from .blur import _fast_len
+
+FILTERS = ("ramp", "shepp-logan", "hann")
+
+
+@functools.lru_cache(maxsize=32)
+def ramp_filter(n_det, filter_name="ramp"):
+    """
+    Risposta (rfft) del filtro per righe di ``n_det`` bin, sulla lunghezza
+    di padding ``_fast_len(2 n_det)``. La rampa e' la trasformata della
+    risposta all'impulso discreta (Kak & Slaney): niente errore in continua.
+    """
+    if filter_name not in FILTERS:
+        raise ValueError(f"Filtro '{filter_name}' sconosciuto, uno fra {FILTERS}")
+    n = _fast_len(2 * n_det)
+    k = np.arange(n)
+    k = np.where(k > n // 2, k - n, k)                    # distanza circolare
+    h = np.zeros(n)
+    h[0] = 0.25
+    odd = k % 2 == 1
+    h[odd] = -1.0 / (np.pi * k[odd]) ** 2
+    response = np.real(np.fft.rfft(h))                    # rampa, f_max = 0.5 ciclo/bin
+
+    f = np.fft.rfftfreq(n)                                # [0, 0.5]
+    if filter_name == "shepp-logan":
+        response *= np.sinc(f)                            # sinc(f / 2 f_max), f_max = 0.5
+    elif filter_name == "hann":
+        response *= 0.5 * (1 + np.cos(2 * np.pi * f))     # (1 + cos(pi f / f_max)) / 2
+    response.flags.writeable = False
+    return response
+
+
+def filter_sinogram(sino, filter_name="ramp"):
+    """Filtra ogni riga di ``sino`` (..., n_angoli, n_det)."""
+    sino = np.asarray(sino)
+    n_det = sino.shape[-1]
+    response = ramp_filter(n_det, filter_name)
+    n = 2 * (len(response) - 1)
+    spectrum = np.fft.rfft(sino, n=n, axis=-1)
+    spectrum *= response
+    return np.fft.irfft(spectrum, n=n, axis=-1)[..., :n_det]
+
+
+def angle_weights(angles):
+    """
+    Peso di ogni angolo [rad]: meta' dell'arco verso i vicini su [0, 180)
+    (celle di Voronoi sul semicerchio). Angoli ripetuti si dividono la cella.
+    """
+    angles = np.mod(np.asarray(angles, dtype=np.float64).ravel(), 180.0)
+    n = len(angles)
+    if n == 0:
+        return np.zeros(0)
+    order = np.argsort(angles, kind="stable")
+    sorted_angles = angles[order]
+    gaps = np.diff(np.r_[sorted_angles, sorted_angles[0] + 180.0])     # verso il successivo
+    cell = 0.5 * (gaps + np.roll(gaps, 1))
+    weights = np.empty(n)
+    weights[order] = np.deg2rad(cell)
+    return weights
+
+
+class FBP:
+    """
+    Ricostruttore riusabile per (size, angoli, n_det, filtro): pesi,
+    filtro e tabelle del retroproiettore calcolati una volta.
+    """
+
+    def __init__(self, size, angles, n_det=None, filter_name="ramp", weights=None, **kwargs):
+        self.filter_name = filter_name
+        self.backprojector = Backprojector(size, angles, n_det, **kwargs)
+        self.weights = angle_weights(angles) if weights is None else np.asarray(weights, dtype=np.float64)
+        ramp_filter(self.backprojector.n_det, filter_name)          # errore subito se sconosciuto
+
+    def __call__(self, sino):
+        return self.backprojector(filter_sinogram(sino, self.filter_name), self.weights)
+
+
+def fbp(sino, angles, filter_name="ramp", size=None, weights=None, **kwargs):
+    """FBP di ``sino`` (n_angoli, n_det) su (size, size), size = n_det."""
+    sino = np.asarray(sino)
+    n_det = sino.shape[-1]
+    return FBP(size or n_det, angles, n_det, filter_name, weights, **kwargs)(sino)
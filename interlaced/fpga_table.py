@@ -0,0 +1,84 @@
+"""
+Tabella impulsi a 32 bit per l'FPGA, con gestione dei giri.
+
+I counts assoluti restano int64 in tutta la pipeline: a 11.8 M counts/giro
+un uint32 si satura dopo ~360 giri (theta_interlaced_unwrapped di una
+scansione lunga) e tornerebbe a zero senza avvisi.
+
+Quando si scrive la tabella per l'FPGA ogni count viene ridotto modulo
+counts_per_rev (posizione nel giro) e il passaggio a un giro successivo
+e' segnalato esplicitamente con una parola WRAP_MARKER:
+
+    counts : 100, 19990, 20010, 60005          (counts_per_rev = 20000)
+    tabella: 100, 19990, WRAP, 10, WRAP, WRAP, 5
+
+Un marker per ogni giro completato, quindi anche piani che saltano giri
+restano decodificabili. La rotazione deve essere monotona (giri non
+decrescenti) come in una scansione a rotazione continua.
+"""
+
+import numpy as np
+
+
+WRAP_MARKER = np.uint32(0xFFFFFFFF)
+
+
+def to_counts(theta, counts_per_rev):
+    """Angoli [deg] -> counts assoluti int64 (anche su molti giri)."""
+    theta = np.asarray(theta, dtype=np.float64)
+    return np.round(theta * (counts_per_rev / 360.0)).astype(np.int64)
+
+
+def encode_fpga_table(counts, counts_per_rev):
+    """
+    counts assoluti (int64) -> tabella uint32 con marker di fine giro.
+
+    Il primo count e' riferito al giro 0: se cade nel giro r la tabella
+    inizia con r marker.
+    """
+    counts = np.asarray(counts, dtype=np.int64).ravel()
+    counts_per_rev = _check_counts_per_rev(counts_per_rev)
+
+    rev, pos = np.divmod(counts, counts_per_rev)
+    markers = np.diff(rev, prepend=0)
+    if len(counts) and (rev[0] < 0 or markers.min() < 0):
+        raise ValueError("La tabella FPGA richiede giri non negativi e non decrescenti")
+
+    index = np.arange(len(counts)) + np.cumsum(markers)
+    table = np.full(len(counts) + int(markers.sum()), WRAP_MARKER, dtype=np.uint32)
+    table[index] = pos
+    return table
+
+
+def decode_fpga_table(table, counts_per_rev):
+    """Inversa di ``encode_fpga_table``: tabella uint32 -> counts assoluti int64."""
+    table = np.asarray(table, dtype=np.uint32).ravel()
+    counts_per_rev = _check_counts_per_rev(counts_per_rev)
+
+    is_marker = table == WRAP_MARKER
+    rev = np.cumsum(is_marker)[~is_marker]
+    return rev.astype(np.int64) * counts_per_rev + table[~is_marker].astype(np.int64)
+
+
+def write_fpga_table(filename, counts, counts_per_rev):
+    """Scrive la tabella come uint32 little-endian (formato di pulses.bin)."""
+    table = encode_fpga_table(counts, counts_per_rev)
+    table.astype("<u4").tofile(filename)
+    return table
+
+
+def read_fpga_table(filename, counts_per_rev):
+    return decode_fpga_table(np.fromfile(filename, dtype="<u4"), counts_per_rev)
+
+
+def _check_counts_per_rev(counts_per_rev):
+    if not float(counts_per_rev).is_integer():
+        raise ValueError(f"counts_per_rev deve essere intero ({counts_per_rev})")
+    counts_per_rev = int(counts_per_rev)
+    if counts_per_rev <= 0:
+        # un segno invertito (asse o encoder al contrario) va corretto a monte,
+        # non nascosto qui
+        raise ValueError(f"counts_per_rev deve essere positivo ({counts_per_rev})")
+    if counts_per_rev >= int(WRAP_MARKER):
+        raise ValueError(f"counts_per_rev fuori dal range a 32 bit ({counts_per_rev})")
+    return np.int64(counts_per_rev)
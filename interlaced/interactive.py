@@ -0,0 +1,245 @@
+"""
+Supporto per i simulatori interattivi (showblur_*): GUI che non si blocca.
+
+Ogni evento di uno slider chiamava ``update()``, che ricalcolava blur,
+sinogramma e ricostruzione sul thread della GUI: trascinando, l'interfaccia
+si congelava. Qui:
+
+- ``StageCache``: memoizzazione LRU di una fase per chiave degli input;
+- ``SimulationPipeline``: blur per (exposure, velocity), sinogramma per
+  (blur, angoli), ricostruzione per (sinogramma): cambiando solo gli
+  angoli il blur resta in cache, e tornando a valori gia' visti non si
+  ricalcola nulla;
+- ``BackgroundWorker``: un thread che esegue l'ultima richiesta dopo una
+  pausa di ``debounce`` secondi; le richieste superate vengono scartate
+  e il calcolo in corso si interrompe alla fine della fase corrente.
+  La GUI raccoglie i risultati con ``poll()`` da un timer, nel suo thread.
+
+    pipeline = SimulationPipeline(obj)
+    worker = BackgroundWorker(pipeline.run)
+    slider.on_changed(lambda v: worker.submit(exp, vel, angles))
+    timer = fig.canvas.new_timer(interval=50)
+    timer.add_callback(lambda: show(worker.poll()))
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class Cancelled(Exception):
+    """La richiesta e' stata superata da una piu' recente."""
+
+
+def array_key(a):
+    """Chiave hashable per un array (forma, tipo e contenuto)."""
+    a = np.ascontiguousarray(a)
+    return a.shape, a.dtype.str, hashlib.sha1(a.tobytes()).hexdigest()
+
+
+# ============================================================================
+#                           MEMOIZZAZIONE
+# ============================================================================
+class StageCache:
+    """LRU chiave -> risultato di una fase, con al massimo ``maxsize`` voci."""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Risultato in cache per ``key``, altrimenti ``compute()`` (fuori dal
+        lock) e memorizzato. Pensata per un solo thread di calcolo (il
+        BackgroundWorker): due miss concorrenti sulla stessa chiave
+        calcolano entrambe e l'ultima sovrascrive la prima.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        value = compute()                # fuori dal lock: puo' essere lungo
+        with self._lock:
+            self.misses += 1
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _default_blur(img, exposure, angular_velocity):
+    from .blur import rotation_blur
+    return rotation_blur(img, angular_velocity * exposure)
+
+
+def _default_project(img, angles):
+    from .radon import project
+    return project(img, angles)
+
+
+def _default_reconstruct(sino, angles):
+    from .fbp import fbp
+    return fbp(sino, angles, "shepp-logan")
+
+
+class SimulationPipeline:
+    """
+    blur -> sinogramma -> ricostruzione di ``obj``, con una cache per fase.
+
+    Parametri:
+        obj         : immagine di partenza
+        blur        : (img, exposure, angular_velocity) -> immagine sfocata
+        project     : (img, angles) -> sinogramma
+        reconstruct : (sino, angles) -> ricostruzione
+        maxsize     : voci tenute per ogni fase
+        sinogram_blur : blur nel dominio del sinogramma (blur.SinogramBlur):
+                      media a finestra di un sinogramma fine calcolato una
+                      volta, senza sfocare ne' riproiettare l'immagine; la
+                      fase "blur" restituisce ``obj`` invariato
+        fine_step   : passo del sinogramma fine [deg]
+    """
+
+    def __init__(self, obj, blur=None, project=None, reconstruct=None, maxsize=8,
+                 sinogram_blur=False, fine_step=0.25):
+        self.obj = obj
+        self.blur = blur or _default_blur
+        self.project = project or _default_project
+        self.reconstruct = reconstruct or _default_reconstruct
+        self.sinogram_blur = sinogram_blur
+        self.fine_step = fine_step
+        self.caches = {name: StageCache(maxsize) for name in ("blur", "sinogram", "reconstruction")}
+
+    def run(self, exposure, angular_velocity, angles, check=None):
+        """
+        (blurred, sino, recon). ``check()`` viene chiamata prima di ogni
+        fase e puo' sollevare Cancelled per abbandonare la richiesta.
+        """
+        check = check or (lambda: None)
+        angles = np.asarray(angles, dtype=np.float64)
+        blur_key = (float(exposure), float(angular_velocity))
+        sino_key = (blur_key, array_key(angles))
+
+        check()
+        if self.sinogram_blur:
+            from .blur import base_sinogram
+            blurred = self.obj
+            sino = self.caches["sinogram"].get(sino_key, lambda: base_sinogram(
+                self.obj, self.fine_step).blur(angles, angular_velocity * exposure))
+        else:
+            blurred = self.caches["blur"].get(
+                blur_key, lambda: self.blur(self.obj, exposure, angular_velocity))
+            check()
+            sino = self.caches["sinogram"].get(sino_key, lambda: self.project(blurred, angles))
+        check()
+        recon = self.caches["reconstruction"].get(sino_key, lambda: self.reconstruct(sino, angles))
+        return blurred, sino, recon
+
+    def stats(self):
+        """dict fase -> (hit, miss)."""
+        return {name: (cache.hits, cache.misses) for name, cache in self.caches.items()}
+
+
+# ============================================================================
+#                           WORKER IN BACKGROUND
+# ============================================================================
+class BackgroundWorker:
+    """
+    Esegue ``fn(*args, check=..., **kwargs)`` per l'ultima richiesta di
+    ``submit`` in un thread dedicato.
+
+    - debounce: si parte solo dopo ``debounce`` secondi senza richieste
+      nuove (trascinando uno slider si calcola solo dove ci si ferma);
+    - ``check`` solleva Cancelled se nel frattempo e' arrivata una
+      richiesta nuova: il risultato vecchio non viene mai pubblicato;
+    - ``poll()`` ritorna l'ultimo risultato non ancora letto (o None) e
+      rilancia l'eccezione se il calcolo e' fallito.
+    """
+
+    def __init__(self, fn, debounce=0.08):
+        self.fn = fn
+        self.debounce = debounce
+        self.generation = 0
+        self.n_cancelled = 0
+        self._request = None
+        self._result = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="interactive-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, *args, **kwargs):
+        with self._cond:
+            self.generation += 1
+            self._request = (self.generation, args, kwargs)
+            self._cond.notify()
+
+    def poll(self):
+        with self._cond:
+            result, self._result = self._result, None
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    @property
+    def busy(self):
+        """Richiesta in attesa o in calcolo."""
+        with self._cond:
+            return self._request is not None or self._running
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _stale(self, generation):
+        if self.generation != generation or self._closed:
+            raise Cancelled()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # debounce: aspetta che le richieste smettano di arrivare
+                generation = None
+                while generation != self.generation and not self._closed:
+                    generation = self.generation
+                    self._cond.wait(self.debounce)
+                if self._closed:
+                    return
+                generation, args, kwargs = self._request
+                self._request = None
+                self._running = True
+            try:
+                result = self.fn(*args, check=lambda: self._stale(generation), **kwargs)
+            except Cancelled:
+                self.n_cancelled += 1
+                result = None
+            except Exception as exc:
+                log.warning("Calcolo interattivo fallito: %r", exc)
+                result = exc
+            with self._cond:
+                self._running = False
+                if result is not None and generation == self.generation:
+                    self._result = result
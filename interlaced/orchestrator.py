@@ -0,0 +1,358 @@
+"""
+Orchestratore asincrono dei passi di armamento di una scansione.
+
+Il flusso di TomoScan (appunti_tomoscan_commentato.py, pipeline.txt) e'
+sequenziale: posizioni, programmazione PSO, camera, poi il motore va
+alla posizione di start taxi. Molti passi pero' sono indipendenti: qui
+ogni passo dichiara da quali dipende (``after``) e parte appena questi
+sono finiti, con un timeout proprio. Cosi' il movimento verso lo start
+taxi avviene mentre la tabella impulsi si carica e la camera si arma.
+
+    orch = ScanOrchestrator()
+    orch.add("plan", compute, after=("counts",), timeout=5)
+    ...
+    results = orch.run()              # oppure await orch.run_async()
+    print(orch.timeline)
+
+``tomoscan_steps`` costruisce il grafo standard TomoScan/PSO, verificabile
+con pso_simulator.PSOSimulator.
+
+I passi sincroni girano su un pool di thread creato per ogni esecuzione
+(uno per passo), separato dal pool delle letture PV: un passo che a sua
+volta usa thread (es. la rilettura della tabella) non puo' bloccarsi
+aspettando un posto nel pool occupato dai passi. Un thread non si puo'
+interrompere dall'esterno: se l'esecuzione fallisce o va in timeout
+``cancelled`` viene impostato, i passi in corso si fermano al prossimo
+``check()`` e ``run`` ritorna solo quando tutti i thread sono finiti.
+A passi fermi girano le azioni registrate con ``add_cleanup`` (camera
+fuori acquisizione, motore fermo), poi l'errore viene rilanciato.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from .pv_access import CONNECT_POLL, ca_thread_pool
+
+log = logging.getLogger(__name__)
+
+Step = namedtuple("Step", "name action after timeout")
+
+
+class Aborted(Exception):
+    """L'esecuzione e' stata interrotta mentre il passo era in corso."""
+
+
+class ScanOrchestrator:
+
+    def __init__(self):
+        self.steps = {}
+        self.timeline = {}       # nome -> (inizio, fine) [s] dall'avvio
+        self.cancelled = threading.Event()
+        self.cleanups = []
+
+    def check(self):
+        """Da chiamare nei passi sincroni fra un'operazione e l'altra."""
+        if self.cancelled.is_set():
+            raise Aborted()
+
+    def add(self, name, action, after=(), timeout=None):
+        """
+        ``action(results)`` riceve il dict dei risultati dei passi gia'
+        finiti; puo' essere una funzione normale (eseguita in un thread)
+        o una coroutine function.
+        """
+        if name in self.steps:
+            raise ValueError(f"Passo '{name}' gia' definito")
+        after = (after,) if isinstance(after, str) else tuple(after)
+        self.steps[name] = Step(name, action, after, timeout)
+        return self
+
+    def add_cleanup(self, action):
+        """
+        ``action()`` gira se l'esecuzione fallisce, va in timeout o viene
+        cancellata, quando tutti i passi si sono fermati; le azioni girano
+        in ordine inverso di registrazione e un loro errore viene solo
+        loggato, cosi' le successive girano comunque.
+        """
+        self.cleanups.append(action)
+        return self
+
+    def _run_cleanups(self):
+        for action in reversed(self.cleanups):
+            try:
+                action()
+            except Exception:
+                log.exception("Cleanup %r fallita", action)
+
+    def order(self):
+        """Ordine topologico; ValueError per dipendenze mancanti o cicliche."""
+        for step in self.steps.values():
+            missing = [dep for dep in step.after if dep not in self.steps]
+            if missing:
+                raise ValueError(f"Passo '{step.name}': dipendenze sconosciute {missing}")
+        done, order = set(), []
+        while len(order) < len(self.steps):
+            ready = [s.name for s in self.steps.values()
+                     if s.name not in done and all(dep in done for dep in s.after)]
+            if not ready:
+                cycle = sorted(set(self.steps) - done)
+                raise ValueError(f"Dipendenze cicliche fra i passi {cycle}")
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+    # ------------------------------------------------------------------
+    # esecuzione
+    # ------------------------------------------------------------------
+    async def run_async(self, concurrent=True):
+        """
+        Esegue tutti i passi e ritorna il dict nome -> risultato.
+        Con ``concurrent=False`` un passo alla volta in ordine topologico
+        (riferimento per misurare il tempo guadagnato).
+
+        Se un passo fallisce o va in timeout gli altri vengono cancellati
+        (``cancelled`` per quelli sincroni gia' partiti), girano le
+        cleanup e l'errore viene rilanciato (TimeoutError o RuntimeError
+        con il nome).
+        """
+        order = self.order()
+        results = {}
+        self.timeline = {}
+        self.cancelled.clear()
+        t0 = time.perf_counter()
+        executor = ca_thread_pool(max(1, len(self.steps)), "scan-step")
+        completed = False
+        try:
+            if not concurrent:
+                for name in order:
+                    results[name] = await self._run_step(self.steps[name], results, t0, executor)
+                completed = True
+                return results
+
+            tasks = {}
+
+            async def run(step):
+                if step.after:
+                    await asyncio.gather(*(tasks[dep] for dep in step.after))
+                results[step.name] = await self._run_step(step, results, t0, executor)
+
+            for name in order:
+                tasks[name] = asyncio.ensure_future(run(self.steps[name]))
+            try:
+                await asyncio.gather(*tasks.values())
+            except BaseException:
+                self.cancelled.set()
+                for task in tasks.values():
+                    task.cancel()
+                await asyncio.gather(*tasks.values(), return_exceptions=True)
+                raise
+            completed = True
+            return results
+        except BaseException:
+            self.cancelled.set()
+            raise
+        finally:
+            # i passi sincroni ancora in corso finiscono al prossimo check()
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, executor.shutdown, True)
+            if not completed:
+                await loop.run_in_executor(None, self._run_cleanups)
+
+    def run(self, concurrent=True):
+        """Versione sincrona (da non chiamare dentro un event loop attivo)."""
+        return asyncio.run(self.run_async(concurrent))
+
+    async def _run_step(self, step, results, t0, executor):
+        start = time.perf_counter() - t0
+        if asyncio.iscoroutinefunction(step.action):
+            coro = step.action(results)
+        else:
+            loop = asyncio.get_running_loop()
+            coro = loop.run_in_executor(executor, step.action, results)
+        try:
+            value = await asyncio.wait_for(coro, step.timeout)
+        except asyncio.TimeoutError:
+            self.cancelled.set()
+            raise TimeoutError(f"Passo '{step.name}' in timeout dopo {step.timeout} s") from None
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            raise RuntimeError(f"Passo '{step.name}' fallito: {exc!r}") from exc
+        self.timeline[step.name] = (start, time.perf_counter() - t0)
+        return value
+
+    def summary(self):
+        lines = [f"{'Passo':>18} | {'inizio [ms]':>11} | {'fine [ms]':>10}"]
+        for name, (start, end) in sorted(self.timeline.items(), key=lambda item: item[1]):
+            lines.append(f"{name:>18} | {start * 1e3:11.1f} | {end * 1e3:10.1f}")
+        return "\n".join(lines)
+
+
+# ============================================================================
+#                     GRAFO STANDARD TomoScan / PSO
+# ============================================================================
+# stati areaDetector (DetectorState_RBV) in cui la camera e' armata:
+# Acquire, oppure Waiting in attesa del trigger esterno
+ARMED_STATES = (1, 7, "Acquire", "Waiting")
+
+
+def wait_camera_armed(pool, camera, timeout, check=None):
+    """
+    Attende che la camera sia in acquisizione: AcquireBusy = 1 (ADCore 3)
+    o DetectorState_RBV in ARMED_STATES. La put su Acquire con callback
+    si completa solo a fine acquisizione, quindi non si puo' usare come
+    conferma dell'armamento.
+    """
+    busy = pool.get(camera + "AcquireBusy")
+    state = pool.get(camera + "DetectorState_RBV")
+    deadline = time.monotonic() + timeout
+    while True:
+        if check is not None:
+            check()
+        if busy.connected and busy.get(timeout=timeout) in (1, "Acquiring"):
+            return True
+        if state.connected and state.get(timeout=timeout) in ARMED_STATES:
+            return True
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Camera {camera} non in acquisizione dopo {timeout} s")
+        time.sleep(CONNECT_POLL)
+
+
+def move_motor(pool, motor, position, timeout, check=None):
+    """
+    Porta ``motor`` a ``position`` senza bloccare il thread nella put:
+    put su .VAL con callback, poi attesa di put completata e DMOV = 1
+    chiamando ``check`` a ogni giro. Cosi' un'esecuzione cancellata
+    interrompe l'attesa; il moto lo ferma la cleanup con .STOP.
+    """
+    val = pool.get(motor + ".VAL")
+    dmov = pool.get(motor + ".DMOV")
+    val.put(position, wait=False, use_complete=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        if check is not None:
+            check()
+        if val.put_complete and dmov.get(timeout=timeout) == 1:
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Motore {motor} non arrivato a {position} dopo {timeout} s")
+        time.sleep(CONNECT_POLL)
+
+
+def tomoscan_steps(pool, prefix=None, motor="2bmb:m102", camera="2bmbSP1:cam1:",
+                   timeouts=None, cache=None, nelm=None, **scan_kwargs):
+    """
+    Passi di armamento di una scansione interlacciata:
+
+        parameters  -> move_to_start                (motore allo start taxi)
+        counts      -> plan -> upload_table         (tabella su waveform)
+                            -> encoder_step         (PSOEncoderCountsPerStep, RotationStep)
+        arm_camera                                  (indipendente, fino ad AcquireBusy)
+        refresh_counts                              (con ``cache``: dopo tutti gli altri,
+                                                     verifica in background dei counts)
+
+    ``timeouts`` = dict nome -> timeout [s] (default 10 s, 60 s per il moto);
+    ``nelm`` = elementi per waveform della tabella (default pso.TABLE_NELM).
+
+    Se l'armamento fallisce o viene cancellato la cleanup riporta la
+    camera fuori acquisizione (Acquire = 0, TriggerMode e ImageMode di
+    prima) e ferma il motore (.STOP), se questi passi erano partiti.
+    """
+    from .pso import (TABLE_NELM, TOMOSCAN_PREFIX, UNITS_PER_REV, cached_counts_per_rotation,
+                      query_counts_per_rotation, refresh_counts_per_rotation, write_table)
+    from .fpga_table import encode_fpga_table
+    from .scan import InterlacedScan
+
+    prefix = TOMOSCAN_PREFIX if prefix is None else prefix
+    nelm = TABLE_NELM if nelm is None else nelm
+    timeouts = dict({"move_to_start": 60.0}, **(timeouts or {}))
+    timeout = lambda name: timeouts.get(name, 10.0)
+    orch = ScanOrchestrator()
+    # stato lasciato dai passi, per la cleanup: motore mosso, modi camera di prima
+    touched = {}
+
+    def parameters(results):
+        return pool.read({
+            "start_taxi": (prefix + "PSOStartTaxi", -0.75),
+            "counts_per_rev": (prefix + "PSOCountsPerRotation", 11_840_200),
+            "N_theta": (prefix + "NTheta", 32),
+            "K": (prefix + "KLoops", 4),
+        }, timeout=timeout("parameters"))
+
+    def counts(results):
+        if cache is not None:
+            value = cached_counts_per_rotation(cache, pool, prefix, timeout("counts"))
+        else:
+            value = query_counts_per_rotation(pool, prefix, timeout("counts"))
+        return value if value is not None else results["parameters"]["counts_per_rev"]
+
+    def plan(results):
+        orch.check()
+        params = results["parameters"]
+        kwargs = dict(scan_kwargs)
+        kwargs.setdefault("N_theta", params["N_theta"])
+        kwargs.setdefault("K", params["K"])
+        return InterlacedScan(PSOCountsPerRotation=results["counts"], **kwargs).compute()
+
+    def upload_table(results):
+        scan = results["plan"]
+        table = encode_fpga_table(scan.pulses_interlaced_real, scan.PSOCountsPerRotation)
+        orch.check()
+        return write_table(table, pool, prefix, nelm=nelm, timeout=timeout("upload_table"))
+
+    def encoder_step(results):
+        scan = results["plan"]
+        encoder_multiply = scan.PSOCountsPerRotation / UNITS_PER_REV
+        counts_per_step = int(round(UNITS_PER_REV / scan.N_theta * encoder_multiply))
+        pool.get(prefix + "PSOEncoderCountsPerStep").put(counts_per_step, wait=True, timeout=timeout("encoder_step"))
+        orch.check()
+        pool.get(prefix + "RotationStep").put(counts_per_step / encoder_multiply, wait=True,
+                                             timeout=timeout("encoder_step"))
+        return counts_per_step
+
+    def move_to_start(results):
+        start = results["parameters"]["start_taxi"]
+        touched["motor"] = True
+        move_motor(pool, motor, start, timeout("move_to_start"), orch.check)
+        return start
+
+    def arm_camera(results):
+        t = timeout("arm_camera")
+        for field in ("TriggerMode", "ImageMode"):
+            touched.setdefault(field, pool.get(camera + field).get(timeout=t))
+        pool.get(camera + "TriggerMode").put("External", wait=True, timeout=t)
+        orch.check()
+        pool.get(camera + "ImageMode").put("Multiple", wait=True, timeout=t)
+        orch.check()
+        # senza wait: la callback di Acquire arriva solo a fine acquisizione
+        pool.get(camera + "Acquire").put(1)
+        return wait_camera_armed(pool, camera, t, orch.check)
+
+    def cleanup():
+        t = timeout("cleanup")
+        if "TriggerMode" in touched:
+            pool.get(camera + "Acquire").put(0, wait=True, timeout=t)
+            for field in ("TriggerMode", "ImageMode"):
+                if touched.get(field) is not None:
+                    pool.get(camera + field).put(touched[field], wait=True, timeout=t)
+        if touched.get("motor"):
+            pool.get(motor + ".STOP").put(1, wait=True, timeout=t)
+
+    orch.add_cleanup(cleanup)
+    orch.add("parameters", parameters, timeout=timeout("parameters"))
+    orch.add("counts", counts, after="parameters", timeout=timeout("counts"))
+    orch.add("plan", plan, after=("parameters", "counts"), timeout=timeout("plan"))
+    orch.add("upload_table", upload_table, after="plan", timeout=timeout("upload_table"))
+    orch.add("encoder_step", encoder_step, after="plan", timeout=timeout("encoder_step"))
+    orch.add("move_to_start", move_to_start, after="parameters", timeout=timeout("move_to_start"))
+    orch.add("arm_camera", arm_camera, timeout=timeout("arm_camera"))
+    if cache is not None:
+        # il canale di comando si usa solo ad armamento finito
+        orch.add("refresh_counts",
+                 lambda results: refresh_counts_per_rotation(cache, pool, prefix, timeout("counts")),
+                 after=("upload_table", "encoder_step", "move_to_start", "arm_camera"),
+                 timeout=timeout("refresh_counts"))
+    return orch
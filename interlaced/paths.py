@@ -0,0 +1,16 @@
+"""
+Percorsi su disco condivisi dai moduli del pacchetto.
+
+Le cache (controller_cache, radon, ...) stanno tutte sotto
+$XDG_CACHE_HOME/interlaced/ (default ~/.cache/interlaced/). Il modulo
+non importa nulla del pacchetto, cosi' la parte EPICS e quella di
+imaging possono usarlo senza dipendere l'una dall'altra.
+"""
+
+import os
+
+
+def cache_dir(*parts):
+    """$XDG_CACHE_HOME/interlaced/<parts...> (la cartella non viene creata)."""
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "interlaced", *parts)
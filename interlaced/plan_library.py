@@ -0,0 +1,294 @@
+"""
+Libreria di piani di impulsi precalcolati.
+
+Per le ricette standard (N, K, metodo, counts/giro) il piano viene
+calcolato una volta sola con ``build`` e salvato su disco. I parametri di
+moto di InterlacedScan (accel, decel, omega_target, dt, quantizer, ...)
+fanno sempre parte della chiave: vengono completati con i default del
+metodo e la chiave ha il suffisso ``_M<hash>`` del moto completo. Un
+default passato esplicitamente o omesso da' la stessa chiave, e cambiando
+la ricetta di moto (o i default nel codice) non si serve mai un piano
+vecchio.
+
+    LIBRERIA/
+        index.json                       versione + elenco dei piani
+        timbir_N1024_K4_C11840200_M<hash>/
+            fpga_table.npy               tabella uint32 per l'FPGA
+            theta_ideal.npy  theta_real.npy
+            pulses_ideal.npy pulses_real.npy
+
+All'avvio della scansione ``load_plan`` legge l'indice (tenuto in cache
+finche' il file non cambia) e apre gli array in memory-map: nessun
+calcolo, la tabella passa direttamente allo scrittore FPGA.
+
+Uso da riga di comando:
+
+    python -m interlaced.plan_library build LIBRERIA --recipe 1024,4,timbir,11840200 --accel 10
+    python -m interlaced.plan_library list LIBRERIA
+"""
+
+import argparse
+import copy
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import numpy as np
+
+from .scan import InterlacedScan
+from .fpga_table import encode_fpga_table
+
+
+LIBRARY_VERSION = 2            # 2: moto completo sempre nella chiave
+INDEX_FILE = "index.json"
+ARRAYS = ("fpga_table", "theta_ideal", "theta_real", "pulses_ideal", "pulses_real")
+
+# metodo -> funzione (N, K, counts_per_rev, **motion) -> InterlacedScan calcolato
+METHODS = {
+    "timbir": lambda N, K, counts_per_rev, **motion: InterlacedScan(
+        N_theta=N, K=K, PSOCountsPerRotation=counts_per_rev, **motion).compute(),
+}
+
+
+def _scan_motion_defaults():
+    # parametri di InterlacedScan che non sono la ricetta (N, K, counts) ne' diagnostica
+    skip = {"self", "N_theta", "K", "PSOCountsPerRotation", "profile"}
+    return {name: p.default for name, p in inspect.signature(InterlacedScan.__init__).parameters.items()
+            if name not in skip}
+
+
+# metodo -> parametri di moto accettati, con i loro default
+MOTION_DEFAULTS = {
+    "timbir": _scan_motion_defaults(),
+}
+
+Recipe = namedtuple("Recipe", "N K method counts_per_rev")
+LoadedPlan = namedtuple("LoadedPlan", "recipe metadata " + " ".join(ARRAYS))
+
+
+def plan_key(N, K, method, counts_per_rev, motion=None):
+    """Chiave della ricetta: sempre con l'hash del moto completo (default inclusi)."""
+    motion = resolve_motion(method, motion)
+    text = json.dumps(motion, sort_keys=True)
+    return (f"{method}_N{int(N)}_K{int(K)}_C{int(counts_per_rev)}"
+            f"_M{hashlib.sha1(text.encode()).hexdigest()[:10]}")
+
+
+def resolve_motion(method, motion=None):
+    """
+    Moto completo e in forma stabile: default del metodo aggiornati con
+    ``motion``, chiavi ordinate, numeri come float. ValueError per
+    parametri che il metodo non conosce.
+    """
+    defaults = MOTION_DEFAULTS.get(method, {})
+    unknown = sorted(set(motion or {}) - set(defaults))
+    if unknown:
+        raise ValueError(f"Parametri di moto sconosciuti per '{method}': {unknown}")
+    out = {}
+    for name, value in sorted(dict(defaults, **(motion or {})).items()):
+        if isinstance(value, (bool, str)) or value is None:
+            out[name] = value
+        else:
+            out[name] = float(value)
+    return out
+
+
+# ============================================================================
+#                               COSTRUZIONE
+# ============================================================================
+def build(root, recipes, overwrite=False, **motion):
+    """
+    Calcola e salva i piani delle ricette ``(N, K, method, counts_per_rev)``.
+    ``motion`` (accel, decel, omega_target, dt, ...) va a InterlacedScan.
+
+    Ritorna:
+        lista delle chiavi scritte
+    """
+    os.makedirs(root, exist_ok=True)
+    index = _empty_index()
+    if os.path.exists(_index_path(root)):
+        try:
+            # copia: l'indice in cache non va toccato prima della scrittura
+            index = copy.deepcopy(_read_index(root))
+        except ValueError:
+            # libreria di un'altra versione: si riparte da un indice nuovo
+            index = _empty_index()
+
+    written = []
+    for recipe in recipes:
+        recipe = Recipe(int(recipe[0]), int(recipe[1]), str(recipe[2]), int(recipe[3]))
+        if recipe.method not in METHODS:
+            raise ValueError(f"Metodo '{recipe.method}' non disponibile ({', '.join(METHODS)})")
+
+        key = plan_key(*recipe, motion=motion)
+        if key in index["plans"] and not overwrite:
+            continue
+
+        scan = METHODS[recipe.method](recipe.N, recipe.K, recipe.counts_per_rev, **motion)
+        arrays = {
+            "fpga_table": encode_fpga_table(scan.pulses_interlaced_real, recipe.counts_per_rev),
+            "theta_ideal": scan.theta_interlaced,
+            "theta_real": scan.theta_interlaced_real,
+            "pulses_ideal": scan.pulses_interlaced_ideal,
+            "pulses_real": scan.pulses_interlaced_real,
+        }
+
+        plan_dir = os.path.join(root, key)
+        os.makedirs(plan_dir, exist_ok=True)
+        for name, arr in arrays.items():
+            _atomic_save(os.path.join(plan_dir, name + ".npy"), arr)
+
+        index["plans"][key] = {
+            "recipe": recipe._asdict(),
+            "motion": resolve_motion(recipe.method, motion),
+            "version": LIBRARY_VERSION,
+            "n_angles": len(scan.theta_interlaced),
+            "n_words": len(arrays["fpga_table"]),
+            "metadata": scan.plan_metadata(),
+        }
+        written.append(key)
+
+    _write_index(root, index)
+    return written
+
+
+# ============================================================================
+#                               CARICAMENTO
+# ============================================================================
+def load_plan(root, N, K, method, counts_per_rev, **motion):
+    """
+    Apre in memory-map il piano della ricetta indicata, costruito con gli
+    stessi parametri di moto ``motion`` passati a ``build``.
+
+    Solleva KeyError se la ricetta non e' in libreria e ValueError se la
+    libreria e' stata scritta con una versione diversa.
+    """
+    index = _read_index(root)
+    key = plan_key(N, K, method, counts_per_rev, motion)
+    if key not in index["plans"]:
+        raise KeyError(f"Piano '{key}' non presente in {root}: eseguire build")
+    entry = index["plans"][key]
+    if entry["version"] != LIBRARY_VERSION:
+        raise ValueError(f"Piano '{key}' in versione {entry['version']}, attesa {LIBRARY_VERSION}")
+    if entry["motion"] != resolve_motion(method, motion):
+        raise ValueError(f"Piano '{key}' costruito con moto {entry['motion']}, "
+                         f"richiesto {resolve_motion(method, motion)}")
+
+    plan_dir = os.path.join(root, key)
+    arrays = {name: np.load(os.path.join(plan_dir, name + ".npy"), mmap_mode="r")
+              for name in ARRAYS}
+    return LoadedPlan(Recipe(**entry["recipe"]), entry["metadata"], **arrays)
+
+
+def list_plans(root):
+    """Lista di (Recipe, parametri di moto) dei piani in libreria."""
+    return [(Recipe(**entry["recipe"]), entry["motion"])
+            for entry in _read_index(root)["plans"].values()]
+
+
+# ============================================================================
+#                               INDICE
+# ============================================================================
+_index_cache = {}
+
+
+def _index_path(root):
+    return os.path.join(root, INDEX_FILE)
+
+
+def _empty_index():
+    return {"version": LIBRARY_VERSION, "plans": {}}
+
+
+def _read_index(root):
+    """Indice in cache, riletto solo se il file e' cambiato (mtime/size)."""
+    path = _index_path(root)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _index_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path) as f:
+            index = json.load(f)
+        if index.get("version") != LIBRARY_VERSION:
+            raise ValueError(f"Libreria {root} in versione {index.get('version')}, "
+                             f"attesa {LIBRARY_VERSION}: ricostruire con build")
+        cached = (stamp, index)
+        _index_cache[path] = cached
+    return cached[1]
+
+
+def _write_index(root, index):
+    fd, tmp = tempfile.mkstemp(dir=root, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp, _index_path(root))
+
+
+def _atomic_save(path, arr):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npy")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, np.ascontiguousarray(arr))
+    os.replace(tmp, path)
+
+
+# ============================================================================
+#                               RIGA DI COMANDO
+# ============================================================================
+def _parse_recipe(text):
+    try:
+        N, K, method, counts_per_rev = text.split(",")
+        return Recipe(int(N), int(K), method.strip(), int(float(counts_per_rev)))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ricetta '{text}' non valida, formato N,K,metodo,counts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or list the precomputed pulse-plan library.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Precompute the plans of the given recipes")
+    p_build.add_argument("root", help="Library directory")
+    p_build.add_argument(
+        "--recipe",
+        type=_parse_recipe,
+        action="append",
+        required=True,
+        help="Recipe N,K,method,counts_per_rev (repeatable), e.g. 1024,4,timbir,11840200",
+    )
+    p_build.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Recompute plans already in the library",
+    )
+    # parametri di moto: se assenti restano i default di InterlacedScan
+    motion = p_build.add_argument_group("motion", "Motion parameters (default: InterlacedScan defaults)")
+    motion.add_argument("--accel", type=float, help="Acceleration [deg/s^2]")
+    motion.add_argument("--decel", type=float, help="Deceleration [deg/s^2]")
+    motion.add_argument("--omega-target", dest="omega_target", type=float, help="Plateau speed [deg/s]")
+    motion.add_argument("--dt", type=float, help="Time step of the taxi model [s]")
+    motion.add_argument("--quantizer", choices=("round", "diffusion"), help="Angle to count quantizer")
+    motion.add_argument("--min-count-spacing", dest="min_count_spacing", type=int,
+                        help="Minimum count spacing (diffusion quantizer)")
+
+    p_list = sub.add_parser("list", help="List the plans in the library")
+    p_list.add_argument("root", help="Library directory")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        motion = {name: getattr(args, name) for name in MOTION_DEFAULTS["timbir"]
+                  if getattr(args, name, None) is not None}
+        written = build(args.root, args.recipe, overwrite=args.overwrite, **motion)
+        print(f"✔ {len(written)} piani scritti in '{args.root}'")
+    else:
+        for recipe, motion in list_plans(args.root):
+            extra = "  " + ", ".join(f"{k}={v}" for k, v in motion.items()) if motion else ""
+            print(f"{recipe.method:>10}  N={recipe.N:<8d} K={recipe.K:<4d} "
+                  f"counts/giro={recipe.counts_per_rev}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Programmazione del PSO (TomoScanPSO) a partire da un piano InterlacedScan.
+
+Il percorso e' lo stesso con EPICS reale e con il simulatore
+(pso_simulator.PSOSimulator), cambia solo il ``PVPool``:
+
+1. ``query_counts_per_rotation``: handshake UNITSTOCOUNTS su
+   PSOCommand.BOUT / BINP, come nel __init__ di TomoScanPSO
+   (vedi fromanglestopulse.py); l'Ensemble non lo supporta e si usa
+   PSOCountsPerRotation gia' impostato
+2. ``InterlacedScan(...).compute()`` con i counts del controller
+3. tabella FPGA (fpga_table) scritta con ``write_table`` sui waveform
+   PSOPulseTable00, 01, ... (blocchi da NELM parole, put in parallelo,
+   verifica CRC32 sulla rilettura)
+4. passo angolare intero in counts: PSOEncoderCountsPerStep e RotationStep
+"""
+
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from .fpga_table import encode_fpga_table
+from .pv_access import CONNECT_POLL, ca_thread_pool
+from .pv_pool import default_pool
+from .scan import InterlacedScan
+
+
+TOMOSCAN_PREFIX = "2bmb:TomoScan:"
+UNITS_PER_REV = 360.0
+
+# modelli che rispondono a UNITSTOCOUNTS
+COUNTS_QUERY_MODELS = ("A3200",)
+
+# tabella impulsi: TABLE_RECORDS waveform uint32 da TABLE_NELM elementi
+# (PSOPulseTable00 ... 63) + PSOPulseTableLength con il numero di parole
+TABLE_PV = "PSOPulseTable"
+TABLE_NELM = 65536
+TABLE_RECORDS = 64
+
+ProgramResult = namedtuple(
+    "ProgramResult",
+    "scan counts_per_rev encoder_counts_per_step rotation_step n_words timings upload")
+TableUpload = namedtuple("TableUpload", "n_words n_chunks crc32 seconds")
+
+
+# ============================================================================
+#                    HANDSHAKE CON IL CONTROLLER
+# ============================================================================
+def parse_controller_reply(reply):
+    """
+    Risposta Aerotech -> float. Il primo carattere e' lo stato:
+    '%' ok, '!' comando non valido, '#' errore del controller.
+    """
+    if not reply or reply[0] != "%":
+        raise ValueError(f"Risposta del controller non valida: {reply!r}")
+    return float(reply[1:])
+
+
+def read_controller_id(pool=None, prefix=TOMOSCAN_PREFIX, timeout=10.0):
+    """(modello, asse) del controller, es. ("A3200", "X")."""
+    pool = pool if pool is not None else default_pool()
+    model = pool.get(prefix + "PSOControllerModel").get(timeout=timeout, as_string=True)
+    axis = pool.get(prefix + "PSOAxisName").get(timeout=timeout, as_string=True)
+    return model, axis
+
+
+def query_counts_per_rotation(pool=None, prefix=TOMOSCAN_PREFIX, timeout=10.0, controller=None):
+    """
+    Chiede al controller quanti counts corrispondono a un giro e li scrive
+    in PSOCountsPerRotation. Ritorna None se il modello non lo supporta.
+    ``controller`` = (modello, asse) se gia' letti.
+    """
+    pool = pool if pool is not None else default_pool()
+
+    model, axis = controller or read_controller_id(pool, prefix, timeout)
+    if model not in COUNTS_QUERY_MODELS:
+        return None
+
+    counts_per_rev = _ask_counts_per_rotation(pool, prefix, timeout, axis)
+    pool.get(prefix + "PSOCountsPerRotation").put(counts_per_rev, wait=True, timeout=timeout)
+    return counts_per_rev
+
+
+def _ask_counts_per_rotation(pool, prefix, timeout, axis):
+    # solo il round-trip sul canale di comando, senza scrivere PSOCountsPerRotation
+    pool.get(prefix + "PSOCommand.BOUT").put(
+        f"UNITSTOCOUNTS({axis}, {UNITS_PER_REV})", wait=True, timeout=timeout)
+    reply = pool.get(prefix + "PSOCommand.BINP").get(timeout=timeout, as_string=True, use_monitor=False)
+    return parse_controller_reply(reply)
+
+
+def cached_counts_per_rotation(cache, pool=None, prefix=TOMOSCAN_PREFIX, timeout=10.0, max_age=None):
+    """
+    Come ``query_counts_per_rotation`` ma usando ``cache``
+    (controller_cache.ControllerCache): se (modello, asse) e' in cache il
+    valore viene scritto subito in PSOCountsPerRotation senza round-trip;
+    altrimenti la richiesta e' sincrona e il risultato va in cache.
+
+    Il controllo del valore in cache lo fa ``refresh_counts_per_rotation``,
+    da chiamare a programmazione finita (program_pso e tomoscan_steps lo
+    fanno): il canale di comando non va usato mentre si programma il PSO.
+    """
+    pool = pool if pool is not None else default_pool()
+    controller = read_controller_id(pool, prefix, timeout)
+    model, axis = controller
+    if model not in COUNTS_QUERY_MODELS:
+        return None
+
+    entry = cache.get(model, axis, max_age=max_age)
+    if entry is None or entry.get("counts_per_rev") is None:
+        counts_per_rev = query_counts_per_rotation(pool, prefix, timeout, controller)
+        if counts_per_rev is not None:
+            cache.put(model, axis, counts_per_rev=counts_per_rev)
+        return counts_per_rev
+
+    counts_per_rev = entry["counts_per_rev"]
+    pool.get(prefix + "PSOCountsPerRotation").put(counts_per_rev, wait=True, timeout=timeout)
+    return counts_per_rev
+
+
+def refresh_counts_per_rotation(cache, pool=None, prefix=TOMOSCAN_PREFIX, timeout=10.0, background=True):
+    """
+    Ripete UNITSTOCOUNTS e aggiorna solo la cache su disco, non
+    PSOCountsPerRotation. Se il controller risponde diversamente la voce
+    viene invalidata: la scansione in corso ha usato il valore vecchio
+    (errore nel log) e la prossima programmazione rifa' la richiesta
+    sincrona. In background ritorna il thread avviato (None se il modello
+    non supporta la richiesta).
+    """
+    pool = pool if pool is not None else default_pool()
+    model, axis = read_controller_id(pool, prefix, timeout)
+    if model not in COUNTS_QUERY_MODELS:
+        return None
+
+    def query():
+        return {"counts_per_rev": _ask_counts_per_rotation(pool, prefix, timeout, axis)}
+
+    return cache.refresh(model, axis, query, background=background)
+
+
+# ============================================================================
+#                    SCRITTURA TABELLA (WAVEFORM)
+# ============================================================================
+def delta_table(counts):
+    """
+    Counts assoluti -> ritardi fra trigger consecutivi (memPulseSeq), il
+    primo riferito allo zero dell'encoder. Il piano deve essere crescente.
+    """
+    counts = np.asarray(counts, dtype=np.int64).ravel()
+    deltas = np.diff(counts, prepend=0)
+    if len(deltas) and (deltas.min() < 0 or deltas.max() > np.iinfo(np.uint32).max):
+        raise ValueError("La tabella dei ritardi richiede counts crescenti con passi a 32 bit")
+    return deltas.astype(np.uint32)
+
+
+def table_crc32(table):
+    return zlib.crc32(np.ascontiguousarray(table, dtype="<u4").tobytes())
+
+
+def table_pvnames(prefix=TOMOSCAN_PREFIX, name=TABLE_PV, n_records=TABLE_RECORDS):
+    return [f"{prefix}{name}{i:02d}" for i in range(n_records)]
+
+
+def write_table(table, pool=None, prefix=TOMOSCAN_PREFIX, name=TABLE_PV, nelm=TABLE_NELM,
+                n_records=TABLE_RECORDS, timeout=10.0, verify=True):
+    """
+    Scrive una tabella uint32 (impulsi FPGA o ritardi) sui waveform
+    ``name``00, 01, ... a blocchi di ``nelm`` parole.
+
+    Le put partono tutte insieme (senza attendere la precedente) e si
+    aspetta solo il completamento dell'ultima: il tempo e' circa quello
+    di un blocco, non la somma. Con ``verify`` i blocchi vengono riletti
+    (anche qui in parallelo) e il CRC32 confrontato con quello della
+    tabella locale.
+
+    Ritorna:
+        TableUpload(n_words, n_chunks, crc32, seconds)
+    """
+    pool = pool if pool is not None else default_pool()
+    table = np.ascontiguousarray(table, dtype=np.uint32).ravel()
+    n_chunks = -(-len(table) // nelm)
+    if n_chunks > n_records:
+        raise ValueError(f"Tabella di {len(table)} parole: servono {n_chunks} waveform da "
+                         f"{nelm}, disponibili {n_records}")
+
+    t0 = time.perf_counter()
+    pvs = [pool.get(pvname) for pvname in table_pvnames(prefix, name, n_chunks)]
+    chunks = [table[i * nelm:(i + 1) * nelm] for i in range(n_chunks)]
+
+    pool.get(f"{prefix}{name}Length").put(0, wait=True, timeout=timeout)
+    for pv, chunk in zip(pvs, chunks):
+        pv.put(chunk, wait=False, use_complete=True)
+    _wait_put_complete(pvs, timeout)
+    # la lunghezza per ultima: la tabella e' valida solo a scrittura finita
+    pool.get(f"{prefix}{name}Length").put(len(table), wait=True, timeout=timeout)
+
+    crc = table_crc32(table)
+    if verify:
+        # riletture in parallelo, come le scritture
+        readback = list(_readback_pool().map(
+            lambda pv, n: pv.get(timeout=timeout, count=n, use_monitor=False),
+            pvs, [len(chunk) for chunk in chunks]))
+        if any(r is None for r in readback):
+            raise TimeoutError(f"Rilettura della tabella {prefix}{name} in timeout")
+        readback = np.concatenate([np.asarray(r, dtype=np.uint32) for r in readback] or [table[:0]])
+        if len(readback) != len(table) or table_crc32(readback) != crc:
+            raise RuntimeError(f"Tabella {prefix}{name}: CRC32 della rilettura diverso "
+                               f"({table_crc32(readback):08x} invece di {crc:08x})")
+
+    return TableUpload(len(table), n_chunks, crc, time.perf_counter() - t0)
+
+
+_readback = None
+_readback_lock = threading.Lock()
+
+
+def _readback_pool():
+    # pool proprio: write_table gira spesso dentro un passo dell'orchestratore,
+    # e un pool condiviso pieno di passi in attesa delle riletture si bloccherebbe
+    global _readback
+    with _readback_lock:
+        if _readback is None:
+            _readback = ca_thread_pool(8, "pso-readback")
+        return _readback
+
+
+def _wait_put_complete(pvs, timeout):
+    deadline = time.monotonic() + timeout
+    while not all(pv.put_complete for pv in pvs):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Scrittura dei waveform non completata entro {timeout} s")
+        time.sleep(CONNECT_POLL)
+
+
+# ============================================================================
+#                          PROGRAMMAZIONE
+# ============================================================================
+def program_pso(pool=None, prefix=TOMOSCAN_PREFIX, timeout=10.0, cache=None, nelm=TABLE_NELM,
+                verify=True, **scan_kwargs):
+    """
+    InterlacedScan -> tabella impulsi -> PV del PSO.
+
+    Parametri:
+        pool        : PVPool (default: registro di processo, backend epics)
+        prefix      : prefisso dei PV TomoScan
+        timeout     : timeout di ogni put/get [s]
+        cache       : ControllerCache per i counts per giro (None = chiede
+                      sempre al controller); la verifica col controller
+                      parte in background a programmazione finita
+        nelm        : elementi per waveform della tabella (NELM del record)
+        verify      : rilettura della tabella con controllo CRC32
+        scan_kwargs : argomenti di InterlacedScan; N_theta e K, se assenti,
+                      vengono letti da NTheta e KLoops
+
+    Ritorna:
+        ProgramResult, con i tempi delle fasi in ``timings`` [s]
+    """
+    pool = pool if pool is not None else default_pool()
+    timings = {}
+
+    t0 = time.perf_counter()
+    if cache is not None:
+        counts_per_rev = cached_counts_per_rotation(cache, pool, prefix, timeout)
+    else:
+        counts_per_rev = query_counts_per_rotation(pool, prefix, timeout)
+    specs = {
+        "counts_per_rev": (prefix + "PSOCountsPerRotation", 11_840_200),
+        "N_theta": (prefix + "NTheta", 32),
+        "K": (prefix + "KLoops", 4),
+    }
+    params = pool.read(specs, timeout=timeout)
+    if counts_per_rev is None:
+        counts_per_rev = params["counts_per_rev"]
+    scan_kwargs.setdefault("N_theta", params["N_theta"])
+    scan_kwargs.setdefault("K", params["K"])
+    timings["query"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scan = InterlacedScan(PSOCountsPerRotation=counts_per_rev, **scan_kwargs).compute()
+    timings["compute"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    table = encode_fpga_table(scan.pulses_interlaced_real, counts_per_rev)
+    timings["encode"] = time.perf_counter() - t0
+
+    # passo angolare arrotondato a un numero intero di counts
+    t0 = time.perf_counter()
+    encoder_multiply = counts_per_rev / UNITS_PER_REV
+    encoder_counts_per_step = int(round(UNITS_PER_REV / scan.N_theta * encoder_multiply))
+    rotation_step = encoder_counts_per_step / encoder_multiply
+
+    upload = write_table(table, pool, prefix, nelm=nelm, timeout=timeout, verify=verify)
+    pool.get(prefix + "PSOEncoderCountsPerStep").put(encoder_counts_per_step, wait=True, timeout=timeout)
+    pool.get(prefix + "RotationStep").put(rotation_step, wait=True, timeout=timeout)
+    timings["write"] = time.perf_counter() - t0
+
+    if cache is not None:
+        # programmazione finita: il canale di comando e' di nuovo libero
+        refresh_counts_per_rotation(cache, pool, prefix, timeout)
+
+    return ProgramResult(scan, counts_per_rev, encoder_counts_per_step, rotation_step,
+                         len(table), timings, upload)
@@ -0,0 +1,227 @@
+"""
+Simulatore offline del set di PV TomoScan/PSO.
+
+``PSOSimulator`` e' un FakePVServer gia' popolato con i PV usati dalla
+programmazione del PSO (PSOStartTaxi, PSOEndTaxi, PSOCountsPerRotation,
+PSOEncoderCountsPerStep, RotationStep, i waveform PSOPulseTable00, 01, ...
+limitati a NELM elementi) e risponde ai comandi scritti su
+PSOCommand.BOUT mettendo la risposta in PSOCommand.BINP, come il
+controller Aerotech:
+
+    BOUT <- "UNITSTOCOUNTS(X, 360.0)"       BINP -> "%11840200"
+
+Le latenze (connessione, get, put, esecuzione del comando) sono
+configurabili, quindi il percorso InterlacedScan -> tabella impulsi ->
+program_pso si puo' misurare e verificare senza beamline:
+
+    python -m interlaced.pso_simulator --N 1024 --K 4 --latency 0.002 --runs 5
+"""
+
+import argparse
+import re
+import threading
+import time
+
+import numpy as np
+
+from .fpga_table import decode_fpga_table
+from .pso import TABLE_NELM, TABLE_PV, TABLE_RECORDS, TOMOSCAN_PREFIX, program_pso, table_pvnames
+from .pv_access import CONNECT_POLL, FakePVServer
+from .pv_pool import PVPool
+
+
+_UNITSTOCOUNTS = re.compile(r"^\s*UNITSTOCOUNTS\(\s*(\w+)\s*,\s*([-+0-9.eE]+)\s*\)\s*$", re.IGNORECASE)
+
+
+class PSOSimulator(FakePVServer):
+    """
+    Controller PSO finto. ``sim.PV`` si passa come ``pv_factory``
+    (o a ``PVPool``) al posto di ``epics.PV``.
+
+    Un modello diverso da A3200 (es. "Ensemble") risponde "!" a
+    UNITSTOCOUNTS, come il controller reale.
+    """
+
+    def __init__(self,
+                 prefix=TOMOSCAN_PREFIX,
+                 counts_per_rev=11_840_200,
+                 model="A3200",
+                 axis="X",
+                 N_theta=32,
+                 K=4,
+                 start_taxi=-0.749939,
+                 end_taxi=0.735,
+                 command_latency=0.0,
+                 table_nelm=TABLE_NELM,
+                 table_records=TABLE_RECORDS,
+                 motor="2bmb:m102",
+                 camera="2bmbSP1:cam1:",
+                 motor_speed=None,
+                 **latencies):
+
+        self.prefix = prefix
+        self.counts_per_rev = counts_per_rev
+        self.model = model
+        self.axis = axis
+        self.command_latency = command_latency
+        self.table_nelm = table_nelm
+        self.motor = motor
+        self.motor_speed = motor_speed      # deg/s del moto verso VAL (None = istantaneo)
+        self.camera = camera
+        self._acquire_done = threading.Event()
+        self._stop = threading.Event()
+        self.n_commands = 0
+        self._table_pvs = table_pvnames(prefix, TABLE_PV, table_records)
+        self._table_set = set(self._table_pvs)
+
+        values = {
+            "PSOStartTaxi": start_taxi,
+            "PSOEndTaxi": end_taxi,
+            # l'Ensemble non lo fornisce: resta quello impostato a mano
+            "PSOCountsPerRotation": float(counts_per_rev) if model != "A3200" else 0.0,
+            "PSOEncoderCountsPerStep": 0,
+            "RotationStep": 0.0,
+            "PSOControllerModel": model,
+            "PSOAxisName": axis,
+            "PSOCommand.BOUT": "",
+            "PSOCommand.BINP": "",
+            TABLE_PV + "Length": 0,
+            "NTheta": N_theta,
+            "KLoops": K,
+        }
+        values = {prefix + name: value for name, value in values.items()}
+        values.update((pvname, np.zeros(0, dtype=np.uint32)) for pvname in self._table_pvs)
+        # motore di rotazione e camera, per l'armamento completo (orchestrator)
+        values.update({motor + ".VAL": 0.0, motor + ".RBV": 0.0, motor + ".DMOV": 1,
+                       motor + ".STOP": 0})
+        values.update({camera + "TriggerMode": "Internal", camera + "ImageMode": "Single",
+                       camera + "Acquire": 0, camera + "AcquireBusy": 0,
+                       camera + "DetectorState_RBV": 0})
+        super().__init__(values, **latencies)
+        self.put_hooks[prefix + "PSOCommand.BOUT"] = PSOSimulator._on_command
+        self.put_hooks[motor + ".VAL"] = PSOSimulator._on_move
+        self.put_hooks[motor + ".STOP"] = PSOSimulator._on_stop
+        self.put_hooks[camera + "Acquire"] = PSOSimulator._on_acquire
+
+    def __getitem__(self, name):
+        """Valore lato server del PV ``prefix + name``."""
+        return self.values[self.prefix + name]
+
+    @property
+    def pulse_table(self):
+        """Tabella ricomposta dai waveform (prime PSOPulseTableLength parole)."""
+        length = int(self[TABLE_PV + "Length"])
+        n_chunks = -(-length // self.table_nelm)
+        chunks = [self.values[pvname] for pvname in self._table_pvs[:n_chunks]]
+        return np.concatenate(chunks or [np.zeros(0, dtype=np.uint32)])[:length]
+
+    def _put(self, pvname, value):
+        if pvname in self._table_set:
+            # come un record waveform: tipo ULONG, al massimo NELM elementi
+            value = np.array(value, dtype=np.uint32)[:self.table_nelm]
+        super()._put(pvname, value)
+
+    def execute(self, command):
+        """Comando ASCII Aerotech -> risposta ('%' ok, '!' non valido)."""
+        m = _UNITSTOCOUNTS.match(command)
+        if m is None or self.model != "A3200" or m.group(1) != self.axis:
+            return "!"
+        counts = float(m.group(2)) * self.counts_per_rev / 360.0
+        return f"%{counts:.12g}"
+
+    def _on_move(self, target):
+        # la put con wait=True ritorna a moto finito, come con un record
+        # motor; .STOP = 1 ferma il moto dove si trova
+        self._stop.clear()
+        self.set(self.motor + ".DMOV", 0)
+        start, target = float(self.values[self.motor + ".RBV"]), float(target)
+        duration = abs(target - start) / self.motor_speed if self.motor_speed else 0.0
+        t0 = time.monotonic()
+        while True:
+            fraction = min(1.0, (time.monotonic() - t0) / duration) if duration else 1.0
+            self.set(self.motor + ".RBV", start + (target - start) * fraction)
+            if fraction >= 1.0 or self._stop.wait(CONNECT_POLL):
+                break
+        self.set(self.motor + ".DMOV", 1)
+
+    def _on_stop(self, value):
+        if int(value):
+            self._stop.set()
+            self.set(self.motor + ".STOP", 0)
+
+    def _on_acquire(self, value):
+        # come areaDetector: con Acquire = 1 AcquireBusy e DetectorState
+        # (Waiting, trigger esterno) salgono subito, ma la put con callback
+        # si completa solo quando l'acquisizione finisce (Acquire = 0)
+        if int(value):
+            self._acquire_done.clear()
+            self.set(self.camera + "DetectorState_RBV", 7)
+            self.set(self.camera + "AcquireBusy", 1)
+            self._acquire_done.wait()
+        else:
+            self.set(self.camera + "DetectorState_RBV", 0)
+            self.set(self.camera + "AcquireBusy", 0)
+            self._acquire_done.set()
+
+    def _on_command(self, command):
+        time.sleep(self.command_latency)
+        with self._lock:
+            self.n_commands += 1
+        self.set(self.prefix + "PSOCommand.BINP", self.execute(str(command)))
+
+
+# ============================================================================
+#                               BENCHMARK
+# ============================================================================
+def benchmark(n_runs=5, N_theta=1024, K=4, counts_per_rev=11_840_200, latency=0.0,
+              command_latency=0.0, nelm=TABLE_NELM, **scan_kwargs):
+    """
+    Esegue ``n_runs`` volte program_pso contro un simulatore nuovo (pool
+    nuovo, quindi anche le connessioni) e verifica ogni volta che la
+    tabella scritta decodifichi agli impulsi del piano.
+
+    Ritorna:
+        dict fase -> array dei tempi [s] (query, compute, encode, write,
+        upload = solo tabella, total)
+    """
+    timings = {}
+    for _ in range(n_runs):
+        sim = PSOSimulator(counts_per_rev=counts_per_rev, N_theta=N_theta, K=K,
+                           connect_latency=latency, get_latency=latency, put_latency=latency,
+                           command_latency=command_latency, table_nelm=nelm)
+        t0 = time.perf_counter()
+        result = program_pso(PVPool(sim.PV), prefix=sim.prefix, nelm=nelm, **scan_kwargs)
+        total = time.perf_counter() - t0
+
+        decoded = decode_fpga_table(sim.pulse_table, result.counts_per_rev)
+        if not np.array_equal(decoded, result.scan.pulses_interlaced_real):
+            raise RuntimeError("La tabella scritta sul simulatore non corrisponde al piano")
+        if sim["PSOCountsPerRotation"] != counts_per_rev or sim.n_commands != 1:
+            raise RuntimeError("Handshake UNITSTOCOUNTS non eseguito correttamente")
+
+        for name, value in dict(result.timings, upload=result.upload.seconds, total=total).items():
+            timings.setdefault(name, []).append(value)
+    return {name: np.array(values) for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the InterlacedScan -> PSO programming path against the offline simulator.")
+    parser.add_argument("--N", type=int, default=1024, help="Number of projections (power of 2)")
+    parser.add_argument("--K", type=int, default=4, help="Number of interlaced loops")
+    parser.add_argument("--counts", type=int, default=11_840_200, help="Encoder counts per rotation")
+    parser.add_argument("--latency", type=float, default=0.0, help="PV connect/get/put latency [s]")
+    parser.add_argument("--command-latency", type=float, default=0.0, help="Controller command latency [s]")
+    parser.add_argument("--nelm", type=int, default=TABLE_NELM, help="Elements per pulse-table waveform (record NELM)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of repetitions")
+    args = parser.parse_args()
+
+    timings = benchmark(args.runs, args.N, args.K, args.counts, args.latency, args.command_latency, args.nelm)
+
+    print(f"N={args.N} K={args.K} counts/giro={args.counts} latenza={args.latency:g} s, {args.runs} ripetizioni")
+    print(f"{'Fase':>8} | {'min [ms]':>10} | {'media [ms]':>10} | {'max [ms]':>10}")
+    for name, values in timings.items():
+        print(f"{name:>8} | {values.min() * 1e3:10.3f} | {values.mean() * 1e3:10.3f} | {values.max() * 1e3:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
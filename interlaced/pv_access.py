@@ -0,0 +1,271 @@
+"""
+Accesso asincrono ai PV EPICS con letture in parallelo e timeout.
+
+Gli script creano i ``PV(...)`` e chiamano ``.get()`` uno alla volta: il
+tempo di setup e' la somma delle latenze e un PV che non risponde blocca
+tutto (pipeline.txt, punto 7 "Robustezza"). Qui invece:
+
+- tutti i PV vengono creati subito (la connessione CA parte in parallelo);
+- ogni lettura e' un task asyncio con il proprio timeout;
+- un PV assente o lento restituisce il valore di default (con warning).
+
+Il tempo totale e' quindi quello del PV piu' lento, non la somma.
+
+Il backend e' una factory ``pv_factory(pvname) -> PV`` con l'interfaccia
+di pyepics (connected, get, put, add_callback): di default ``epics.PV``
+(importato solo al primo uso), oppure ``FakePVServer().PV`` per lavorare
+senza beamline.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+
+# parametri di scansione letti all'avvio: nome -> (PV, default)
+SCAN_PARAMETERS = {
+    "N_theta": ("2bmb:TomoScan:NTheta", 32),
+    "K": ("2bmb:TomoScan:KLoops", 4),
+    "start_taxi": ("2bmb:TomoScan:PSOStartTaxi", -0.75),
+    "end_taxi": ("2bmb:TomoScan:PSOEndTaxi", 0.75),
+    "counts_per_rev": ("2bmb:TomoScan:PSOCountsPerRotation", 11_840_200),
+}
+
+CONNECT_POLL = 0.005        # intervallo di controllo della connessione [s]
+
+
+# ============================================================================
+#                          BACKEND EPICS (pyepics)
+# ============================================================================
+def epics_pv_factory(pvname, **kwargs):
+    """Crea un ``epics.PV``; pyepics viene importato solo qui."""
+    from epics import PV
+    return PV(pvname, **kwargs)
+
+
+def init_ca_thread():
+    """
+    Da chiamare all'avvio di ogni thread che usa i PV: i thread devono
+    condividere il contesto CA di pyepics (nessun effetto senza epics).
+    """
+    epics = sys.modules.get("epics")
+    if epics is not None:
+        epics.ca.use_initial_context()
+
+
+def ca_thread_pool(max_workers, name="pv"):
+    """ThreadPoolExecutor nuovo i cui thread condividono il contesto CA."""
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name,
+                              initializer=init_ca_thread)
+
+
+# pool delle sole letture di read_pvs: nessun altro modulo vi sottomette
+# lavoro, quindi un task non puo' restare in attesa di un altro task
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ca_thread_pool(16, "pv")
+        return _executor
+
+
+# ============================================================================
+#                          LETTURA ASINCRONA
+# ============================================================================
+async def read_pvs(specs, pv_factory=None, timeout=1.0):
+    """
+    Legge in parallelo tutti i PV di ``specs``.
+
+    Parametri:
+        specs      : dict nome -> (pvname, default); il valore letto viene
+                     convertito nel tipo del default (int, float, str)
+        pv_factory : factory dei PV (default: epics.PV)
+        timeout    : timeout per singolo PV [s], connessione + lettura
+
+    Ritorna:
+        dict nome -> valore (default per i PV non connessi, in timeout o None)
+    """
+    pv_factory = pv_factory or epics_pv_factory
+    pvs = {name: pv_factory(pvname) for name, (pvname, _) in specs.items()}
+
+    tasks = [asyncio.wait_for(_read_one(pv, timeout), timeout) for pv in pvs.values()]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    values = {}
+    for (name, (pvname, default)), value in zip(specs.items(), results):
+        if isinstance(value, asyncio.TimeoutError):
+            log.warning("PV %s: timeout dopo %.3g s, uso il default %r", pvname, timeout, default)
+            value = None
+        elif isinstance(value, Exception):
+            log.warning("PV %s: errore %r, uso il default %r", pvname, value, default)
+            value = None
+        values[name] = coerce_value(value, default, pvname)
+    return values
+
+
+async def _read_one(pv, timeout):
+    while not pv.connected:
+        await asyncio.sleep(CONNECT_POLL)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), lambda: pv.get(timeout=timeout))
+
+
+def coerce_value(value, default, pvname):
+    """Valore letto -> tipo del default; None o non convertibile -> default."""
+    if value is None or default is None:
+        return default if value is None else value
+    try:
+        if isinstance(default, str):
+            return value if isinstance(value, str) else str(value)
+        return type(default)(value)
+    except (TypeError, ValueError):
+        log.warning("PV %s: valore %r non convertibile, uso il default %r", pvname, value, default)
+        return default
+
+
+def read_scan_parameters(pv_factory=None, timeout=1.0, specs=None):
+    """
+    Versione sincrona per gli script: legge ``SCAN_PARAMETERS`` (o ``specs``)
+    in parallelo. Non va chiamata dentro un event loop gia' attivo: li' si
+    usa direttamente ``await read_pvs(...)``.
+    """
+    return asyncio.run(read_pvs(specs or SCAN_PARAMETERS, pv_factory, timeout))
+
+
+# ============================================================================
+#                     BACKEND FINTO (in memoria, per test)
+# ============================================================================
+class FakePVServer:
+    """
+    Insieme di PV in memoria con latenze configurabili.
+
+    ``server.PV`` ha la stessa firma di ``epics.PV`` e si passa come
+    ``pv_factory``. I PV non presenti in ``values`` non si connettono mai,
+    come un PV inesistente sulla rete.
+    """
+
+    def __init__(self, values=None, connect_latency=0.0, get_latency=0.0, put_latency=0.0):
+        self.values = dict(values or {})
+        self.connect_latency = connect_latency
+        self.get_latency = get_latency
+        self.put_latency = put_latency
+        self.latency = {}            # pvname -> latenza di get/put specifica
+        self.put_hooks = {}          # pvname -> fn(server, value), es. handshake
+        self.n_gets = 0
+        self.n_puts = 0
+        self._monitors = {}          # pvname -> lista di FakePV
+        self._lock = threading.RLock()
+
+    def PV(self, pvname, **kwargs):
+        return FakePV(self, pvname)
+
+    def set(self, pvname, value):
+        """Aggiorna un valore lato server e notifica i monitor."""
+        with self._lock:
+            self.values[pvname] = value
+            monitors = list(self._monitors.get(pvname, ()))
+        for pv in monitors:
+            pv._notify(value)
+
+    def _latency(self, pvname, default):
+        return self.latency.get(pvname, default)
+
+    def _put(self, pvname, value):
+        time.sleep(self._latency(pvname, self.put_latency))
+        with self._lock:
+            self.n_puts += 1
+        self.set(pvname, value)
+        hook = self.put_hooks.get(pvname)
+        if hook is not None:
+            hook(self, value)
+
+    def _get(self, pvname):
+        time.sleep(self._latency(pvname, self.get_latency))
+        with self._lock:
+            self.n_gets += 1
+            return self.values.get(pvname)
+
+
+class FakePV:
+    """Sottoinsieme di ``epics.PV`` usato dal progetto."""
+
+    def __init__(self, server, pvname):
+        self.server = server
+        self.pvname = pvname
+        self.put_complete = True
+        self._created = time.monotonic()
+        self._callbacks = {}
+        self._next_index = 1
+        self._value = None
+        self._monitored = False
+
+    @property
+    def connected(self):
+        return (self.pvname in self.server.values
+                and time.monotonic() - self._created >= self.server.connect_latency)
+
+    def wait_for_connection(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.connected:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(CONNECT_POLL)
+        return True
+
+    def get(self, timeout=None, as_string=False, use_monitor=True, count=None):
+        if not self.wait_for_connection(timeout):
+            return None
+        if use_monitor and self._monitored:
+            value = self._value
+        else:
+            value = self.server._get(self.pvname)
+        if count is not None and value is not None and hasattr(value, "__len__"):
+            value = value[:count]
+        return str(value) if as_string and value is not None else value
+
+    def put(self, value, wait=False, timeout=30.0, use_complete=False, callback=None):
+        if not self.wait_for_connection(timeout):
+            return None
+        if wait:
+            self._do_put(value, callback)
+            return 1
+        self.put_complete = False
+        threading.Thread(target=self._do_put, args=(value, callback), daemon=True).start()
+        return 1
+
+    def _do_put(self, value, callback):
+        self.server._put(self.pvname, value)
+        self.put_complete = True
+        if callback is not None:
+            callback(pvname=self.pvname)
+
+    def add_callback(self, callback=None, index=None, **kwargs):
+        with self.server._lock:
+            if not self._monitored:
+                self.server._monitors.setdefault(self.pvname, []).append(self)
+                self._value = self.server.values.get(self.pvname)
+                self._monitored = True
+        index = index or self._next_index
+        self._next_index = max(self._next_index, index) + 1
+        self._callbacks[index] = callback
+        return index
+
+    def remove_callback(self, index=None):
+        self._callbacks.pop(index, None)
+
+    def clear_callbacks(self):
+        self._callbacks.clear()
+
+    def _notify(self, value):
+        self._value = value
+        for callback in list(self._callbacks.values()):
+            callback(pvname=self.pvname, value=value, timestamp=time.time())
@@ -0,0 +1,202 @@
+"""
+Registro dei canali PV condiviso dal processo e snapshot dei parametri motore.
+
+``compute_real_timeline`` crea sette ``PV("2bmb:m102.*")`` nuovi a ogni
+chiamata (connessione CA + lettura ogni volta). Con ``PVPool`` ogni nome
+viene connesso una sola volta e riusato; ``MotorSnapshot`` legge tutti i
+campi del motore in un'unica passata e tiene il risultato in cache
+finche' un callback di monitor non segnala un cambiamento. Le chiamate di
+pianificazione successive quindi non fanno traffico di rete.
+"""
+
+import logging
+import threading
+import time
+
+from .pv_access import CONNECT_POLL, ca_thread_pool, coerce_value, epics_pv_factory
+
+log = logging.getLogger(__name__)
+
+# default "obbligatorio": se il PV non risponde ``PVPool.read`` solleva
+# TimeoutError invece di inventare un valore
+REQUIRED = object()
+
+# campi del record motor usati dal modello taxi/rampa. Gli script di
+# timeline non avevano default: un motore scollegato non deve produrre un
+# piano calcolato su parametri di moto inventati
+MOTOR_FIELDS = {
+    "VMAX": REQUIRED,   # velocita' massima (plateau) [deg/s]
+    "VELO": REQUIRED,   # velocita' di plateau [deg/s]
+    "VBAS": REQUIRED,   # velocita' base a inizio rampa [deg/s]
+    "ACCL": REQUIRED,   # accelerazione (deg/s^2 o tempo di rampa)
+    "MRES": REQUIRED,   # motor resolution
+    "ERES": REQUIRED,   # encoder resolution
+    "RRES": REQUIRED,   # readback resolution
+}
+
+
+# ============================================================================
+#                           REGISTRO DEI CANALI
+# ============================================================================
+class PVPool:
+    """Un solo oggetto PV per nome, creato al primo uso e poi riusato."""
+
+    def __init__(self, pv_factory=None):
+        self.pv_factory = pv_factory or epics_pv_factory
+        self._pvs = {}
+        self._lock = threading.Lock()
+
+    def get(self, pvname):
+        with self._lock:
+            pv = self._pvs.get(pvname)
+            if pv is None:
+                pv = self._pvs[pvname] = self.pv_factory(pvname)
+            return pv
+
+    def read(self, specs, timeout=1.0):
+        """
+        Legge insieme i PV di ``specs`` (nome -> (pvname, default)).
+
+        Tre fasi con una sola scadenza comune: si creano tutti i canali,
+        si attendono tutte le connessioni insieme, poi le letture partono
+        in parallelo; il tempo totale e' quello del PV piu' lento, non la
+        somma. Un PV non connesso o senza valore prende il default con un
+        warning, come in pv_access.read_pvs; se il default e' REQUIRED
+        solleva TimeoutError.
+        """
+        pvs = {name: self.get(pvname) for name, (pvname, _) in specs.items()}
+        deadline = time.monotonic() + timeout
+
+        pending = set(pvs)
+        while True:
+            pending = {name for name in pending if not pvs[name].connected}
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(CONNECT_POLL)
+
+        connected = [name for name in pvs if name not in pending]
+        remaining = max(deadline - time.monotonic(), 1e-3)
+        results = dict(zip(connected, _read_pool().map(
+            lambda name: pvs[name].get(timeout=remaining, use_monitor=True), connected)))
+
+        values = {}
+        for name, (pvname, default) in specs.items():
+            value = results.get(name)
+            if value is None:
+                problem = "non connesso" if name in pending else "nessun valore"
+                if default is REQUIRED:
+                    raise TimeoutError(f"PV {pvname}: {problem} entro {timeout:g} s "
+                                       f"e nessun default ammesso")
+                log.warning("PV %s: %s entro %.3g s, uso il default %r", pvname, problem, timeout, default)
+            elif default is REQUIRED:
+                values[name] = value
+                continue
+            values[name] = coerce_value(value, default, pvname)
+        return values
+
+    def __len__(self):
+        return len(self._pvs)
+
+    def __contains__(self, pvname):
+        return pvname in self._pvs
+
+
+# pool proprio delle letture: MotorSnapshot.get puo' girare dentro un passo
+# dell'orchestratore, che non deve attendere task accodati dietro di lui
+_read_executor = None
+_read_lock = threading.Lock()
+
+
+def _read_pool():
+    global _read_executor
+    with _read_lock:
+        if _read_executor is None:
+            _read_executor = ca_thread_pool(16, "pv-pool")
+        return _read_executor
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """Registro di processo (backend epics)."""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = PVPool()
+        return _default_pool
+
+
+def get_pv(pvname):
+    return default_pool().get(pvname)
+
+
+# ============================================================================
+#                           SNAPSHOT DEL MOTORE
+# ============================================================================
+class MotorSnapshot:
+    """
+    Campi del record motor letti in blocco e tenuti in cache.
+
+        motor = MotorSnapshot("2bmb:m102")
+        m = motor.get()          # prima volta: una lettura di tutti i campi
+                                 # (TimeoutError se il motore non risponde)
+        VELO, ACCL = m["VELO"], m["ACCL"]
+        motor.get()              # nessun I/O finche' un monitor non cambia
+
+    Ogni PV del motore ha un callback di monitor che invalida lo snapshot.
+    """
+
+    def __init__(self, motor="2bmb:m102", pool=None, fields=None, timeout=1.0):
+        self.motor = motor
+        self.pool = pool if pool is not None else default_pool()
+        self.fields = dict(MOTOR_FIELDS if fields is None else fields)
+        self.timeout = timeout
+        self.n_reads = 0
+        self._values = None
+        self._subscribed = False
+        self._lock = threading.Lock()
+
+    def pvname(self, field):
+        return f"{self.motor}.{field}"
+
+    @property
+    def valid(self):
+        return self._values is not None
+
+    def invalidate(self, **kwargs):
+        # firma compatibile con i callback di pyepics
+        self._values = None
+
+    def get(self):
+        """dict campo -> valore; riletto solo se lo snapshot e' stato invalidato."""
+        values = self._values
+        if values is not None:
+            return values
+        with self._lock:
+            if self._values is None:
+                self._subscribe()
+                specs = {field: (self.pvname(field), default)
+                         for field, default in self.fields.items()}
+                self._values = self.pool.read(specs, timeout=self.timeout)
+                self.n_reads += 1
+            return self._values
+
+    def __getitem__(self, field):
+        return self.get()[field]
+
+    def _subscribe(self):
+        if self._subscribed:
+            return
+        for field in self.fields:
+            self.pool.get(self.pvname(field)).add_callback(self._on_monitor)
+        self._subscribed = True
+
+    def _on_monitor(self, value=None, **kwargs):
+        values = self._values
+        field = kwargs.get("pvname", "").rpartition(".")[2]
+        # il primo evento di monitor porta il valore gia' letto: non invalida
+        if values is not None and values.get(field) == value:
+            return
+        self.invalidate()
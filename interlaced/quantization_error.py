@@ -0,0 +1,169 @@
+"""
+Analisi dell'errore di quantizzazione angolo -> impulsi.
+
+Al posto di stampare una riga per ogni angolo, ``analyze_quantization``
+calcola in modo vettorizzato le statistiche dell'arrotondamento
+np.round(theta * counts_per_rev / 360) (o degli impulsi passati con
+``pulses``, es. da quantizer.quantize_plan) e le restituisce in un
+``QuantizationReport``:
+
+- errore massimo, medio e RMS (gradi e counts)
+- deriva cumulativa dell'errore nell'ordine di acquisizione
+- istogramma dell'errore
+- statistiche per loop
+- un campione di righe (opzionale) da stampare come tabella
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+# ============================================================================
+#                          RISULTATO DELL'ANALISI
+# ============================================================================
+@dataclass
+class QuantizationReport:
+    counts_per_rev: float
+    n_angles: int
+
+    # errore actual - target [deg]
+    max_abs_error: float
+    mean_error: float
+    rms_error: float
+    max_abs_error_counts: float
+
+    # deriva cumulativa (somma degli errori nell'ordine di acquisizione) [deg]
+    cumulative_drift: np.ndarray
+    max_abs_drift: float
+
+    # istogramma dell'errore [deg]
+    hist_counts: np.ndarray
+    hist_edges: np.ndarray
+
+    # statistiche per loop (un elemento per loop presente)
+    loop_ids: np.ndarray
+    loop_n: np.ndarray
+    loop_max_abs_error: np.ndarray
+    loop_mean_error: np.ndarray
+    loop_rms_error: np.ndarray
+
+    # impulsi calcolati e righe campione (indice, target, impulso, actual, errore)
+    pulses: np.ndarray = field(repr=False)
+    sample_rows: np.ndarray = field(repr=False)
+
+    def summary(self):
+        """Riepilogo testuale: poche righe indipendentemente da N."""
+        lines = [
+            f"Angoli: {self.n_angles} | counts/giro: {self.counts_per_rev:g} "
+            f"| risoluzione: {360.0 / self.counts_per_rev:.6g} deg",
+            f"Errore max: {self.max_abs_error:.6g} deg ({self.max_abs_error_counts:.3f} counts) "
+            f"| medio: {self.mean_error:+.3g} deg | RMS: {self.rms_error:.6g} deg",
+            f"Deriva cumulativa max: {self.max_abs_drift:.6g} deg",
+        ]
+        if len(self.loop_ids) > 1:
+            lines.append(f"{'Loop':>6} | {'N':>8} | {'Max [deg]':>12} | {'Mean [deg]':>12} | {'RMS [deg]':>12}")
+            for k, n, mx, mean, rms in zip(self.loop_ids, self.loop_n, self.loop_max_abs_error,
+                                           self.loop_mean_error, self.loop_rms_error):
+                lines.append(f"{k + 1:6d} | {n:8d} | {mx:12.6f} | {mean:+12.6f} | {rms:12.6f}")
+        return "\n".join(lines)
+
+    def format_rows(self):
+        """Tabella delle sole righe campionate."""
+        lines = []
+        for i, a, p, act, err in self.sample_rows:
+            lines.append(f"[{int(i):8d}] Target: {a:10.4f} deg | Pulse: {int(p):10d} "
+                         f"| Actual: {act:12.6f} deg | Error: {err:+.6f} deg")
+        return "\n".join(lines)
+
+
+# ============================================================================
+#                              ANALISI
+# ============================================================================
+def analyze_quantization(angles, counts_per_rev, loops=None, bins=64, n_samples=0, pulses=None):
+    """
+    Quantizza gli angoli in impulsi e ne analizza l'errore.
+
+    Parametri:
+        angles         : angoli target [deg] nell'ordine di acquisizione
+        counts_per_rev : impulsi encoder per giro (PSOCountsPerRotation)
+        loops          : indice del loop per ogni angolo (None = un solo loop)
+        bins           : numero di intervalli dell'istogramma
+        n_samples      : righe da conservare per la stampa (0 = nessuna);
+                         sono equispaziate e includono quella di errore massimo
+        pulses         : impulsi gia' quantizzati (es. da quantizer.quantize_plan);
+                         se None si usa np.round
+
+    Ritorna:
+        QuantizationReport
+    """
+    angles = np.asarray(angles, dtype=np.float64).ravel()
+    n = len(angles)
+    if n == 0:
+        raise ValueError("Nessun angolo da analizzare")
+
+    pulses_per_degree = counts_per_rev / 360.0
+    if pulses is None:
+        pulses = np.round(angles * pulses_per_degree)
+    pulses = np.asarray(pulses).astype(np.int64).ravel()
+    if len(pulses) != n:
+        raise ValueError("'pulses' deve avere la stessa lunghezza di 'angles'")
+    actual = pulses / pulses_per_degree
+    error = actual - angles
+    abs_error = np.abs(error)
+
+    drift = np.cumsum(error)
+    hist_counts, hist_edges = np.histogram(error, bins=bins)
+
+    if loops is None:
+        loops = np.zeros(n, dtype=np.int64)
+    loops = np.asarray(loops, dtype=np.int64).ravel()
+    if len(loops) != n:
+        raise ValueError("'loops' deve avere la stessa lunghezza di 'angles'")
+
+    loop_ids, loop_stats = _per_loop_stats(loops, error)
+
+    i_max = int(np.argmax(abs_error))
+    return QuantizationReport(
+        counts_per_rev=float(counts_per_rev),
+        n_angles=n,
+        max_abs_error=float(abs_error[i_max]),
+        mean_error=float(error.mean()),
+        rms_error=float(np.sqrt(np.mean(error ** 2))),
+        max_abs_error_counts=float(abs_error[i_max] * pulses_per_degree),
+        cumulative_drift=drift,
+        max_abs_drift=float(np.abs(drift).max()),
+        hist_counts=hist_counts,
+        hist_edges=hist_edges,
+        loop_ids=loop_ids,
+        loop_n=loop_stats[0],
+        loop_max_abs_error=loop_stats[1],
+        loop_mean_error=loop_stats[2],
+        loop_rms_error=loop_stats[3],
+        pulses=pulses,
+        sample_rows=_sample_rows(n_samples, i_max, angles, pulses, actual, error),
+    )
+
+
+def _per_loop_stats(loops, error):
+    """Conteggio, max |err|, media e RMS per loop, senza cicli Python."""
+    order = np.argsort(loops, kind="stable")
+    sorted_loops = loops[order]
+    sorted_err = error[order]
+
+    starts = np.flatnonzero(np.r_[True, sorted_loops[1:] != sorted_loops[:-1]])
+    loop_ids = sorted_loops[starts]
+    loop_n = np.diff(np.r_[starts, len(sorted_loops)])
+
+    max_abs = np.maximum.reduceat(np.abs(sorted_err), starts)
+    mean = np.add.reduceat(sorted_err, starts) / loop_n
+    rms = np.sqrt(np.add.reduceat(sorted_err ** 2, starts) / loop_n)
+    return loop_ids, (loop_n, max_abs, mean, rms)
+
+
+def _sample_rows(n_samples, i_max, angles, pulses, actual, error):
+    if n_samples <= 0:
+        return np.empty((0, 5))
+    n = len(angles)
+    idx = np.unique(np.r_[np.linspace(0, n - 1, min(n_samples, n)).astype(np.int64), i_max])
+    return np.column_stack([idx, angles[idx], pulses[idx], actual[idx], error[idx]])
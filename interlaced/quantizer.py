@@ -0,0 +1,121 @@
+"""
+Quantizzatore angolo -> counts encoder con spaziatura minima garantita.
+
+np.round(theta * pulses_per_degree) arrotonda ogni angolo per conto suo:
+quando counts/grado non e' intero (es. 11_840_200 / 360) il prodotto in
+virgola mobile cade a volte appena sopra o sotto il .5 e l'arrotondamento
+"half to even" di NumPy sceglie un verso diverso da campione a campione,
+lasciando salti irregolari fra impulsi consecutivi. Con N vicino al limite
+dell'encoder due angoli possono anche finire sullo stesso count.
+
+``quantize_plan`` lavora sul piano ordinato:
+
+1. posizione esatta in counts x_i, arrotondata sempre "half up"
+   (se gli angoli stanno su una griglia di N passi per giro il conto e'
+   fatto in aritmetica intera, come un passo di Bresenham: k*C/N esatto);
+2. se due posizioni consecutive distano meno di ``min_spacing`` il
+   deficit viene distribuito attorno al punto che lo causa, prima e dopo,
+   invece di essere spinto solo in avanti: e' la regressione isotona
+   minimax di y_i = x_i - i*m (c_i >= c_{i-1} + m equivale a c_i - i*m
+   non decrescente), che ha forma chiusa
+
+       z_i = (max_{j<=i} y_j + min_{j>=i} y_j) / 2
+
+   e si calcola con un massimo cumulativo in avanti e un minimo
+   cumulativo all'indietro, tutto vettorizzato. I campioni che uscirebbero
+   da [0, ``max_count``] vengono spinti dentro.
+
+Errore garantito (lontano dai limiti 0 e ``max_count``), per ogni angolo:
+
+    |c_i - x_i| <= 1/2 + delta,   delta = max_{i<j} (y_i - y_j) / 2
+
+dove delta e' il minimo errore massimo ottenibile da *qualsiasi* piano
+(anche non intero) con spaziatura m: vale 0 se gli angoli esatti sono
+gia' distanti almeno m counts, e allora resta il mezzo count
+dell'arrotondamento; altrimenti e' meta' del deficit cumulato nel
+tratto peggiore, e non si accumula lungo il piano.
+"""
+
+import numpy as np
+
+
+def quantize_plan(theta, counts_per_rev, min_spacing=1, max_count=None, n_per_rev=None):
+    """
+    Converte gli angoli del piano in counts interi (int64).
+
+    Parametri:
+        theta          : angoli [deg], in qualsiasi ordine
+        counts_per_rev : counts encoder per giro (PSOCountsPerRotation)
+        min_spacing    : distanza minima in counts fra angoli consecutivi
+                         del piano ordinato (0 = nessun vincolo)
+        max_count      : count massimo ammesso (None = nessun limite)
+        n_per_rev      : se gli angoli sono multipli di 360/n_per_rev si usa
+                         il conto intero esatto k * counts_per_rev / n_per_rev
+
+    Ritorna:
+        counts nello stesso ordine di ``theta``
+    """
+    theta = np.asarray(theta, dtype=np.float64)
+    n = theta.size
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(theta, kind="stable")
+    counts = _round_half_up(theta[order], counts_per_rev, n_per_rev)
+
+    if min_spacing > 0 and n > 1:
+        lowest = min(0, counts[0])
+        x = theta[order] * counts_per_rev / 360.0
+        counts = _enforce_spacing(counts, x, min_spacing, lowest, max_count)
+        if counts[0] < lowest:
+            raise ValueError(f"{n} angoli con spaziatura {min_spacing} non entrano fra "
+                             f"{lowest} e {max_count} counts")
+
+    out = np.empty(n, dtype=np.int64)
+    out[order] = counts
+    return out
+
+
+def max_angles(counts_per_rev, min_spacing=1, span_deg=360.0):
+    """Numero massimo di angoli distinti in ``span_deg`` con la spaziatura data."""
+    return int(np.floor(abs(counts_per_rev) * span_deg / 360.0 / min_spacing))
+
+
+# ============================================================================
+#                               PASSI
+# ============================================================================
+def _round_half_up(theta_sorted, counts_per_rev, n_per_rev):
+    """Posizione in counts arrotondata a meta' count verso l'alto."""
+    if n_per_rev is not None and float(counts_per_rev).is_integer():
+        k = np.rint(theta_sorted * n_per_rev / 360.0).astype(np.int64)
+        if np.allclose(k * 360.0 / n_per_rev, theta_sorted, rtol=0, atol=1e-9):
+            # (2 k C + N) // 2N = floor(k C / N + 1/2) in interi esatti
+            C = np.int64(counts_per_rev)
+            N = np.int64(n_per_rev)
+            return (2 * k * C + N) // (2 * N)
+    x = theta_sorted * counts_per_rev / 360.0
+    return np.floor(x + 0.5).astype(np.int64)
+
+
+def _enforce_spacing(counts, x, m, min_count, max_count):
+    """
+    c_i >= c_{i-1} + m  equivale a  (c_i - i m) non decrescente.
+    Fit isotono minimax (centrato) di y = x - i m, poi arrotondamento
+    half up: dove y e' gia' non decrescente il fit coincide con y e si
+    tengono i counts arrotondati esatti. Se il fit scende sotto
+    ``min_count`` la testa viene spinta in avanti (massimo cumulativo), se
+    supera ``max_count`` la coda viene spinta indietro (minimo cumulativo).
+    """
+    step = np.arange(len(counts), dtype=np.int64) * m
+    y = x - step
+    fit = 0.5 * (np.maximum.accumulate(y) + np.minimum.accumulate(y[::-1])[::-1])
+
+    z = np.where(fit == y, counts - step, np.floor(fit + 0.5).astype(np.int64))
+    # i pari esatti di _round_half_up possono differire di un count dal
+    # float: nessun effetto salvo sui pareggi, ma la monotonia va garantita
+    z[0] = max(z[0], min_count)
+    z = np.maximum.accumulate(z)
+    if max_count is not None and z[-1] + step[-1] > max_count:
+        z[-1] = max_count - step[-1]
+        z = np.minimum.accumulate(z[::-1])[::-1]
+    return z + step
@@ -0,0 +1,365 @@
+"""
+Proiettore in avanti a matrice di sistema sparsa.
+
+``radon_projection`` degli script showblur ruota l'immagine intera una
+volta per angolo e somma le colonne: con piani interlacciati da
+centinaia di angoli sono centinaia di interpolazioni per frame. Qui la
+proiezione e' lineare e si scrive una volta sola come matrice sparsa A
+(n_angoli * n_det, size * size); ogni sinogramma e' un prodotto A @ x.
+
+Geometria (la stessa di backprojection.backproject):
+
+    t = x cos(theta) + y sin(theta),   x = colonna - c,  y = riga - c,
+    c = (size - 1) / 2 (centro di rotazione di scipy.ndimage.rotate)
+
+ogni pixel si distribuisce con interpolazione lineare sui due bin del
+rivelatore piu' vicini a t (la matrice trasposta e' la retroproiezione
+lineare).
+
+Le matrici sono in cache per (size, n_det, angoli): in memoria (LRU
+limitata in byte) e, solo con ``persist=True``, su disco in
+$XDG_CACHE_HOME/interlaced/radon/ come .npz (LRU limitata in numero di
+file e in byte). Gli script interattivi, che cambiano angoli di
+continuo, restano in memoria. Una pila di immagini si proietta in un solo prodotto, e
+``project_plans`` proietta piu' piani candidati sull'unione dei loro
+angoli.
+
+    sino = project(img, angles)                    # (n_angoli, n_det)
+    sinos = project(stack, angles)                 # (n_img, n_angoli, n_det)
+
+Quando l'insieme di angoli cambia spesso (slider del numero di
+proiezioni, interlacciamento golden on/off) conviene invece
+``ProjectionCache``: righe del sinogramma in cache per angolo,
+quantizzato ai counts dell'encoder, e proiezione senza matrice
+(``project_angles``) dei soli angoli nuovi.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .paths import cache_dir
+
+log = logging.getLogger(__name__)
+
+
+MEMORY_LIMIT = 1 << 30        # byte di matrici tenute in memoria
+DISK_FILES = 64               # matrici tenute su disco (le meno recenti vengono cancellate)
+DISK_LIMIT = 4 << 30          # byte di matrici tenute su disco
+_ANGLE_DECIMALS = 9           # angoli uguali fino a 1e-9 deg -> stessa matrice
+
+_memory = OrderedDict()       # chiave -> matrice CSR
+_memory_bytes = 0
+_lock = threading.Lock()
+
+
+def default_matrix_dir():
+    return cache_dir("radon")
+
+
+def matrix_key(size, angles, n_det=None):
+    """Chiave della matrice: hash di size, n_det e angoli arrotondati."""
+    n_det = size if n_det is None else n_det
+    angles = np.round(np.asarray(angles, dtype=np.float64).ravel(), _ANGLE_DECIMALS) + 0.0
+    digest = hashlib.sha1(angles.tobytes()).hexdigest()[:16]
+    return f"{size}x{n_det}_{len(angles)}_{digest}"
+
+
+# ============================================================================
+#                           COSTRUZIONE
+# ============================================================================
+def build_matrix(size, angles, n_det=None, dtype=np.float32, chunk=1 << 22):
+    """
+    Matrice CSR (n_angoli * n_det, size * size), riga = angolo * n_det + bin.
+    ``chunk`` limita le coppie (pixel, angolo) calcolate per blocco.
+    """
+    import scipy.sparse as sp
+
+    n_det = size if n_det is None else n_det
+    angles = np.asarray(angles, dtype=np.float64).ravel()
+    c = (size - 1) / 2.0
+    coord = np.arange(size) - c
+    X = np.tile(coord, size)                  # colonna del pixel (ordine C)
+    Y = np.repeat(coord, size)                # riga del pixel
+    c_det = (n_det - 1) / 2.0
+
+    # per colonna (pixel) due voci per angolo, gia' ordinate per riga:
+    # la matrice nasce CSC senza ordinamenti; fuori dal rivelatore peso 0
+    indices = np.empty((size * size, len(angles), 2), dtype=np.int64)
+    data = np.empty((size * size, len(angles), 2), dtype=dtype)
+    step = max(1, chunk // max(len(angles), 1))
+    theta = np.deg2rad(angles)
+    cos, sin = np.cos(theta), np.sin(theta)
+    base = np.arange(len(angles)) * n_det
+    for p0 in range(0, size * size, step):
+        sl = slice(p0, p0 + step)
+        t = X[sl, None] * cos + Y[sl, None] * sin + c_det
+        j0 = np.floor(t)
+        w1 = t - j0
+        j0 = j0.astype(np.int64)
+        for k, (j, w) in enumerate(((j0, 1 - w1), (j0 + 1, w1))):
+            inside = (j >= 0) & (j < n_det)
+            indices[sl, :, k] = base + np.clip(j, 0, n_det - 1)
+            data[sl, :, k] = np.where(inside, w, 0)
+
+    shape = (len(angles) * n_det, size * size)
+    indptr = np.arange(size * size + 1, dtype=np.int64) * (2 * len(angles))
+    A = sp.csc_matrix((data.ravel(), indices.ravel(), indptr), shape=shape).tocsr()
+    A.eliminate_zeros()
+    return A
+
+
+# ============================================================================
+#                               CACHE
+# ============================================================================
+def system_matrix(size, angles, n_det=None, persist=False, matrix_dir=None):
+    """
+    Matrice di sistema per (size, angoli, n_det): dalla cache in memoria,
+    poi dal disco (se ``persist``), altrimenti costruita (e con
+    ``persist`` salvata su disco).
+    """
+    key = matrix_key(size, angles, n_det)
+    with _lock:
+        A = _memory.get(key)
+        if A is not None:
+            _memory.move_to_end(key)
+            return A
+
+    A = None
+    path = os.path.join(matrix_dir or default_matrix_dir(), key + ".npz")
+    if persist:
+        A = _load(path)
+    if A is None:
+        A = build_matrix(size, angles, n_det)
+        if persist:
+            _save(path, A)
+    _remember(key, A)
+    return A
+
+
+def clear_cache(disk=False, matrix_dir=None):
+    """Svuota la cache in memoria (e con ``disk=True`` anche quella su disco)."""
+    global _memory_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+    if disk:
+        root = matrix_dir or default_matrix_dir()
+        for name in _npz_files(root):
+            os.remove(os.path.join(root, name))
+
+
+def _nbytes(A):
+    return A.data.nbytes + A.indices.nbytes + A.indptr.nbytes
+
+
+def _remember(key, A):
+    global _memory_bytes
+    with _lock:
+        if key in _memory:
+            return
+        _memory[key] = A
+        _memory_bytes += _nbytes(A)
+        while _memory_bytes > MEMORY_LIMIT and len(_memory) > 1:
+            _, old = _memory.popitem(last=False)
+            _memory_bytes -= _nbytes(old)
+
+
+def _npz_files(root):
+    try:
+        return [name for name in os.listdir(root) if name.endswith(".npz")]
+    except FileNotFoundError:
+        return []
+
+
+def _load(path):
+    import scipy.sparse as sp
+    try:
+        A = sp.load_npz(path).tocsr()
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        log.warning("Matrice %s illeggibile (%r), la ricostruisco", path, exc)
+        return None
+    os.utime(path)                      # per la pulizia LRU su disco
+    return A
+
+
+def _save(path, A):
+    import scipy.sparse as sp
+    root = os.path.dirname(path)
+    try:
+        os.makedirs(root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            sp.save_npz(f, A, compressed=False)
+        os.replace(tmp, path)
+    except OSError as exc:
+        log.warning("Impossibile salvare la matrice %s (%r)", path, exc)
+        return
+    _prune(root)
+
+
+def _prune(root):
+    # LRU su disco: dalla piu' recente si tengono al massimo DISK_FILES
+    # matrici e DISK_LIMIT byte; la piu' recente (appena salvata) resta
+    files = []
+    for name in _npz_files(root):
+        path = os.path.join(root, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort(reverse=True)
+    total = 0
+    for i, (_, nbytes, path) in enumerate(files):
+        total += nbytes
+        if i > 0 and (i >= DISK_FILES or total > DISK_LIMIT):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ============================================================================
+#                               PROIEZIONE
+# ============================================================================
+def project(img, angles, n_det=None, persist=False):
+    """
+    Sinogramma di ``img`` (size, size) -> (n_angoli, n_det), oppure di una
+    pila (..., size, size) -> (..., n_angoli, n_det) con un solo prodotto.
+    """
+    img = np.asarray(img)
+    size = img.shape[-1]
+    if img.shape[-2] != size:
+        raise ValueError(f"Immagine non quadrata: {img.shape[-2:]}")
+    n_det = size if n_det is None else n_det
+    angles = np.asarray(angles, dtype=np.float64).ravel()
+    A = system_matrix(size, angles, n_det, persist=persist)
+
+    lead = img.shape[:-2]
+    x = img.reshape(-1, size * size).T          # una colonna per immagine
+    sino = (A @ x).T
+    return sino.reshape(lead + (len(angles), n_det))
+
+
+def project_plans(img, plans, n_det=None, persist=False):
+    """
+    Sinogrammi di ``img`` per piu' piani candidati (liste di angoli):
+    una sola matrice sull'unione degli angoli, poi selezione delle righe.
+    Ritorna una lista di sinogrammi nell'ordine di ``plans``.
+    """
+    plans = [np.round(np.asarray(p, dtype=np.float64).ravel(), _ANGLE_DECIMALS) for p in plans]
+    union, inverse = np.unique(np.concatenate(plans), return_inverse=True)
+    sino = project(img, union, n_det, persist=persist)
+    splits = np.cumsum([len(p) for p in plans])[:-1]
+    return [sino[..., rows, :] for rows in np.split(inverse, splits)]
+
+
+# ============================================================================
+#                       CACHE PER ANGOLO (SENZA MATRICE)
+# ============================================================================
+def project_angles(img, angles, n_det=None):
+    """
+    Proiezione senza matrice, angolo per angolo, con gli stessi pesi di
+    ``build_matrix`` (np.bincount dei due contributi lineari). Nessun
+    costo di costruzione: adatta a pochi angoli nuovi alla volta.
+    """
+    img = np.asarray(img, dtype=np.float64)
+    size = img.shape[-1]
+    n_det = size if n_det is None else n_det
+    angles = np.asarray(angles, dtype=np.float64).ravel()
+    c = (size - 1) / 2.0
+    coord = np.arange(size) - c
+    X = np.tile(coord, size)
+    Y = np.repeat(coord, size)
+    values = img.ravel()
+    # bin allargati fino alla diagonale: ogni pixel cade dentro, poi si ritaglia
+    pad = int(np.ceil(max(0.0, (size - 1) * np.sqrt(2) - (n_det - 1)) / 2)) + 2
+    length = n_det + 2 * pad + 1
+
+    sino = np.empty((len(angles), n_det))
+    theta = np.deg2rad(angles)
+    for i, (cos, sin) in enumerate(zip(np.cos(theta), np.sin(theta))):
+        t = X * cos + Y * sin + ((n_det - 1) / 2.0 + pad)
+        j0 = np.floor(t)
+        w1 = values * (t - j0)
+        j0 = j0.astype(np.intp)
+        row = np.bincount(j0, values - w1, minlength=length)
+        row[1:] += np.bincount(j0, w1, minlength=length)[:length - 1]
+        sino[i] = row[pad:pad + n_det]
+    return sino
+
+
+class ProjectionCache:
+    """
+    Righe del sinogramma in cache per (immagine, angolo in counts encoder),
+    con limite LRU di ``maxsize`` righe.
+
+    Gli angoli vengono quantizzati come li vede il PSO
+    (fpga_table.to_counts, modulo un giro): due angoli nello stesso count
+    condividono la riga, e la riga e' calcolata all'angolo del count.
+    Cambiando il numero di proiezioni si proiettano solo gli angoli nuovi.
+
+    Parametri:
+        counts_per_rev : counts encoder per giro (PSOCountsPerRotation)
+        maxsize        : righe tenute al massimo
+        n_det          : bin del rivelatore (default: lato dell'immagine)
+        project        : (img, angles, n_det) -> righe; default project_angles
+    """
+
+    def __init__(self, counts_per_rev=11_840_200, maxsize=4096, n_det=None, project=None):
+        self.counts_per_rev = int(counts_per_rev)
+        self.maxsize = maxsize
+        self.n_det = n_det
+        self.project = project or project_angles
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()        # (chiave immagine, count) -> riga
+        self._lock = threading.Lock()
+
+    def sinogram(self, img, angles):
+        """Sinogramma (n_angoli, n_det) di ``img``, dalle righe in cache."""
+        from .fpga_table import to_counts
+
+        img = np.asarray(img)
+        n_det = img.shape[-1] if self.n_det is None else self.n_det
+        image = (img.shape, n_det, hashlib.sha1(np.ascontiguousarray(img).tobytes()).hexdigest())
+        counts = np.mod(to_counts(angles, self.counts_per_rev), self.counts_per_rev)
+        unique, inverse = np.unique(counts, return_inverse=True)
+
+        rows = {}
+        with self._lock:
+            for count in unique.tolist():
+                row = self._rows.get((image, count))
+                if row is not None:
+                    self._rows.move_to_end((image, count))
+                    rows[count] = row
+        missing = np.array([count for count in unique.tolist() if count not in rows], dtype=np.int64)
+        if len(missing):
+            new = self.project(img, missing * (360.0 / self.counts_per_rev), n_det)
+            rows.update(zip(missing.tolist(), new))
+            with self._lock:
+                for count, row in zip(missing.tolist(), new):
+                    self._rows[(image, count)] = row
+                while len(self._rows) > self.maxsize:
+                    self._rows.popitem(last=False)
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        table = np.stack([rows[count] for count in unique.tolist()]) if len(unique) \
+            else np.zeros((0, n_det))
+        return table[inverse.ravel()]
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+    def __len__(self):
+        return len(self._rows)
@@ -0,0 +1,288 @@
+import argparse
+import numpy as np
+import math
+
+from .plan_export import export_plan
+from .quantizer import quantize_plan
+from .fpga_table import to_counts, write_fpga_table
+from .profiling import StageProfiler
+
+
+# ============================================================================
+#                     CLASSE InterlacedScan (UFFICIALE)
+# ============================================================================
+
+class InterlacedScan:
+
+    """
+    Classe finale che produce:
+    - theta_interlaced ordinati (TIMBIR)
+    - theta_interlaced_real (corretti tramite taxi) e t_interlaced_real (istanti)
+    - pulses_interlaced_ideal
+    - pulses_interlaced_real
+    - file pulses.bin compatibile con FPGA
+    - esportazione del piano completo (CSV / NPZ / HDF5)
+    - grafici diagnostici
+    - tempi e dimensioni per fase di compute() in ``metrics``
+
+    Indipendente da EPICS e Tomoscan.
+    """
+
+    def __init__(self,
+                 N_theta=32,
+                 K=4,
+                 PSOCountsPerRotation=20000,
+                 accel=5,
+                 decel=5,
+                 omega_target=10,
+                 dt=1e-4,
+                 quantizer="round",
+                 min_count_spacing=1,
+                 profile=True):
+
+        self.N_theta = N_theta
+        self.K = K
+        self.PSOCountsPerRotation = PSOCountsPerRotation
+
+        self.accel = accel
+        self.decel = decel
+        self.omega_target = omega_target
+        self.dt = dt
+
+        self.pulses_per_degree = PSOCountsPerRotation / 360.0
+
+        # "round"     : np.round indipendente per ogni angolo
+        # "diffusion" : quantize_plan, half-up esatto + spaziatura minima
+        if quantizer not in ("round", "diffusion"):
+            raise ValueError(f"Quantizzatore '{quantizer}' non valido (round, diffusion)")
+        self.quantizer = quantizer
+        self.min_count_spacing = min_count_spacing
+
+        # pochi microsecondi per fase: attivo di default
+        self.profiler = StageProfiler(enabled=profile)
+        self.metrics = {}
+
+    # ============================================================================
+    #                       BIT–REVERSAL (TIMBIR)
+    # ============================================================================
+    def bit_reverse(self, n, bits):
+        b = f'{n:0{bits}b}'
+        return int(b[::-1], 2)
+
+    def generate_timbir_angles(self):
+        bits = int(np.log2(self.N_theta))
+        theta = np.array([self.bit_reverse(n, bits) * 360.0 / self.N_theta
+                          for n in range(self.N_theta)])
+        return np.sort(theta)   # ORDINATI QUI
+
+    def loop_indices(self, theta=None):
+        """
+        Loop TIMBIR (0 .. K-1) di ogni angolo del piano ordinato.
+
+        Nell'acquisizione il loop k visita gli indici di griglia
+        j = n*K + bitrev(k), quindi j mod K = bitrev(k) e, essendo il
+        bit-reversal un'involuzione, k = bitrev(j mod K). L'indice
+        nel piano ordinato non basta: i % K non e' il loop.
+        """
+        theta = self.theta_interlaced if theta is None else np.asarray(theta, dtype=np.float64)
+        bits = int(np.log2(self.K))
+        rev = np.array([self.bit_reverse(r, bits) if bits else 0 for r in range(self.K)])
+        j = np.rint(theta * self.N_theta / 360.0).astype(np.int64) % self.N_theta
+        return rev[j % self.K]
+
+    # ============================================================================
+    #                       TAXI MODEL (θ(t))
+    # ============================================================================
+    def simulate_taxi_motion(self):
+        accel = self.accel
+        decel = self.decel
+        omega_target = self.omega_target
+        dt = self.dt
+        theta_total = 360.0
+
+        # Accelerazione
+        T_acc = omega_target / accel
+        t_acc = np.arange(0, T_acc, dt)
+        theta_acc = 0.5 * accel * t_acc**2
+
+        # Plateau
+        theta_flat_len = theta_total - 2 * theta_acc[-1]
+        T_flat = theta_flat_len / omega_target
+        t_flat = np.arange(0, T_flat, dt)
+        theta_flat = theta_acc[-1] + omega_target * t_flat
+
+        # Decelerazione
+        T_dec = omega_target / decel
+        t_dec = np.arange(0, T_dec, dt)
+        theta_dec = theta_flat[-1] + omega_target*t_dec - 0.5*decel*t_dec**2
+
+        # Concatenazione
+        t_vec = np.concatenate([t_acc,
+                                t_acc[-1]+t_flat,
+                                t_acc[-1]+t_flat[-1]+t_dec])
+
+        theta_vec = np.concatenate([theta_acc, theta_flat, theta_dec])
+
+        return t_vec, theta_vec
+
+    # ============================================================================
+    #                     INVERSIONE θ(t) → t(θ)
+    # ============================================================================
+    def invert_theta(self, theta_vec, t_vec, theta_targets):
+        return np.interp(theta_targets, theta_vec, t_vec)
+
+    # ============================================================================
+    #                    ANGOLO → IMPULSI ASSOLUTI
+    # ============================================================================
+    # counts assoluti int64: la riduzione a 32 bit avviene solo nella
+    # tabella FPGA (fpga_table), con i marker di fine giro
+    def convert_to_counts(self, theta):
+        if self.quantizer == "diffusion":
+            return quantize_plan(theta, self.PSOCountsPerRotation,
+                                 min_spacing=self.min_count_spacing,
+                                 n_per_rev=self.N_theta)
+        return to_counts(theta, self.PSOCountsPerRotation)
+
+    # ============================================================================
+    #                          PIPELINE COMPLETA
+    # ============================================================================
+    def compute(self):
+
+        prof = self.profiler
+        prof.reset()
+
+        # --- TIMBIR + ordinamento ---
+        with prof.stage("timbir", n_angles=self.N_theta):
+            self.theta_interlaced = self.generate_timbir_angles()
+
+        # --- TAXI MODEL ---
+        with prof.stage("taxi_motion") as st:
+            t_vec, theta_vec = self.simulate_taxi_motion()
+            st["n_samples"] = len(t_vec)
+
+        # tempo in cui viene raggiunto ogni angolo
+        # (tenuto per il confronto con l'encoder durante la scansione)
+        with prof.stage("invert_theta", n_angles=len(self.theta_interlaced)):
+            t_real = self.invert_theta(theta_vec, t_vec, self.theta_interlaced)
+        self.t_interlaced_real = t_real
+
+        # angolo reale calcolato
+        with prof.stage("interp_real", n_angles=len(t_real)):
+            self.theta_interlaced_real = np.interp(t_real, t_vec, theta_vec)
+
+        # --- IMPULSI ---
+        with prof.stage("counts_ideal", n_angles=len(self.theta_interlaced)):
+            self.pulses_interlaced_ideal = self.convert_to_counts(self.theta_interlaced)
+        with prof.stage("counts_real", n_angles=len(self.theta_interlaced_real)):
+            self.pulses_interlaced_real  = self.convert_to_counts(self.theta_interlaced_real)
+
+        self.metrics = prof.metrics()
+        return self
+
+    # ============================================================================
+    #                    A) SCRITTURA pulses.bin
+    # ============================================================================
+    def save_pulses_bin(self, filename="pulses.bin", use_real=True):
+
+        data = self.pulses_interlaced_real if use_real else self.pulses_interlaced_ideal
+
+        # uint32 little-endian per FPGA, posizione nel giro + WRAP_MARKER
+        table = write_fpga_table(filename, data, self.PSOCountsPerRotation)
+
+        print(f"\n✔ File '{filename}' salvato ({len(data)} impulsi, {len(table)} parole).")
+
+    # ============================================================================
+    #             B) GRAFICI DIAGNOSTICI
+    # ============================================================================
+    def plot_diagnostics(self):
+        import matplotlib.pyplot as plt   # solo per i grafici, non serve al planner
+
+        err_deg = self.theta_interlaced_real - self.theta_interlaced
+        err_counts = self.pulses_interlaced_real - self.pulses_interlaced_ideal
+        t = np.arange(len(self.theta_interlaced))
+
+        plt.figure(figsize=(14, 6))
+        plt.plot(t, self.theta_interlaced, 'o-', label="Ideale (TIMBIR)")
+        plt.plot(t, self.theta_interlaced_real, 'o-', label="Reale (Taxi)")
+        plt.title("Angoli: ideale vs taxi-corretti")
+        plt.xlabel("Indice acquisizione")
+        plt.ylabel("Angolo (°)")
+        plt.grid(); plt.legend()
+
+        plt.figure(figsize=(14, 6))
+        plt.plot(t, err_deg, 'o-')
+        plt.title("Errore angolare (real - ideal)")
+        plt.xlabel("Indice"); plt.ylabel("Errore (°)")
+        plt.grid()
+
+        plt.figure(figsize=(14, 6))
+        plt.plot(t, err_counts, 'o-')
+        plt.title("Errore impulsi (real - ideal)")
+        plt.xlabel("Indice"); plt.ylabel("Counts")
+        plt.grid()
+
+        plt.show()
+
+        print("\n✔ Grafici diagnostici generati.")
+
+    # ============================================================================
+    #              C) ESPORTAZIONE PIANO (CSV / NPZ / HDF5)
+    # ============================================================================
+    def plan_metadata(self):
+        return {
+            "N_theta": self.N_theta,
+            "K": self.K,
+            "PSOCountsPerRotation": self.PSOCountsPerRotation,
+            "accel": self.accel,
+            "decel": self.decel,
+            "omega_target": self.omega_target,
+            "dt": self.dt,
+            "quantizer": self.quantizer,
+            "min_count_spacing": self.min_count_spacing,
+        }
+
+    def save_plan(self, filename="plan.npz", fmt=None, **kwargs):
+        """
+        Salva angoli ideali/reali e impulsi ideali/reali in un solo file.
+        Il formato segue l'estensione (.csv, .npz, .h5) oppure ``fmt``.
+        """
+        export_plan(filename,
+                    self.theta_interlaced,
+                    self.theta_interlaced_real,
+                    self.pulses_interlaced_ideal,
+                    self.pulses_interlaced_real,
+                    metadata=self.plan_metadata(),
+                    fmt=fmt,
+                    **kwargs)
+
+        print(f"\n✔ Piano salvato in '{filename}' ({len(self.theta_interlaced)} righe).")
+
+
+# ============================================================================
+#                             RIGA DI COMANDO
+# ============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Compute an interlaced (TIMBIR) scan plan.")
+    parser.add_argument("--N", type=int, default=32, help="Number of projections (power of 2)")
+    parser.add_argument("--K", type=int, default=4, help="Number of interlaced loops")
+    parser.add_argument("--counts", type=int, default=20000, help="Encoder counts per rotation")
+    parser.add_argument("--quantizer", choices=("round", "diffusion"), default="round", help="Angle to count quantizer")
+    parser.add_argument("--save", metavar="FILE", help="Save the plan (.csv, .npz or .h5)")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage wall/CPU times and sizes")
+    parser.add_argument("--trace", metavar="FILE", help="Write per-stage timings as Chrome trace JSON")
+    args = parser.parse_args()
+
+    scan = InterlacedScan(N_theta=args.N, K=args.K, PSOCountsPerRotation=args.counts,
+                          quantizer=args.quantizer).compute()
+
+    if args.save:
+        scan.save_plan(args.save)
+    if args.profile:
+        print(scan.profiler.summary())
+    if args.trace:
+        scan.profiler.write_chrome_trace(args.trace)
+        print(f"✔ Trace salvata in '{args.trace}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Precalcolo dei piani in parallelo alla scansione in corso.
+
+Mentre un campione ruota la CPU e' ferma. ``PlanScheduler`` calcola in
+un worker (thread, o processo separato con ``use_process=True``) il
+piano del campione successivo in coda: angoli, taxi, moto reale e
+tabella impulsi (InterlacedScan.compute + encode_fpga_table). I piani
+pronti passano attraverso una coda limitata (``max_ready``): il worker
+si ferma quando e' troppo avanti e la scansione successiva si arma
+appena finisce quella corrente.
+
+    with PlanScheduler() as scheduler:
+        for sample in samples:
+            scheduler.submit(sample, N_theta=1024, K=4)
+        for _ in samples:
+            plan = scheduler.next_plan()
+            acquire(plan)            # intanto il worker calcola il prossimo
+"""
+
+import queue
+import threading
+from collections import namedtuple
+
+from .fpga_table import encode_fpga_table
+from .scan import InterlacedScan
+
+
+PlannedScan = namedtuple("PlannedScan", "sample scan fpga_table")
+
+_STOP = object()
+
+
+def compute_plan(sample, scan_kwargs):
+    """Piano completo di un campione (funzione di modulo: va anche in un processo)."""
+    scan = InterlacedScan(**scan_kwargs).compute()
+    table = encode_fpga_table(scan.pulses_interlaced_real, scan.PSOCountsPerRotation)
+    return PlannedScan(sample, scan, table)
+
+
+class PlanScheduler:
+    """
+    Coda di richieste -> worker -> coda limitata di piani pronti.
+
+    Parametri:
+        max_ready   : piani calcolati tenuti pronti al massimo
+        use_process : calcola in un processo separato (niente GIL condiviso
+                      con l'acquisizione); il piano torna per pickle
+        compute     : funzione (sample, scan_kwargs) -> piano
+                      (default compute_plan)
+    """
+
+    def __init__(self, max_ready=1, use_process=False, compute=None):
+        self.compute = compute or compute_plan
+        self._requests = queue.Queue()
+        self._ready = queue.Queue(maxsize=max_ready)
+        self._executor = None
+        if use_process:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        self._worker = threading.Thread(target=self._run, name="plan-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, sample, **scan_kwargs):
+        """Accoda il calcolo del piano di ``sample`` (argomenti di InterlacedScan)."""
+        self._requests.put((sample, scan_kwargs))
+
+    def next_plan(self, timeout=None):
+        """
+        Prossimo piano pronto, nell'ordine di ``submit``. Se il calcolo e'
+        fallito l'eccezione del worker viene rilanciata qui.
+        """
+        item = self._ready.get(timeout=timeout)
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    @property
+    def pending(self):
+        """Richieste non ancora prese dal worker."""
+        return self._requests.qsize()
+
+    def close(self, wait=True):
+        """Ferma il worker; le richieste non ancora iniziate vengono scartate."""
+        while True:
+            try:
+                self._requests.get_nowait()
+            except queue.Empty:
+                break
+        self._requests.put(_STOP)
+        if wait:
+            # libera il worker se e' bloccato sulla coda piena
+            while self._worker.is_alive():
+                try:
+                    self._ready.get_nowait()
+                except queue.Empty:
+                    pass
+                self._worker.join(timeout=0.05)
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is _STOP:
+                return
+            sample, scan_kwargs = request
+            try:
+                if self._executor is not None:
+                    plan = self._executor.submit(self.compute, sample, scan_kwargs).result()
+                else:
+                    plan = self.compute(sample, scan_kwargs)
+            except Exception as exc:
+                plan = exc
+            self._ready.put(plan)
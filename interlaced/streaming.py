@@ -0,0 +1,170 @@
+"""
+Ricostruzione in streaming, un frame per loop interlacciato.
+
+Con un campione dinamico ognuno dei K loop TIMBIR e' un istante di
+tempo. ``StreamingReconstructor`` consuma le proiezioni nell'ordine di
+acquisizione e:
+
+- filtra ogni riga appena arriva (rampa in cache, interlaced.fbp) e la
+  retroproietta a piccoli lotti nell'accumulatore del suo loop;
+- quando un loop si chiude emette un frame: la somma degli accumulatori
+  degli ultimi ``window`` loop (finestra scorrevole, somma mantenuta
+  aggiungendo il loop nuovo e togliendo il piu' vecchio).
+
+Niente viene ricalcolato da capo: alla chiusura di un loop restano al
+massimo ``batch`` righe da retroproiettare piu' una somma di immagini,
+quindi la latenza per frame e' limitata dal lavoro di un loop.
+
+    stream = acquisition_stream(phantom, *timbir_sequence(N, K))
+    rec = StreamingReconstructor(size, window=2, on_frame=show)
+    for angle, row, loop in stream:
+        rec.push(angle, row, loop)
+    rec.flush()
+
+Il peso per angolo e' pi / (angoli nella finestra), esatto per angoli
+equispaziati come quelli di una finestra TIMBIR.
+"""
+
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from .backprojection import Backprojector
+from .fbp import filter_sinogram
+
+Frame = namedtuple("Frame", "index loops image n_angles latency")
+
+
+def timbir_sequence(N_theta, K):
+    """
+    Angoli [deg, 0-360) e loop di ogni proiezione in ordine di acquisizione,
+    come generate_interlaced_timbir: il loop k parte dallo sfasamento
+    bit-reversed di k.
+    """
+    bits = int(np.log2(K))
+    n = np.arange(N_theta)
+    loops = (n * K // N_theta) % K
+    rev = np.array([int(f"{k:0{bits}b}"[::-1], 2) if bits else 0 for k in range(K)])
+    angles = ((n * K + rev[loops]) % N_theta) * 360.0 / N_theta
+    return angles, loops
+
+
+def acquisition_stream(phantom, angles, loops, project=None):
+    """
+    Proiezioni simulate (angolo, riga, loop) in ordine di acquisizione.
+    ``phantom`` e' un'immagine fissa o una funzione loop -> immagine
+    (campione dinamico); ogni loop e' proiettato solo quando serve.
+    """
+    if project is None:
+        from .radon import project_angles as project
+    angles = np.asarray(angles, dtype=np.float64)
+    loops = np.asarray(loops)
+    start = 0
+    while start < len(angles):
+        loop = loops[start]
+        stop = start
+        while stop < len(angles) and loops[stop] == loop:
+            stop += 1
+        image = phantom(int(loop)) if callable(phantom) else phantom
+        rows = project(image, angles[start:stop])
+        for angle, row in zip(angles[start:stop], rows):
+            yield float(angle), row, int(loop)
+        start = stop
+
+
+class StreamingReconstructor:
+    """
+    Parametri:
+        size        : lato dell'immagine ricostruita
+        n_det       : bin del rivelatore (default size)
+        window      : loop per frame (1 = un frame per loop)
+        filter_name : filtro FBP (None = retroproiezione semplice)
+        batch       : righe retroproiettate insieme dentro un loop
+        per_loop    : proiezioni attese per loop; se dato il frame esce
+                      appena il loop e' completo, altrimenti al primo
+                      angolo del loop successivo (o a ``flush``)
+        on_frame    : callback(Frame) per ogni frame emesso
+    """
+
+    def __init__(self, size, n_det=None, window=1, filter_name="shepp-logan", batch=8,
+                 per_loop=None, on_frame=None):
+        self.size = int(size)
+        self.n_det = self.size if n_det is None else int(n_det)
+        self.window = int(window)
+        self.filter_name = filter_name
+        self.batch = int(batch)
+        self.per_loop = per_loop
+        self.on_frame = on_frame
+        self.frames = []
+
+        self._current = None            # loop in corso
+        self._accumulator = None        # retroproiezione del loop in corso
+        self._count = 0                 # proiezioni del loop in corso
+        self._pending = []              # (angolo, riga filtrata) non ancora retroproiettate
+        self._closed = deque()          # (loop, accumulatore, proiezioni) nella finestra
+        self._window_sum = np.zeros((self.size, self.size))
+        self._window_count = 0
+
+    # ------------------------------------------------------------------
+    # ingresso
+    # ------------------------------------------------------------------
+    def push(self, angle, row, loop):
+        """Aggiunge una proiezione; ritorna il Frame se ne chiude uno, altrimenti None."""
+        frame = None
+        if self._current is not None and loop != self._current:
+            frame = self._close_loop()
+        if self._current is None:
+            self._current = loop
+            self._accumulator = np.zeros((self.size, self.size))
+            self._count = 0
+
+        row = np.asarray(row, dtype=np.float64)
+        if self.filter_name is not None:
+            row = filter_sinogram(row[None, :], self.filter_name)[0]
+        self._pending.append((float(angle), row))
+        self._count += 1
+        if len(self._pending) >= self.batch:
+            self._backproject_pending()
+        if self.per_loop is not None and self._count >= self.per_loop:
+            frame = self._close_loop()
+        return frame
+
+    def flush(self):
+        """Chiude il loop in corso (fine acquisizione); ritorna il suo Frame o None."""
+        if self._current is None:
+            return None
+        return self._close_loop()
+
+    # ------------------------------------------------------------------
+    # accumulo
+    # ------------------------------------------------------------------
+    def _backproject_pending(self):
+        if not self._pending:
+            return
+        angles = [angle for angle, _ in self._pending]
+        rows = np.stack([row for _, row in self._pending])
+        bp = Backprojector(self.size, angles, self.n_det, dtype=np.float64, threads=1)
+        self._accumulator += bp(rows, weights=1.0)
+        self._pending = []
+
+    def _close_loop(self):
+        t0 = time.perf_counter()
+        self._backproject_pending()
+        self._closed.append((self._current, self._accumulator, self._count))
+        self._window_sum += self._accumulator
+        self._window_count += self._count
+        while len(self._closed) > self.window:
+            _, old, count = self._closed.popleft()
+            self._window_sum -= old
+            self._window_count -= count
+        self._current, self._accumulator, self._count = None, None, 0
+
+        scale = np.pi / self._window_count if self.filter_name is not None else 1.0 / self._window_count
+        image = self._window_sum * scale
+        frame = Frame(len(self.frames), tuple(loop for loop, _, _ in self._closed), image,
+                      self._window_count, time.perf_counter() - t0)
+        self.frames.append(frame)
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        return frame
@@ -0,0 +1,70 @@
+"""
+Angoli TIMBIR e correzione del taxi degli script di tomo_interlaced.
+
+Erano in ``tomo_interlaced/puzzle.py``; ``simulamotor.py`` li importava
+con ``from puzzle import ...``, che funziona solo lanciando lo script da
+quella cartella. Qui li usano entrambi.
+
+    angles, loops = timbir_angles(N_theta=32, K=4)
+    pulses, pulse_end, theta, theta_end = taxi_correct(angles, -0.75, 0.75, 11_840_200)
+"""
+
+import numpy as np
+
+
+# ----------------------------------------------------
+# BIT-REVERSAL
+# ----------------------------------------------------
+def bit_reverse(x, bits):
+    b = f'{x:0{bits}b}'
+    return int(b[::-1], 2)
+
+
+# ----------------------------------------------------
+# TIMBIR
+# ----------------------------------------------------
+def timbir_angles(N_theta, K):
+    """(angoli [deg] in 0-180, loop di ogni angolo) nell'ordine di acquisizione."""
+    angles_timbir = []
+    loop_indices = []
+    bits = int(np.log2(K))
+
+    for n in range(N_theta):
+        base = n * K
+        loop = (base // N_theta) % K
+        rev = bit_reverse(loop, bits)
+        val = base + rev
+
+        theta = val * 360.0 / N_theta       # angolo 0-360°
+        theta = theta % 180.0               # 0-180° per tomografia
+
+        angles_timbir.append(theta)
+        loop_indices.append(loop)
+
+    return np.array(angles_timbir), np.array(loop_indices)
+
+
+# ----------------------------------------------------
+# TAXI CORRECTION: theta_corrected = angoli TIMBIR corretti
+# ----------------------------------------------------
+def taxi_correct(angles_deg, start_taxi, end_taxi, counts_per_rev):
+    """
+    Sposta gli angoli di |start_taxi| e calcola lo stop a 180 + end_taxi.
+
+    Ritorna (impulsi corretti, impulso di stop, angoli corretti, angolo di stop).
+    """
+    pulse_per_deg = counts_per_rev / 360.0  # fattore di conversione
+
+    theta_corrected = []
+    pulses_corrected = []
+
+    # correzione start taxi -> shift angolare
+    for theta in angles_deg:
+        theta_corr = theta + abs(start_taxi)
+        theta_corrected.append(theta_corr)
+        pulses_corrected.append(theta_corr * pulse_per_deg)
+
+    # correzione fine taxi
+    theta_end_corrected = 180.0 + end_taxi     # posizione angolare in cui il trigger deve fermarsi
+    pulses_end_corrected = theta_end_corrected * pulse_per_deg    # dopo questo stop alla generazione di trigger
+    return np.array(pulses_corrected, dtype=int), int(pulses_end_corrected), theta_corrected, theta_end_corrected
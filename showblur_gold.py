@@ -1,7 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider, CheckButtons
-from scipy.ndimage import rotate
+
+from interlaced.blur import rotation_blur
+from interlaced.fbp import fbp
+from interlaced.interactive import BackgroundWorker, SimulationPipeline
+from interlaced.radon import ProjectionCache
 
 # ============================================
 # Funzioni di base
@@ -31,36 +35,21 @@ def generate_object(size=200, mode='cross'):
 
     return img
 
-def simulate_blur(img, exposure, angular_velocity, n_samples=50):
-    total_angle = angular_velocity * exposure
-    angles = np.linspace(-total_angle/2, total_angle/2, n_samples)
-    blurred = np.zeros_like(img)
-    for a in angles:
-        blurred += rotate(img, a, reshape=False, order=1)
-    blurred /= n_samples
-    return blurred
+def simulate_blur(img, exposure, angular_velocity):
+    """Simula il blur durante la rotazione (convoluzione lungo theta in coordinate polari)"""
+    return rotation_blur(img, angular_velocity * exposure)
+
+# righe del sinogramma in cache per angolo (in counts encoder): cambiando
+# "Num Proj per Serie" o il toggle golden si proiettano solo gli angoli nuovi
+projection_cache = ProjectionCache()
 
 def radon_projection(img, angles):
-    sino = []
-    for a in angles:
-        rotated = rotate(img, a, reshape=False, order=1)
-        projection = np.sum(rotated, axis=0)
-        sino.append(projection)
-    return np.array(sino)
-
-def simple_backprojection(sino, angles):
-    size = sino.shape[1]
-    recon = np.zeros((size, size))
-    center = size // 2
-    x = np.arange(size) - center
-    X, Y = np.meshgrid(x, x)
-    for i, angle in enumerate(angles):
-        t = X * np.cos(np.deg2rad(angle)) + Y * np.sin(np.deg2rad(angle))
-        t_index = (t + center).astype(int)
-        mask = (t_index >= 0) & (t_index < size)
-        recon[mask] += sino[i, t_index[mask]]
-    recon /= len(angles)
-    return recon
+    """Calcola proiezioni semplici (sinogramma) riusando le righe gia' calcolate"""
+    return projection_cache.sinogram(img, angles)
+
+def filtered_backprojection(sino, angles, filter_name='shepp-logan'):
+    """Retroproiezione filtrata, con pesi per angolo per i set non uniformi"""
+    return fbp(sino, angles, filter_name)
 
 def golden_interlaced_angles(theta_start, num_proj, golden_a=180*(3 - np.sqrt(5))/2):
     golden_angles_tomo = np.mod(
@@ -93,9 +82,14 @@ def compute_angles(num_proj, use_golden):
 
 angles = compute_angles(num_proj_init, use_golden)
 
-blurred = simulate_blur(obj, exposure_init, velocity_init)
-sino = radon_projection(blurred, angles)
-recon = simple_backprojection(sino, angles)
+# ogni fase in cache per i suoi input; i ricalcoli girano in background
+# use_sinogram_blur: media a finestra di un sinogramma fine calcolato una volta
+# (esposizione e velocita' senza riproiettare; il primo pannello mostra l'oggetto)
+use_sinogram_blur = False
+pipeline = SimulationPipeline(obj, simulate_blur, radon_projection, filtered_backprojection,
+                              sinogram_blur=use_sinogram_blur)
+worker = BackgroundWorker(pipeline.run)
+blurred, sino, recon = pipeline.run(exposure_init, velocity_init, angles)
 
 # ============================================
 # Visualizzazione
@@ -110,7 +104,7 @@ im2 = axes[1].imshow(sino, cmap='gray', aspect='auto')
 axes[1].set_title('Sinogramma')
 
 im3 = axes[2].imshow(recon, cmap='gray')
-axes[2].set_title('Ricostruzione')
+axes[2].set_title('Ricostruzione (FBP)')
 
 # Slider
 ax_expo = plt.axes([0.25, 0.25, 0.65, 0.03])
@@ -133,16 +127,23 @@ def update(val):
     global use_golden
 
     angles = compute_angles(num_proj, use_golden)
-
-    blurred_new = simulate_blur(obj, exp, vel)
-    sino_new = radon_projection(blurred_new, angles)
-    recon_new = simple_backprojection(sino_new, angles)
-
+    worker.submit(exp, vel, angles)
+
+# Risultati del worker, applicati nel thread della GUI
+def show_result():
+    result = worker.poll()
+    if result is None:
+        return
+    blurred_new, sino_new, recon_new = result
     im1.set_data(blurred_new)
     im2.set_data(sino_new)
     im3.set_data(recon_new)
     fig.canvas.draw_idle()
 
+timer = fig.canvas.new_timer(interval=50)
+timer.add_callback(show_result)
+timer.start()
+
 slider_expo.on_changed(update)
 slider_speed.on_changed(update)
 slider_numproj.on_changed(update)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from interlaced.backprojection import Backprojector, backproject
+
+sp = pytest.importorskip("scipy.sparse")
+from interlaced.radon import system_matrix  # noqa: E402
+
+
+def _sino(n_angles, n_det, seed=0):
+    return np.random.default_rng(seed).random((n_angles, n_det))
+
+
+def test_is_the_transpose_of_the_system_matrix():
+    size, angles = 32, np.linspace(0, 180, 24, endpoint=False)
+    sino = _sino(len(angles), size)
+    A = system_matrix(size, angles)
+    expected = (A.T @ sino.ravel()).reshape(size, size)
+    recon = backproject(sino, angles, weights=1.0, dtype=np.float64)
+    np.testing.assert_allclose(recon, expected, rtol=1e-6)          # matrice float32
+
+
+def test_default_weights_average_over_angles():
+    angles = np.linspace(0, 180, 10, endpoint=False)
+    sino = _sino(10, 24)
+    np.testing.assert_allclose(backproject(sino, angles), backproject(sino, angles, weights=1.0) / 10,
+                               rtol=1e-5)
+
+
+def test_blocks_and_threads_do_not_change_the_result():
+    angles = np.linspace(0, 180, 37, endpoint=False)
+    sino = _sino(37, 40, seed=1)
+    reference = Backprojector(40, angles, threads=1, max_block_bytes=1 << 24, dtype=np.float64)(sino)
+    for block_bytes, threads in ((4096, 1), (4096, 3), (1 << 16, 2)):
+        bp = Backprojector(40, angles, threads=threads, max_block_bytes=block_bytes, dtype=np.float64)
+        assert bp.block < 37 or bp.rows < 40 or threads > 1
+        np.testing.assert_allclose(bp(sino), reference, rtol=1e-12, atol=1e-12)
+
+
+def test_stacks_and_wide_detector():
+    angles = np.linspace(0, 180, 12, endpoint=False)
+    bp = Backprojector(20, angles, n_det=28)
+    stack = np.stack([_sino(12, 28, seed=s) for s in range(3)])
+    out = bp(stack)
+    assert out.shape == (3, 20, 20)
+    np.testing.assert_allclose(out[2], bp(stack[2]), rtol=1e-6)
+    with pytest.raises(ValueError):
+        bp(_sino(12, 20))
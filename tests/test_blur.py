@@ -0,0 +1,143 @@
+import time
+
+import numpy as np
+import pytest
+
+from interlaced.blur import PolarBlur, SinogramBlur, base_sinogram, motion_windows, rotation_blur
+from interlaced.radon import project_angles
+
+scipy_ndimage = pytest.importorskip("scipy.ndimage")
+
+
+def _cross(size=200):
+    img = np.zeros((size, size))
+    c = size // 2
+    img[c - 2:c + 2, :] = 1
+    img[:, c - 2:c + 2] = 1
+    return img
+
+
+def _rotate_blur(img, total_angle, n_samples=50):
+    # blur degli script prima del motore polare: media di 50 rotazioni
+    blurred = np.zeros_like(img)
+    for a in np.linspace(-total_angle / 2, total_angle / 2, n_samples):
+        blurred += scipy_ndimage.rotate(img, a, reshape=False, order=1)
+    return blurred / n_samples
+
+
+@pytest.mark.parametrize("total_angle", [2.0, 10.0, 30.0])
+def test_matches_the_rotate_average(total_angle):
+    img = _cross()
+    blurred = rotation_blur(img, total_angle)
+    reference = _rotate_blur(img, total_angle)
+    rms = np.sqrt(np.mean((blurred - reference) ** 2))
+    assert rms < 1e-2 * reference.max()
+    assert np.abs(blurred - reference).mean() < 0.04 * np.abs(reference).mean()
+
+
+def test_oversampling_reduces_the_error_on_a_square():
+    img = np.zeros((200, 200))
+    img[75:125, 75:125] = 1
+    reference = _rotate_blur(img, 10.0)
+    error = [np.linalg.norm(PolarBlur(img.shape, oversample).blur(img, 10.0) - reference)
+             / np.linalg.norm(reference) for oversample in (1.0, 2.0)]
+    assert error[1] < error[0] and error[1] < 0.015
+
+
+def test_faster_than_the_rotate_average():
+    img = _cross()
+    rotation_blur(img, 10.0)                 # griglia in cache
+    t0 = time.perf_counter()
+    for _ in range(5):
+        rotation_blur(img, 10.0)
+    polar = (time.perf_counter() - t0) / 5
+    t0 = time.perf_counter()
+    _rotate_blur(img, 10.0)
+    rotate = time.perf_counter() - t0
+    assert rotate > 5 * polar
+
+
+def test_zero_angle_and_stacks():
+    img = _cross(64)
+    np.testing.assert_allclose(rotation_blur(img, 0.0), img, atol=1e-6)
+    stack = np.stack([img, 2 * img])
+    blurred = rotation_blur(stack, 15.0)
+    assert blurred.shape == stack.shape
+    np.testing.assert_allclose(blurred[1], rotation_blur(2 * img, 15.0), rtol=1e-5, atol=1e-6)
+
+
+def test_centered_blob_is_rotation_invariant():
+    yy, xx = np.mgrid[0:128, 0:128] - 63.5
+    blob = np.exp(-(yy ** 2 + xx ** 2) / (2 * 12.0 ** 2))
+    engine = PolarBlur(blob.shape)
+    # il blur non cambia un oggetto a simmetria circolare (oltre al ricampionamento)
+    np.testing.assert_allclose(engine.blur(blob, 40.0), engine.from_polar(engine.to_polar(blob)), atol=1e-3)
+
+
+def _dense_average(sb, start, end, n=4001):
+    # media numerica (trapezi fitti) delle righe interpolate, riferimento per average()
+    rows = sb.at(np.linspace(start, end, n))
+    return (rows[1:-1].sum(axis=0) + 0.5 * (rows[0] + rows[-1])) / (n - 1)
+
+
+def test_sinogram_nodes_and_periodicity():
+    img = _cross(64)
+    sb = SinogramBlur(img, step=1.0)
+    nodes = np.array([0.0, 17.0, 90.0, 179.0])
+    np.testing.assert_allclose(sb.at(nodes), project_angles(img, nodes, 64), atol=1e-9)
+    # p(theta + 180, t) = p(theta, -t), anche oltre il giro e per angoli negativi
+    theta = np.array([3.3, 47.5, 121.25])
+    np.testing.assert_allclose(sb.at(theta + 180.0), sb.at(theta)[:, ::-1], atol=1e-12)
+    np.testing.assert_allclose(sb.at(theta + 720.0), sb.at(theta), atol=1e-12)
+    np.testing.assert_allclose(sb.at(theta - 360.0), sb.at(theta), atol=1e-12)
+
+
+def test_average_is_the_integral_of_the_interpolation():
+    sb = SinogramBlur(_cross(64), step=1.0)
+    start = np.array([10.2, 170.0, 355.5, -4.0])
+    end = np.array([12.7, 195.0, 367.25, 3.0])         # anche a cavallo di 180 e 360 gradi
+    out = sb.average(start, end)
+    for i in range(len(start)):
+        np.testing.assert_allclose(out[i], _dense_average(sb, start[i], end[i]), rtol=1e-5, atol=1e-8)
+
+
+def test_zero_width_average_is_the_row():
+    sb = SinogramBlur(_cross(64), step=0.5)
+    theta = np.array([0.0, 12.3, 200.1])
+    np.testing.assert_allclose(sb.average(theta, theta), sb.at(theta))
+    np.testing.assert_allclose(sb.blur(theta, 0.0), sb.at(theta))
+
+
+def test_sinogram_blur_matches_image_blur():
+    yy, xx = np.mgrid[0:64, 0:64] - 31.5
+    img = np.exp(-((yy - 10) ** 2 + (xx + 6) ** 2) / (2 * 4.0 ** 2))
+    angles = np.array([0.0, 30.0, 75.0, 140.0])
+    sino = SinogramBlur(img, step=0.25).blur(angles, 20.0)
+    reference = project_angles(rotation_blur(img, 20.0), angles, 64)
+    assert np.sqrt(np.mean((sino - reference) ** 2)) < 2e-2 * reference.max()
+    # per proiezione: larghezze diverse, quella nulla resta la riga esatta
+    widths = np.array([0.0, 5.0, 10.0, 20.0])
+    rows = SinogramBlur(img, step=0.25).blur(angles, widths)
+    np.testing.assert_allclose(rows[0], project_angles(img, angles[:1], 64)[0], atol=1e-9)
+    np.testing.assert_allclose(rows[3], sino[3])
+
+
+def test_motion_windows_are_narrower_on_the_ramps():
+    # 0 -> 1 s accelerazione fino a 90 deg/s, poi velocita' costante
+    t = np.linspace(0.0, 3.0, 3001)
+    theta = np.where(t < 1.0, 45.0 * t ** 2, 45.0 + 90.0 * (t - 1.0))
+    start, end = motion_windows(t, theta, [0.1, 0.5, 1.5, 2.5], 0.1)
+    width = end - start
+    np.testing.assert_allclose(width[2:], 9.0, atol=1e-6)
+    assert width[0] < width[1] < width[2]
+    np.testing.assert_allclose(start, np.interp([0.1, 0.5, 1.5, 2.5], t, theta))
+
+
+def test_base_sinogram_is_cached_by_content():
+    img = _cross(32)
+    first = base_sinogram(img, step=1.0)
+    assert base_sinogram(img.copy(), step=1.0) is first
+    assert base_sinogram(img, step=0.5) is not first
+    other = img.copy()
+    other[0, 0] = 1.0
+    assert base_sinogram(other, step=1.0) is not first
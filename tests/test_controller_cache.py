@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+
+from interlaced.controller_cache import CACHE_VERSION, ControllerCache
+from interlaced.pso import TABLE_PV, cached_counts_per_rotation, program_pso, refresh_counts_per_rotation
+from interlaced.pso_simulator import PSOSimulator
+from interlaced.pv_pool import PVPool
+
+
+def _cache(tmp_path):
+    return ControllerCache(str(tmp_path / "controller.json"))
+
+
+def test_put_get_invalidate(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("A3200", "X") is None
+    cache.put("A3200", "X", counts_per_rev=11_840_200.0)
+    cache.put("A3200", "Y", counts_per_rev=20_000.0)
+    assert cache.get("A3200", "X")["counts_per_rev"] == 11_840_200.0
+    assert cache.get("A3200", "X", max_age=60) is not None
+    time.sleep(0.01)
+    assert cache.get("A3200", "X", max_age=0.001) is None
+
+    cache.invalidate("A3200", "X")
+    assert cache.get("A3200", "X") is None and cache.get("A3200", "Y") is not None
+    cache.invalidate()
+    assert cache.get("A3200", "Y") is None
+
+
+def test_other_version_or_corrupt_file_is_ignored(tmp_path, caplog):
+    cache = _cache(tmp_path)
+    with open(cache.path, "w") as f:
+        json.dump({"version": CACHE_VERSION + 1, "entries": {"A3200/X": {"counts_per_rev": 1.0}}}, f)
+    assert cache.get("A3200", "X") is None
+    with open(cache.path, "w") as f:
+        f.write("{non json")
+    with caplog.at_level(logging.WARNING, logger="interlaced.controller_cache"):
+        assert cache.get("A3200", "X") is None
+    cache.put("A3200", "X", counts_per_rev=5.0)
+    assert cache.get("A3200", "X")["counts_per_rev"] == 5.0
+
+
+def test_miss_queries_synchronously_and_hit_skips_the_controller(tmp_path):
+    cache = _cache(tmp_path)
+    sim = PSOSimulator(counts_per_rev=11_840_200)
+    pool = PVPool(sim.PV)
+    assert cached_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0) == 11_840_200
+    assert sim.n_commands == 1
+    assert cache.get("A3200", "X")["counts_per_rev"] == 11_840_200
+
+    sim = PSOSimulator(counts_per_rev=11_840_200)
+    assert cached_counts_per_rotation(cache, PVPool(sim.PV), sim.prefix, timeout=1.0) == 11_840_200
+    assert sim.n_commands == 0
+    assert sim["PSOCountsPerRotation"] == 11_840_200
+
+
+def test_unsupported_model_stores_nothing(tmp_path):
+    cache = _cache(tmp_path)
+    sim = PSOSimulator(counts_per_rev=20_000, model="Ensemble")
+    pool = PVPool(sim.PV)
+    assert cached_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0) is None
+    assert refresh_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0) is None
+    assert cache._read() == {}
+
+
+def test_refresh_updates_only_the_cache(tmp_path, caplog):
+    cache = _cache(tmp_path)
+    cache.put("A3200", "X", counts_per_rev=11_840_200.0)
+    sim = PSOSimulator(counts_per_rev=11_840_200)
+    pool = PVPool(sim.PV)
+    sim.set(sim.prefix + "PSOCountsPerRotation", 1.0)
+
+    refresh_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0, background=False)
+    assert sim.n_commands == 1
+    assert sim["PSOCountsPerRotation"] == 1.0          # PV non toccato
+    assert cache.get("A3200", "X")["counts_per_rev"] == 11_840_200
+
+    # il controller risponde diversamente: voce invalidata, PV non toccato
+    sim.counts_per_rev = 11_840_000
+    with caplog.at_level(logging.ERROR, logger="interlaced.controller_cache"):
+        refresh_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0, background=False)
+    assert cache.get("A3200", "X") is None
+    assert sim["PSOCountsPerRotation"] == 1.0
+    assert any("invalidata" in r.getMessage() for r in caplog.records)
+
+    # la programmazione successiva rifa' la richiesta sincrona
+    assert cached_counts_per_rotation(cache, pool, sim.prefix, timeout=1.0) == 11_840_000
+    assert sim["PSOCountsPerRotation"] == 11_840_000
+
+
+def test_program_pso_refreshes_after_programming(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("A3200", "X", counts_per_rev=11_840_200.0)
+    sim = PSOSimulator(counts_per_rev=11_840_200, N_theta=64, K=4)
+    seen = []
+    command = sim.put_hooks[sim.prefix + "PSOCommand.BOUT"]
+
+    def on_command(server, value):
+        # stato della programmazione quando il canale di comando viene usato
+        seen.append((int(server[TABLE_PV + "Length"]), server["RotationStep"]))
+        command(server, value)
+
+    sim.put_hooks[sim.prefix + "PSOCommand.BOUT"] = on_command
+    result = program_pso(PVPool(sim.PV), prefix=sim.prefix, timeout=1.0, cache=cache)
+    cache.refresh_thread.join(2.0)
+
+    assert result.counts_per_rev == 11_840_200
+    assert seen == [(result.n_words, result.rotation_step)]
+    assert cache.get("A3200", "X")["counts_per_rev"] == 11_840_200
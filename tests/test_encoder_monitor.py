@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from interlaced.encoder_monitor import DriftTracker, EncoderMonitor, RingBuffer, SyntheticEncoderPV
+from interlaced.scan import InterlacedScan
+from interlaced.streaming import timbir_sequence
+
+
+@pytest.fixture(scope="module")
+def scan():
+    return InterlacedScan(N_theta=64, K=4, omega_target=60, accel=120, decel=120, dt=1e-3).compute()
+
+
+def test_loop_indices_follow_timbir_order(scan):
+    angles, loops = timbir_sequence(scan.N_theta, scan.K)
+    expected = dict(zip(np.rint(angles * scan.N_theta / 360.0).astype(int), loops))
+    grid = np.rint(scan.theta_interlaced * scan.N_theta / 360.0).astype(int)
+    np.testing.assert_array_equal(scan.loop_indices(), [expected[j] for j in grid])
+    # nel piano ordinato l'indice modulo K non e' il loop
+    assert not np.array_equal(scan.loop_indices(), np.arange(scan.N_theta) % scan.K)
+
+
+def test_ring_buffer_keeps_the_newest_samples():
+    buf = RingBuffer(8)
+    for i in range(20):
+        buf.append(float(i), float(i))
+    times, values, start, head = buf.read(0)
+    assert head == 20 and start == 13
+    np.testing.assert_array_equal(values, np.arange(13, 20))
+
+
+def test_synthetic_drift_is_recovered(scan):
+    drift = 0.02                                     # deg/s
+    source = SyntheticEncoderPV.from_scan(scan, rate_hz=2000.0, drift_deg_per_s=drift,
+                                          noise_deg=1e-4, time_scale=20.0, seed=1)
+    monitor = EncoderMonitor(source, capacity=1 << 16).start()
+    # timestamp del moto a partire da 0: t0 del tracker noto
+    tracker = DriftTracker.from_scan(monitor.buffer, scan, t0=0.0, period=0.01).start()
+    source.start(t0=0.0)
+    source.join(timeout=10.0)
+    assert source.finished.is_set()
+    tracker.stop()
+    monitor.stop()
+
+    assert tracker.done and tracker.lost == 0
+    expected = drift * scan.t_interlaced_real
+    np.testing.assert_allclose(tracker.errors, expected, atol=2e-3)
+
+    stats = tracker.stats()
+    loops = scan.loop_indices()
+    assert np.array_equal(stats["n"], np.bincount(loops))
+    for k in range(scan.K):
+        assert stats["mean"][k] == pytest.approx(expected[loops == k].mean(), abs=1e-3)
+
+
+def test_drift_tracker_requires_one_loop_per_trigger():
+    with pytest.raises(ValueError):
+        DriftTracker(RingBuffer(4), [0.0, 1.0], [0.0, 1.0], [0])
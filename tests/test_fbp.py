@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from interlaced.fbp import FILTERS, FBP, angle_weights, fbp, filter_sinogram, ramp_filter
+from interlaced.radon import project_angles
+
+
+def _disk(size=200, radius=60):
+    yy, xx = np.mgrid[0:size, 0:size] - (size - 1) / 2.0
+    r = np.hypot(yy, xx)
+    return (r < radius).astype(float), r
+
+
+@pytest.mark.parametrize("filter_name", FILTERS)
+def test_disk_phantom_error(filter_name):
+    disk, r = _disk()
+    angles = np.linspace(0, 180, 360, endpoint=False)
+    recon = fbp(project_angles(disk, angles), angles, filter_name)
+    # ~8% sul disco intero, quasi tutto sul bordo netto
+    assert np.linalg.norm(recon - disk) / np.linalg.norm(disk) < 0.10
+    assert recon[r < 55].mean() == pytest.approx(1.0, abs=0.01)
+    assert np.abs(recon[(r > 65) & (r < 95)]).mean() < 0.02
+
+
+def test_weights_for_nonuniform_angles():
+    np.testing.assert_allclose(angle_weights(np.linspace(0, 180, 8, endpoint=False)), np.pi / 8)
+    rng = np.random.default_rng(0)
+    assert angle_weights(rng.uniform(0, 360, 50)).sum() == pytest.approx(np.pi)
+    # angolo ripetuto: la cella si divide, il totale resta pi
+    assert angle_weights([0.0, 0.0, 90.0]).sum() == pytest.approx(np.pi)
+
+    # meta' semicerchio campionato 4 volte piu' fitto: i pesi correggono
+    disk, _ = _disk(128, 40)
+    angles = np.r_[np.linspace(0, 90, 60, endpoint=False), np.linspace(90, 180, 15, endpoint=False)]
+    sino = project_angles(disk, angles)
+    error = lambda recon: np.linalg.norm(recon - disk) / np.linalg.norm(disk)
+    weighted = error(fbp(sino, angles, "shepp-logan"))
+    uniform = error(fbp(sino, angles, "shepp-logan", weights=np.full(len(angles), np.pi / len(angles))))
+    assert weighted < 0.15 < uniform
+
+
+def test_filter_responses():
+    ramp = ramp_filter(64)
+    assert not ramp.flags.writeable
+    # rampa discreta: piccola ma non nulla in continua, cresce fino a f_max
+    assert 0 < ramp[0] < 0.01
+    assert np.all(np.diff(ramp) > 0)
+    assert np.all(ramp_filter(64, "shepp-logan") <= ramp + 1e-12)
+    assert ramp_filter(64, "hann")[-1] == pytest.approx(0.0, abs=1e-12)
+    # riga costante sul rivelatore: filtrata ~0 lontano dai bordi
+    row = filter_sinogram(np.ones((1, 64)))
+    assert np.abs(row[0, 24:40]).max() < 0.02
+
+
+def test_reusable_reconstructor_and_unknown_filter():
+    angles = np.linspace(0, 180, 30, endpoint=False)
+    sino = project_angles(_disk(64, 20)[0], angles)
+    np.testing.assert_allclose(FBP(64, angles, filter_name="hann")(sino), fbp(sino, angles, "hann"))
+    with pytest.raises(ValueError):
+        FBP(64, angles, filter_name="cosine")
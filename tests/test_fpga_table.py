@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from interlaced.fpga_table import (WRAP_MARKER, decode_fpga_table, encode_fpga_table, read_fpga_table,
+                                   to_counts, write_fpga_table)
+
+
+def test_docstring_example():
+    table = encode_fpga_table([100, 19990, 20010, 60005], 20000)
+    np.testing.assert_array_equal(table, [100, 19990, WRAP_MARKER, 10, WRAP_MARKER, WRAP_MARKER, 5])
+
+
+def test_round_trip_over_many_revolutions():
+    C = 11_840_200
+    rng = np.random.default_rng(0)
+    # ~1000 giri: oltre il limite di un uint32 (~362 giri)
+    counts = np.cumsum(rng.integers(0, 3 * C, 2000, dtype=np.int64))
+    assert counts[-1] > np.iinfo(np.uint32).max
+    table = encode_fpga_table(counts, C)
+    assert table.dtype == np.uint32
+    assert table[table != WRAP_MARKER].max() < C
+    np.testing.assert_array_equal(decode_fpga_table(table, C), counts)
+
+
+def test_markers_one_per_completed_revolution():
+    C = 1000
+    counts = np.array([2500, 2999, 3000, 7001])
+    table = encode_fpga_table(counts, C)
+    markers = np.flatnonzero(table == WRAP_MARKER)
+    # 2 marker iniziali (primo count nel giro 2), 1 prima di 3000, 4 prima di 7001
+    np.testing.assert_array_equal(markers, [0, 1, 4, 6, 7, 8, 9])
+    assert len(table) == len(counts) + 7
+
+
+def test_file_round_trip(tmp_path):
+    counts = to_counts(np.linspace(0, 1080, 97), 20000)
+    path = tmp_path / "pulses.bin"
+    write_fpga_table(path, counts, 20000)
+    assert path.stat().st_size == 4 * len(encode_fpga_table(counts, 20000))
+    np.testing.assert_array_equal(read_fpga_table(path, 20000), counts)
+
+
+@pytest.mark.parametrize("counts_per_rev", [0, -20000, 2**32 - 1, 2**33, 1000.5])
+def test_invalid_counts_per_rev(counts_per_rev):
+    with pytest.raises(ValueError):
+        encode_fpga_table([1, 2, 3], counts_per_rev)
+
+
+def test_decreasing_revolutions_rejected():
+    with pytest.raises(ValueError):
+        encode_fpga_table([25000, 100], 20000)
+    with pytest.raises(ValueError):
+        encode_fpga_table([-5], 20000)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from interlaced.interactive import BackgroundWorker, SimulationPipeline, StageCache
+
+
+def _wait_result(worker, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = worker.poll()
+        if result is not None:
+            return result
+        time.sleep(0.005)
+    raise AssertionError("nessun risultato dal worker")
+
+
+def test_debounce_runs_only_the_last_request():
+    calls = []
+
+    def fn(value, check):
+        calls.append(value)
+        return value
+
+    worker = BackgroundWorker(fn, debounce=0.05)
+    try:
+        for value in range(10):
+            worker.submit(value)
+            time.sleep(0.005)
+        assert _wait_result(worker) == 9
+        assert calls == [9]
+    finally:
+        worker.close(1.0)
+
+
+def test_newer_request_cancels_the_running_one():
+    started = threading.Event()
+
+    def fn(value, check):
+        if value == "slow":
+            started.set()
+            for _ in range(400):
+                time.sleep(0.005)
+                check()
+        return value
+
+    worker = BackgroundWorker(fn, debounce=0.0)
+    try:
+        worker.submit("slow")
+        assert started.wait(1.0)
+        worker.submit("fast")
+        assert _wait_result(worker) == "fast"
+        assert worker.n_cancelled == 1
+        assert worker.poll() is None            # il risultato vecchio non arriva mai
+        assert not worker.busy
+    finally:
+        worker.close(1.0)
+
+
+def test_failure_is_raised_by_poll():
+    def fn(check):
+        raise ValueError("fase fallita")
+
+    worker = BackgroundWorker(fn, debounce=0.0)
+    try:
+        worker.submit()
+        with pytest.raises(ValueError, match="fase fallita"):
+            _wait_result(worker)
+    finally:
+        worker.close(1.0)
+
+
+def test_stage_cache_lru():
+    cache = StageCache(maxsize=2)
+    assert cache.get("a", lambda: 1) == 1
+    assert cache.get("b", lambda: 2) == 2
+    assert cache.get("a", lambda: -1) == 1          # hit, "a" diventa la piu' recente
+    assert cache.get("c", lambda: 3) == 3           # esce "b"
+    assert len(cache) == 2
+    assert cache.get("b", lambda: 4) == 4
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_pipeline_reuses_blur_when_only_angles_change():
+    obj = np.ones((8, 8))
+    pipeline = SimulationPipeline(obj, blur=lambda img, e, v: img * (1 + e * v),
+                                  project=lambda img, angles: np.outer(angles, img.sum(0)),
+                                  reconstruct=lambda sino, angles: sino.sum(0))
+    pipeline.run(0.1, 10.0, [0.0, 90.0])
+    pipeline.run(0.1, 10.0, [0.0, 45.0, 90.0])
+    pipeline.run(0.1, 10.0, [0.0, 90.0])
+    assert pipeline.stats() == {"blur": (2, 1), "sinogram": (1, 2), "reconstruction": (1, 2)}
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from interlaced.fpga_table import decode_fpga_table
+from interlaced.orchestrator import ScanOrchestrator, tomoscan_steps
+from interlaced.pso_simulator import PSOSimulator
+from interlaced.pv_pool import PVPool
+
+
+def test_tomoscan_steps_arm_the_simulator():
+    sim = PSOSimulator(N_theta=128, K=4, motor_speed=50.0, table_nelm=64)
+    orch = tomoscan_steps(PVPool(sim.PV), prefix=sim.prefix, motor=sim.motor, camera=sim.camera,
+                          nelm=64, timeouts={"arm_camera": 2.0})
+    results = orch.run()
+    try:
+        assert results["arm_camera"] is True
+        assert sim.values[sim.camera + "AcquireBusy"] == 1
+        assert sim.values[sim.camera + "TriggerMode"] == "External"
+        assert sim.values[sim.motor + ".RBV"] == pytest.approx(sim["PSOStartTaxi"])
+        decoded = decode_fpga_table(sim.pulse_table, results["counts"])
+        np.testing.assert_array_equal(decoded, results["plan"].pulses_interlaced_real)
+    finally:
+        sim.PV(sim.camera + "Acquire").put(0, wait=True)
+
+
+def test_timed_out_step_stops_before_run_returns():
+    orch = ScanOrchestrator()
+    finished = threading.Event()
+
+    def slow(results):
+        for _ in range(200):
+            time.sleep(0.005)
+            orch.check()
+        finished.set()
+
+    orch.add("slow", slow, timeout=0.05)
+    t0 = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        orch.run()
+    # run ritorna a passo fermo, molto prima della sua fine naturale
+    assert time.perf_counter() - t0 < 0.5
+    assert orch.cancelled.is_set() and not finished.is_set()
+
+
+def test_many_uploads_in_parallel_do_not_deadlock():
+    # piu' passi che thread nei pool PV: ognuno rilegge la tabella su un
+    # pool a parte, quindi nessun passo aspetta un posto occupato da un altro
+    from interlaced.pso import write_table
+    from interlaced.pv_access import FakePVServer
+
+    values = {}
+    for i in range(24):
+        values[f"t:T{i}Length"] = 0
+        values.update((f"t:T{i}{j:02d}", np.zeros(0, dtype=np.uint32)) for j in range(4))
+    pool = PVPool(FakePVServer(values, get_latency=0.002).PV)
+    table = np.arange(50, dtype=np.uint32)
+
+    orch = ScanOrchestrator()
+    for i in range(24):
+        orch.add(f"upload{i}", lambda results, i=i: write_table(
+            table, pool, prefix="t:", name=f"T{i}", nelm=16, n_records=4, timeout=2.0), timeout=5.0)
+    results = orch.run()
+    assert all(upload.n_chunks == 4 for upload in results.values())
+
+
+def test_cached_counts_are_checked_only_after_arming(tmp_path):
+    from interlaced.controller_cache import ControllerCache
+
+    cache = ControllerCache(str(tmp_path / "controller.json"))
+    cache.put("A3200", "X", counts_per_rev=11_840_200.0)
+    sim = PSOSimulator(N_theta=64, K=4, table_nelm=64)
+    orch = tomoscan_steps(PVPool(sim.PV), prefix=sim.prefix, motor=sim.motor, camera=sim.camera,
+                          nelm=64, cache=cache, timeouts={"arm_camera": 2.0})
+    try:
+        orch.run()
+        cache.refresh_thread.join(2.0)
+        armed = max(orch.timeline[name][1] for name in
+                    ("upload_table", "encoder_step", "move_to_start", "arm_camera"))
+        assert orch.timeline["refresh_counts"][0] >= armed
+        assert sim.n_commands == 1
+        assert cache.get("A3200", "X")["counts_per_rev"] == 11_840_200
+    finally:
+        sim.PV(sim.camera + "Acquire").put(0, wait=True)
+
+
+def _assert_disarmed(sim):
+    assert sim.values[sim.camera + "Acquire"] == 0
+    assert sim.values[sim.camera + "AcquireBusy"] == 0
+    assert sim.values[sim.camera + "TriggerMode"] == "Internal"
+    assert sim.values[sim.camera + "ImageMode"] == "Single"
+    # moto interrotto: fermo prima dello start taxi (3 s a 0.25 deg/s)
+    assert sim.values[sim.motor + ".DMOV"] == 1
+    assert sim.values[sim.motor + ".RBV"] > sim["PSOStartTaxi"]
+
+
+def test_timed_out_upload_disarms_camera_and_stops_motor():
+    sim = PSOSimulator(N_theta=128, K=4, motor_speed=0.25, table_nelm=64)
+    orch = tomoscan_steps(PVPool(sim.PV), prefix=sim.prefix, motor=sim.motor, camera=sim.camera,
+                          nelm=64, timeouts={"upload_table": 1e-4, "arm_camera": 2.0})
+    t0 = time.perf_counter()
+    try:
+        with pytest.raises(TimeoutError, match="upload_table"):
+            orch.run()
+        assert time.perf_counter() - t0 < 1.0
+        _assert_disarmed(sim)
+    finally:
+        sim.PV(sim.camera + "Acquire").put(0, wait=True)
+
+
+def test_failure_after_arming_restores_the_camera():
+    sim = PSOSimulator(N_theta=128, K=4, motor_speed=0.25, table_nelm=64)
+    armed = []
+
+    def reject_when_armed(server, value):
+        # il PSO rifiuta il passo solo dopo che la camera e' armata
+        deadline = time.monotonic() + 2.0
+        while server.values[sim.camera + "AcquireBusy"] != 1 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        armed.append(server.values[sim.camera + "TriggerMode"])
+        raise ValueError("passo encoder rifiutato")
+
+    sim.put_hooks[sim.prefix + "PSOEncoderCountsPerStep"] = reject_when_armed
+    orch = tomoscan_steps(PVPool(sim.PV), prefix=sim.prefix, motor=sim.motor, camera=sim.camera,
+                          nelm=64, timeouts={"arm_camera": 2.0})
+    t0 = time.perf_counter()
+    try:
+        with pytest.raises(RuntimeError, match="encoder_step"):
+            orch.run()
+        assert time.perf_counter() - t0 < 1.0
+        assert armed == ["External"]
+        _assert_disarmed(sim)
+    finally:
+        sim.PV(sim.camera + "Acquire").put(0, wait=True)
+
+
+def test_cleanups_run_only_on_failure():
+    calls = []
+    orch = ScanOrchestrator().add_cleanup(lambda: calls.append("first"))
+    orch.add_cleanup(lambda: 1 / 0).add_cleanup(lambda: calls.append("last"))
+    orch.add("ok", lambda results: 1)
+    orch.run()
+    assert calls == []
+
+    orch.add("fail", lambda results: 1 / 0, after="ok")
+    with pytest.raises(RuntimeError, match="fail"):
+        orch.run()
+    # ordine inverso, un errore in una cleanup non ferma le altre
+    assert calls == ["last", "first"]
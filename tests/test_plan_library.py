@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from interlaced import plan_library as pl
+
+RECIPE = (64, 4, "timbir", 20000)
+REPO = Path(pl.__file__).resolve().parents[1]
+
+
+def test_key_includes_defaults():
+    assert pl.plan_key(*RECIPE) == pl.plan_key(*RECIPE, motion={"accel": 5})
+    assert pl.plan_key(*RECIPE, motion={"accel": 5}) == pl.plan_key(*RECIPE, motion={"accel": 5.0})
+    assert pl.plan_key(*RECIPE) != pl.plan_key(*RECIPE, motion={"accel": 10})
+    assert pl.plan_key(*RECIPE) != pl.plan_key(*RECIPE, motion={"quantizer": "diffusion"})
+    assert pl.plan_key(*RECIPE).startswith("timbir_N64_K4_C20000_M")
+
+
+def test_key_is_stable_across_processes():
+    code = "from interlaced import plan_library as pl; print(pl.plan_key(64, 4, 'timbir', 20000, {'dt': 1e-3}))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=REPO).stdout.strip()
+    assert out == pl.plan_key(*RECIPE, motion={"dt": 1e-3})
+
+
+def test_unknown_motion_parameter():
+    with pytest.raises(ValueError):
+        pl.plan_key(*RECIPE, motion={"acel": 5})
+
+
+def test_build_and_load_round_trip(tmp_path):
+    root = str(tmp_path / "lib")
+    assert pl.build(root, [RECIPE]) == [pl.plan_key(*RECIPE)]
+    # default esplicito: stesso piano, nessuna voce duplicata
+    assert pl.build(root, [RECIPE], accel=5) == []
+    written = pl.build(root, [RECIPE], accel=10)
+    assert written == [pl.plan_key(*RECIPE, motion={"accel": 10})]
+
+    plans = pl.list_plans(root)
+    assert len(plans) == 2
+    assert sorted(motion["accel"] for _, motion in plans) == [5.0, 10.0]
+
+    plan = pl.load_plan(root, *RECIPE)
+    assert isinstance(plan.fpga_table, np.memmap)
+    assert plan.recipe == pl.Recipe(*RECIPE)
+    assert len(plan.theta_ideal) == 64
+    assert pl.load_plan(root, *RECIPE, accel=10).metadata["accel"] == 10
+    with pytest.raises(KeyError):
+        pl.load_plan(root, *RECIPE, accel=3)
+
+    with open(tmp_path / "lib" / pl.INDEX_FILE) as f:
+        index = json.load(f)
+    assert index["version"] == pl.LIBRARY_VERSION and len(index["plans"]) == 2
+
+
+def test_build_does_not_mutate_cached_index(tmp_path):
+    root = str(tmp_path / "lib")
+    pl.build(root, [RECIPE])
+    cached = pl._read_index(root)
+    before = json.dumps(cached, sort_keys=True)
+    pl.build(root, [RECIPE], accel=10)
+    assert json.dumps(cached, sort_keys=True) == before
+
+
+def test_old_library_version_is_rebuilt(tmp_path):
+    root = tmp_path / "lib"
+    root.mkdir()
+    (root / pl.INDEX_FILE).write_text(json.dumps({"version": 1, "plans": {}}))
+    with pytest.raises(ValueError):
+        pl.load_plan(str(root), *RECIPE)
+    pl.build(str(root), [RECIPE])
+    assert pl.load_plan(str(root), *RECIPE).recipe.N == 64
+
+
+def test_cli_build_with_motion(tmp_path):
+    root = str(tmp_path / "lib")
+    subprocess.run([sys.executable, "-m", "interlaced.plan_library", "build", root,
+                    "--recipe", "64,4,timbir,20000", "--accel", "10"], check=True, cwd=REPO,
+                   capture_output=True)
+    assert pl.load_plan(root, *RECIPE, accel=10).recipe.K == 4
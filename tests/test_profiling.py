@@ -0,0 +1,56 @@
+import json
+import time
+
+from interlaced.profiling import StageProfiler
+from interlaced.scan import InterlacedScan
+
+
+def test_stages_are_summed_with_counters():
+    prof = StageProfiler()
+    for n in (10, 20):
+        with prof.stage("work", n_angles=n) as st:
+            time.sleep(0.002)
+            st["n_samples"] = 2 * n
+    with prof.stage("other"):
+        pass
+
+    m = prof.metrics()
+    work = m["stages"]["work"]
+    assert work["calls"] == 2
+    assert work["wall_s"] >= 0.004
+    assert work["n_angles"] == 20 and work["n_samples"] == 40      # ultimo valore
+    assert m["wall_s"] == work["wall_s"] + m["stages"]["other"]["wall_s"]
+    assert "work" in prof.summary()
+
+
+def test_disabled_profiler_records_nothing():
+    prof = StageProfiler(enabled=False)
+    with prof.stage("work") as st:
+        st["n"] = 1
+    assert prof.records == [] and prof.metrics()["stages"] == {}
+
+
+def test_chrome_trace_events(tmp_path):
+    prof = StageProfiler()
+    with prof.stage("a", n=3):
+        pass
+    path = tmp_path / "trace.json"
+    prof.write_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["a"]
+    assert complete[0]["args"]["n"] == 3 and complete[0]["dur"] >= 0
+
+
+def test_compute_fills_metrics_per_stage():
+    scan = InterlacedScan(N_theta=64, K=4).compute()
+    stages = scan.metrics["stages"]
+    assert list(stages) == ["timbir", "taxi_motion", "invert_theta", "interp_real",
+                            "counts_ideal", "counts_real"]
+    assert stages["timbir"]["n_angles"] == 64
+    assert stages["taxi_motion"]["n_samples"] > 0
+    # un secondo compute riparte da zero
+    scan.compute()
+    assert scan.metrics["stages"]["timbir"]["calls"] == 1
+
+    assert InterlacedScan(N_theta=64, K=4, profile=False).compute().metrics["stages"] == {}
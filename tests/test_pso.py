@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from interlaced.fpga_table import decode_fpga_table
+from interlaced.pso import (parse_controller_reply, program_pso, query_counts_per_rotation,
+                            table_crc32, write_table)
+from interlaced.pso_simulator import PSOSimulator
+from interlaced.pv_pool import PVPool
+
+
+def test_unitstocounts_handshake():
+    sim = PSOSimulator(counts_per_rev=11_840_200)
+    counts = query_counts_per_rotation(PVPool(sim.PV), prefix=sim.prefix, timeout=1.0)
+    assert counts == 11_840_200
+    assert sim["PSOCommand.BOUT"] == "UNITSTOCOUNTS(X, 360.0)"
+    assert sim["PSOCommand.BINP"] == "%11840200"
+    assert sim["PSOCountsPerRotation"] == 11_840_200
+    assert sim.n_commands == 1
+
+
+def test_handshake_skipped_on_unsupported_model():
+    sim = PSOSimulator(counts_per_rev=20_000, model="Ensemble")
+    assert query_counts_per_rotation(PVPool(sim.PV), prefix=sim.prefix, timeout=1.0) is None
+    assert sim.n_commands == 0
+    assert sim["PSOCountsPerRotation"] == 20_000
+
+
+def test_parse_controller_reply():
+    assert parse_controller_reply("%11840200") == 11_840_200.0
+    for reply in ("!", "#1", "", None):
+        with pytest.raises(ValueError):
+            parse_controller_reply(reply)
+
+
+def test_program_pso_writes_the_plan():
+    sim = PSOSimulator(counts_per_rev=11_840_200, N_theta=256, K=4, table_nelm=100)
+    result = program_pso(PVPool(sim.PV), prefix=sim.prefix, timeout=2.0, nelm=100)
+
+    assert result.counts_per_rev == 11_840_200
+    assert result.scan.N_theta == 256 and result.scan.K == 4
+    assert sim.n_commands == 1
+
+    # tabella scritta su piu' waveform, rilegge agli impulsi del piano
+    assert result.upload.n_chunks == -(-result.n_words // 100) > 1
+    assert int(sim["PSOPulseTableLength"]) == result.n_words
+    decoded = decode_fpga_table(sim.pulse_table, result.counts_per_rev)
+    np.testing.assert_array_equal(decoded, result.scan.pulses_interlaced_real)
+
+    # passo intero in counts
+    assert sim["PSOEncoderCountsPerStep"] == round(11_840_200 / 256)
+    assert sim["RotationStep"] == pytest.approx(result.encoder_counts_per_step * 360.0 / 11_840_200)
+
+
+def _table(n, seed=0):
+    return np.random.default_rng(seed).integers(0, 2**32, n, dtype=np.uint64).astype(np.uint32)
+
+
+def test_write_table_uploads_in_chunks():
+    sim = PSOSimulator(table_nelm=64, put_latency=0.001)
+    table = _table(1000)
+    upload = write_table(table, PVPool(sim.PV), prefix=sim.prefix, nelm=64, timeout=2.0)
+
+    assert upload.n_words == 1000 and upload.n_chunks == 16
+    assert upload.crc32 == table_crc32(table)
+    assert int(sim["PSOPulseTableLength"]) == 1000
+    np.testing.assert_array_equal(sim.pulse_table, table)
+    assert len(sim["PSOPulseTable15"]) == 1000 - 15 * 64
+
+
+def test_write_table_detects_crc_mismatch():
+    sim = PSOSimulator(table_nelm=64)
+
+    def corrupt(server, value):
+        # un bit perso nel waveform del secondo blocco
+        bad = np.array(value, dtype=np.uint32)
+        bad[3] ^= 1
+        server.values[sim.prefix + "PSOPulseTable01"] = bad
+
+    sim.put_hooks[sim.prefix + "PSOPulseTable01"] = corrupt
+    with pytest.raises(RuntimeError, match="CRC32"):
+        write_table(_table(300), PVPool(sim.PV), prefix=sim.prefix, nelm=64, timeout=2.0)
+
+
+def test_write_table_too_long():
+    sim = PSOSimulator(table_nelm=64, table_records=2)
+    with pytest.raises(ValueError):
+        write_table(_table(200), PVPool(sim.PV), prefix=sim.prefix, nelm=64, n_records=2)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+from interlaced.pv_access import FakePVServer, coerce_value, read_pvs, read_scan_parameters
+
+SPECS = {
+    "N_theta": ("test:NTheta", 32),
+    "K": ("test:KLoops", 4),
+    "taxi": ("test:StartTaxi", -0.75),
+    "model": ("test:Model", "A3200"),
+}
+
+
+def test_read_pvs_coerces_to_default_type():
+    server = FakePVServer({"test:NTheta": 1024.0, "test:KLoops": "8",
+                           "test:StartTaxi": 1, "test:Model": "Ensemble"})
+    values = asyncio.run(read_pvs(SPECS, server.PV, timeout=0.5))
+    assert values == {"N_theta": 1024, "K": 8, "taxi": 1.0, "model": "Ensemble"}
+    assert type(values["N_theta"]) is int and type(values["taxi"]) is float
+
+
+def test_missing_pv_falls_back_to_default_with_warning(caplog):
+    server = FakePVServer({"test:NTheta": 256, "test:StartTaxi": -1.0, "test:Model": "A3200"})
+    with caplog.at_level(logging.WARNING, logger="interlaced.pv_access"):
+        values = asyncio.run(read_pvs(SPECS, server.PV, timeout=0.05))
+    assert values["K"] == 4
+    assert values["N_theta"] == 256
+    assert any("test:KLoops" in r.getMessage() and "timeout" in r.getMessage()
+               for r in caplog.records)
+
+
+def test_slow_pv_times_out_without_blocking_the_others(caplog):
+    server = FakePVServer({"test:NTheta": 64, "test:KLoops": 2,
+                           "test:StartTaxi": -0.5, "test:Model": "A3200"})
+    server.latency["test:KLoops"] = 0.5
+    t0 = time.perf_counter()
+    with caplog.at_level(logging.WARNING, logger="interlaced.pv_access"):
+        values = asyncio.run(read_pvs(SPECS, server.PV, timeout=0.1))
+    elapsed = time.perf_counter() - t0
+    assert values["K"] == 4
+    assert values["N_theta"] == 64
+    assert elapsed < 0.4
+    assert any("test:KLoops" in r.getMessage() for r in caplog.records)
+
+
+def test_reads_run_in_parallel():
+    names = {f"p{i}": (f"test:P{i}", 0.0) for i in range(8)}
+    server = FakePVServer({pvname: float(i) for i, (pvname, _) in enumerate(names.values())},
+                          get_latency=0.05)
+    t0 = time.perf_counter()
+    values = read_scan_parameters(server.PV, timeout=1.0, specs=names)
+    assert time.perf_counter() - t0 < 8 * 0.05
+    assert values == {f"p{i}": float(i) for i in range(8)}
+
+
+def test_none_value_gives_default():
+    server = FakePVServer({"test:NTheta": None, "test:KLoops": 4,
+                           "test:StartTaxi": 0.0, "test:Model": "A3200"})
+    values = asyncio.run(read_pvs(SPECS, server.PV, timeout=0.2))
+    assert values["N_theta"] == 32
+
+
+def test_coerce_value():
+    assert coerce_value(4.0, 1, "pv") == 4 and type(coerce_value(4.0, 1, "pv")) is int
+    assert coerce_value("0.25", 1.0, "pv") == 0.25
+    assert coerce_value(12, "x", "pv") == "12"
+    assert coerce_value(None, 7, "pv") == 7
+    assert coerce_value([1, 2], None, "pv") == [1, 2]
+    assert coerce_value(None, None, "pv") is None
+
+
+def test_coerce_value_invalid_logs_and_defaults(caplog):
+    with caplog.at_level(logging.WARNING, logger="interlaced.pv_access"):
+        assert coerce_value("abc", 4, "test:K") == 4
+    assert any("test:K" in r.getMessage() for r in caplog.records)
@@ -0,0 +1,77 @@
+import logging
+import time
+
+import pytest
+
+from interlaced.pv_access import FakePVServer
+from interlaced.pv_pool import MOTOR_FIELDS, REQUIRED, MotorSnapshot, PVPool
+
+MOTOR = {f"2bmb:m102.{field}": value for field, value in
+         zip(MOTOR_FIELDS, (180.0, 90.0, 1.0, 0.2, 1e-4, 1e-4, 1.0))}
+
+
+def test_read_total_time_is_max_latency_not_sum():
+    server = FakePVServer(MOTOR, connect_latency=0.05)
+    latencies = [0.02, 0.04, 0.06, 0.08, 0.10, 0.12, 0.15]
+    for pvname, latency in zip(MOTOR, latencies):
+        server.latency[pvname] = latency
+    pool = PVPool(server.PV)
+    specs = {field: (f"2bmb:m102.{field}", REQUIRED) for field in MOTOR_FIELDS}
+
+    t0 = time.perf_counter()
+    values = pool.read(specs, timeout=2.0)
+    elapsed = time.perf_counter() - t0
+
+    assert values == {field: MOTOR[f"2bmb:m102.{field}"] for field in MOTOR_FIELDS}
+    # connessione + PV piu' lento ~ 0.2 s; in serie sarebbero 0.05 + 0.57 s
+    assert elapsed < 0.05 + max(latencies) + 0.15
+    assert elapsed < sum(latencies)
+
+
+def test_connections_are_awaited_together():
+    names = {f"p{i}": (f"test:P{i}", 0.0) for i in range(10)}
+    server = FakePVServer({pvname: float(i) for i, (pvname, _) in enumerate(names.values())},
+                          connect_latency=0.1)
+    t0 = time.perf_counter()
+    values = PVPool(server.PV).read(names, timeout=1.0)
+    assert time.perf_counter() - t0 < 0.3
+    assert values == {f"p{i}": float(i) for i in range(10)}
+
+
+def test_missing_required_pv_raises_and_optional_gets_default(caplog):
+    server = FakePVServer({"test:A": 3})
+    pool = PVPool(server.PV)
+    with caplog.at_level(logging.WARNING, logger="interlaced.pv_pool"):
+        values = pool.read({"a": ("test:A", 0), "b": ("test:B", 7)}, timeout=0.05)
+    assert values == {"a": 3, "b": 7}
+    assert any("test:B" in r.getMessage() and "non connesso" in r.getMessage()
+               for r in caplog.records)
+    with pytest.raises(TimeoutError, match="test:B"):
+        pool.read({"a": ("test:A", 0), "b": ("test:B", REQUIRED)}, timeout=0.05)
+
+
+def test_pvs_are_created_once():
+    server = FakePVServer({"test:A": 1})
+    pool = PVPool(server.PV)
+    assert pool.get("test:A") is pool.get("test:A")
+    pool.read({"a": ("test:A", 0)}, timeout=0.1)
+    assert len(pool) == 1 and "test:A" in pool
+
+
+def test_motor_snapshot_cached_until_monitor_changes():
+    server = FakePVServer(MOTOR)
+    motor = MotorSnapshot("2bmb:m102", pool=PVPool(server.PV), timeout=0.5)
+    assert motor["VELO"] == 90.0
+    motor.get()
+    assert motor.n_reads == 1
+
+    server.set("2bmb:m102.VELO", 45.0)
+    assert not motor.valid
+    assert motor["VELO"] == 45.0
+    assert motor.n_reads == 2
+
+
+def test_motor_snapshot_disconnected_motor_raises():
+    motor = MotorSnapshot("2bmb:m999", pool=PVPool(FakePVServer(MOTOR).PV), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        motor.get()
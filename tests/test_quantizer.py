@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from interlaced.quantizer import max_angles, quantize_plan
+from interlaced.scan import InterlacedScan
+
+COUNTS = 11_840_200
+
+
+def _sorted(theta, counts):
+    order = np.argsort(theta, kind="stable")
+    return np.asarray(theta)[order], np.asarray(counts)[order]
+
+
+def _bound(x, m):
+    # 1/2 + delta, delta = meta' del massimo deficit cumulato (errore minimo di qualsiasi piano)
+    y = x - np.arange(len(x)) * m
+    return 0.5 + (np.maximum.accumulate(y) - y).max() / 2
+
+
+def test_timbir_grid_within_half_count():
+    scan = InterlacedScan(N_theta=1024, K=4, PSOCountsPerRotation=COUNTS, quantizer="diffusion").compute()
+    theta, counts = _sorted(scan.theta_interlaced, scan.pulses_interlaced_ideal)
+    assert counts.dtype == np.int64
+    assert np.abs(counts - theta * COUNTS / 360.0).max() <= 0.5
+    assert np.diff(counts).min() >= scan.min_count_spacing
+
+
+def test_grid_uses_exact_integer_rounding():
+    N = 1000
+    theta = np.arange(N) * 360.0 / N
+    counts = quantize_plan(theta, COUNTS, n_per_rev=N)
+    k = np.arange(N, dtype=np.int64)
+    np.testing.assert_array_equal(counts, (2 * k * COUNTS + N) // (2 * N))
+
+
+def test_order_is_preserved():
+    theta = np.array([90.0, 0.0, 270.0, 180.0])
+    counts = quantize_plan(theta, 400)
+    np.testing.assert_array_equal(counts, [100, 0, 300, 200])
+
+
+@pytest.mark.parametrize("m", [1, 3])
+def test_crowded_plan_spacing_and_bound(m):
+    rng = np.random.default_rng(42)
+    C = 720
+    theta = np.sort(np.r_[rng.uniform(10, 350, 150), np.full(20, 180.0), 180.0 + rng.uniform(0, 0.5, 20)])
+    counts = quantize_plan(theta, C, min_spacing=m)
+    theta, counts = _sorted(theta, counts)
+    x = theta * C / 360.0
+    assert np.diff(counts).min() >= m
+    assert np.abs(counts - x).max() <= _bound(x, m) + 1e-9
+    # il deficit e' distribuito attorno al gruppo, non solo in avanti
+    crowd = np.flatnonzero(np.abs(theta - 180.0) < 0.6)
+    assert (counts[crowd] < x[crowd]).any() and (counts[crowd] > x[crowd]).any()
+
+
+def test_max_count_is_respected():
+    C = 1000
+    theta = np.r_[np.linspace(0, 350, 50), np.linspace(359.0, 359.9, 20)]
+    counts = quantize_plan(theta, C, min_spacing=1, max_count=999)
+    _, counts = _sorted(theta, counts)
+    assert counts.max() <= 999 and counts.min() >= 0
+    assert np.diff(counts).min() >= 1
+
+
+def test_too_many_angles_raise():
+    with pytest.raises(ValueError):
+        quantize_plan(np.linspace(0, 1, 50), 360, min_spacing=1, max_count=10)
+    assert max_angles(COUNTS, min_spacing=2) == COUNTS // 2
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pytest
+
+from interlaced import radon
+from interlaced.fpga_table import to_counts
+
+
+@pytest.fixture(autouse=True)
+def _empty_memory_cache():
+    radon.clear_cache()
+    yield
+    radon.clear_cache()
+
+
+def _npz(root):
+    return sorted(name for name in os.listdir(root) if name.endswith(".npz")) if os.path.isdir(root) else []
+
+
+def test_disk_persistence_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    img = np.ones((16, 16))
+    radon.project(img, np.linspace(0, 180, 8, endpoint=False))
+    assert _npz(radon.default_matrix_dir()) == []
+
+    radon.clear_cache()
+    radon.project(img, np.linspace(0, 180, 8, endpoint=False), persist=True)
+    assert len(_npz(radon.default_matrix_dir())) == 1
+
+
+def test_disk_cache_bounded_in_bytes(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    angles = [np.linspace(0, 180, 16 + i, endpoint=False) for i in range(6)]
+    radon.system_matrix(32, angles[0], persist=True, matrix_dir=root)
+    first = os.path.join(root, _npz(root)[0])
+    one = os.path.getsize(first)
+    os.utime(first, (0, 0))
+    monkeypatch.setattr(radon, "DISK_LIMIT", int(2.5 * one))
+
+    for i, a in enumerate(angles[1:], 1):
+        radon.clear_cache()
+        radon.system_matrix(32, a, persist=True, matrix_dir=root)
+        os.utime(os.path.join(root, radon.matrix_key(32, a) + ".npz"), (i, i))
+        radon._prune(root)
+
+    kept = _npz(root)
+    assert sum(os.path.getsize(os.path.join(root, name)) for name in kept) <= radon.DISK_LIMIT
+    # restano le piu' recenti
+    assert radon.matrix_key(32, angles[-1]) + ".npz" in kept
+    assert radon.matrix_key(32, angles[0]) + ".npz" not in kept
+
+
+def test_disk_cache_bounded_in_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(radon, "DISK_FILES", 2)
+    for n in (8, 9, 10):
+        radon.system_matrix(16, np.linspace(0, 180, n, endpoint=False), persist=True, matrix_dir=str(tmp_path))
+    assert len(_npz(str(tmp_path))) == 2
+
+
+def test_newest_matrix_kept_even_above_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(radon, "DISK_LIMIT", 1)
+    radon.system_matrix(16, np.linspace(0, 180, 8, endpoint=False), persist=True, matrix_dir=str(tmp_path))
+    assert len(_npz(str(tmp_path))) == 1
+
+
+def test_disk_round_trip(tmp_path):
+    angles = np.linspace(0, 180, 12, endpoint=False)
+    A = radon.system_matrix(24, angles, persist=True, matrix_dir=str(tmp_path))
+    radon.clear_cache()
+    B = radon.system_matrix(24, angles, persist=True, matrix_dir=str(tmp_path))
+    assert B is not A
+    assert (A != B).nnz == 0
+
+
+def _image(size=32, seed=0):
+    return np.random.default_rng(seed).random((size, size))
+
+
+def test_project_angles_matches_the_matrix():
+    img = _image()
+    angles = np.array([0.0, 17.3, 45.0, 90.0, 133.7, 179.9])
+    np.testing.assert_allclose(radon.project_angles(img, angles), radon.project(img, angles),
+                               rtol=1e-5, atol=1e-5)
+
+
+def test_projection_cache_hits_and_misses():
+    img = _image()
+    cache = radon.ProjectionCache(counts_per_rev=3600)
+    coarse = np.linspace(0, 180, 16, endpoint=False)
+    fine = np.linspace(0, 180, 32, endpoint=False)
+
+    first = cache.sinogram(img, coarse)
+    assert (cache.hits, cache.misses) == (0, 16)
+    second = cache.sinogram(img, fine)
+    assert (cache.hits, cache.misses) == (16, 32)
+    np.testing.assert_allclose(second[::2], first)
+    # righe calcolate all'angolo del count encoder
+    quantized = to_counts(fine, 3600) * 0.1
+    assert np.abs(quantized - fine).max() > 0.01
+    np.testing.assert_allclose(second, radon.project_angles(img, quantized))
+
+    # angoli nello stesso count (0.1 deg) condividono la riga
+    shared = cache.sinogram(img, [0.0, 0.04, 360.0])
+    assert cache.misses == 32
+    np.testing.assert_array_equal(shared[0], shared[1])
+    np.testing.assert_array_equal(shared[0], shared[2])
+
+    # un'immagine diversa non riusa le righe
+    cache.sinogram(_image(seed=1), coarse)
+    assert cache.misses == 48
+
+
+def test_projection_cache_is_bounded():
+    img = _image()
+    cache = radon.ProjectionCache(counts_per_rev=3600, maxsize=10)
+    cache.sinogram(img, np.arange(8) * 10.0)
+    cache.sinogram(img, 100.0 + np.arange(8) * 10.0)
+    assert len(cache) == 10
+    # le righe piu' vecchie sono uscite e vanno ricalcolate
+    misses = cache.misses
+    cache.sinogram(img, [0.0])
+    assert cache.misses == misses + 1
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from interlaced.fpga_table import encode_fpga_table
+from interlaced.scheduler import PlannedScan, PlanScheduler
+
+
+def test_plans_come_back_in_submit_order():
+    with PlanScheduler(max_ready=2) as scheduler:
+        for sample, N_theta in (("a", 32), ("b", 64), ("c", 16)):
+            scheduler.submit(sample, N_theta=N_theta, K=4, profile=False)
+        plans = [scheduler.next_plan(timeout=10) for _ in range(3)]
+    assert [p.sample for p in plans] == ["a", "b", "c"]
+    assert [p.scan.N_theta for p in plans] == [32, 64, 16]
+    expected = encode_fpga_table(plans[1].scan.pulses_interlaced_real, plans[1].scan.PSOCountsPerRotation)
+    np.testing.assert_array_equal(plans[1].fpga_table, expected)
+
+
+def test_worker_stops_when_max_ready_plans_wait():
+    computed = []
+
+    def compute(sample, scan_kwargs):
+        computed.append(sample)
+        return PlannedScan(sample, None, None)
+
+    scheduler = PlanScheduler(max_ready=1, compute=compute)
+    try:
+        for sample in range(5):
+            scheduler.submit(sample)
+        time.sleep(0.1)
+        # uno pronto in coda + uno calcolato in attesa di posto
+        assert computed == [0, 1]
+        assert scheduler.pending == 3
+        assert [scheduler.next_plan(timeout=1).sample for _ in range(5)] == [0, 1, 2, 3, 4]
+    finally:
+        scheduler.close()
+
+
+def test_failure_is_raised_by_next_plan_and_the_queue_continues():
+    def compute(sample, scan_kwargs):
+        if sample == "bad":
+            raise ValueError("piano impossibile")
+        return PlannedScan(sample, None, None)
+
+    with PlanScheduler(max_ready=2, compute=compute) as scheduler:
+        scheduler.submit("bad")
+        scheduler.submit("good")
+        with pytest.raises(ValueError, match="impossibile"):
+            scheduler.next_plan(timeout=1)
+        assert scheduler.next_plan(timeout=1).sample == "good"
+
+
+def test_close_with_full_queue_does_not_hang():
+    release = threading.Event()
+
+    def compute(sample, scan_kwargs):
+        release.wait(0.05)
+        return PlannedScan(sample, None, None)
+
+    scheduler = PlanScheduler(max_ready=1, compute=compute)
+    for sample in range(10):
+        scheduler.submit(sample)
+    time.sleep(0.1)
+    t0 = time.perf_counter()
+    scheduler.close()
+    assert time.perf_counter() - t0 < 1.0
+    assert not scheduler._worker.is_alive()
+
+
+def test_process_worker_returns_the_plan():
+    with PlanScheduler(use_process=True) as scheduler:
+        scheduler.submit("p", N_theta=32, K=2, profile=False)
+        plan = scheduler.next_plan(timeout=30)
+    assert plan.sample == "p" and plan.scan.N_theta == 32
+    assert len(plan.fpga_table) > 0
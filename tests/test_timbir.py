@@ -0,0 +1,17 @@
+import numpy as np
+
+from interlaced.timbir import bit_reverse, taxi_correct, timbir_angles
+
+
+def test_timbir_angles_bit_reversed_loops():
+    angles, loops = timbir_angles(8, 2)
+    assert np.array_equal(loops, [0, 0, 0, 0, 1, 1, 1, 1])
+    assert np.allclose(angles, [0, 90, 0, 90, 45, 135, 45, 135])
+    assert bit_reverse(1, 3) == 4 and bit_reverse(6, 3) == 3
+
+
+def test_taxi_correct_shifts_by_start_taxi():
+    pulses, pulse_end, theta, theta_end = taxi_correct([0.0, 90.0], -0.75, 0.5, 3600)
+    assert np.allclose(theta, [0.75, 90.75])
+    assert np.array_equal(pulses, [7, 907])
+    assert theta_end == 180.5 and pulse_end == 1805
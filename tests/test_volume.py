@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pytest
+
+from interlaced import volume as volume_module
+from interlaced.radon import project_angles
+from interlaced.volume import PHANTOMS, allocate, open_volume, phantom_volume, share, simulate_volume
+
+ANGLES = np.linspace(0.0, 180.0, 12, endpoint=False)
+
+
+def test_shared_memory_is_seen_by_open_volume():
+    vol = allocate((3, 4, 5), np.float32, max_memory=float("inf"))
+    try:
+        assert not vol.on_disk and vol.spec.kind == "shm"
+        assert not vol.array.any()
+        other = open_volume(vol.spec)
+        other.array[1, 2, 3] = 7.0
+        assert vol.array[1, 2, 3] == 7.0
+        other.release()
+    finally:
+        vol.release()
+    assert vol.array is None
+    vol.release()                                # una seconda volta non fa nulla
+
+
+def test_memmap_over_the_memory_limit(tmp_path):
+    vol = allocate((2, 8, 8), np.float32, max_memory=0)
+    path = vol.spec.name
+    assert vol.on_disk and os.path.exists(path)
+    vol.array[0] = 1.0
+    np.testing.assert_array_equal(open_volume(vol.spec).array[0], 1.0)
+    vol.release()
+    assert not os.path.exists(path)               # file temporaneo cancellato
+
+    kept = allocate((2, 8, 8), directory=tmp_path)
+    assert kept.on_disk and os.path.dirname(kept.spec.name) == str(tmp_path)
+    kept.array[...] = 3.0
+    kept.release()
+    # in una cartella data il volume resta
+    np.testing.assert_array_equal(np.fromfile(kept.spec.name, dtype=np.float32), 3.0)
+
+
+def test_share_copies_the_array():
+    array = np.arange(24, dtype=np.float64).reshape(2, 3, 4)
+    with share(array, max_memory=float("inf")) as vol:
+        np.testing.assert_array_equal(vol.array, array)
+        assert vol.array.dtype == array.dtype
+
+
+@pytest.mark.parametrize("mode", PHANTOMS)
+def test_phantom_modes(mode):
+    with phantom_volume(32, 16, mode=mode, max_memory=float("inf")) as vol:
+        assert vol.array.shape == (16, 32, 32)
+        assert vol.array.max() > 0
+        assert vol.array[0].sum() <= vol.array[8].sum()      # la fetta centrale contiene l'oggetto
+        if mode == "cube":
+            assert set(np.unique(vol.array)) == {0.0, 1.0}
+            assert vol.array[8, 16, 16] == 1.0 and not vol.array[0].any()
+        elif mode == "spheres":
+            assert vol.array.max() == 2.5
+
+
+def test_unknown_phantom_and_blur():
+    with pytest.raises(ValueError):
+        phantom_volume(16, mode="torus")
+    with pytest.raises(ValueError):
+        simulate_volume(np.zeros((2, 16, 16)), ANGLES, blur="gaussian")
+
+
+def test_single_worker_matches_the_slice_simulation():
+    with phantom_volume(24, 4, mode="spheres", max_memory=float("inf")) as vol:
+        sino, recon = simulate_volume(vol.array, ANGLES, workers=1, reconstruct=False)
+        try:
+            assert recon is None
+            assert sino.array.shape == (4, len(ANGLES), 24)
+            for z in range(4):
+                expected = project_angles(np.asarray(vol.array[z], dtype=np.float64), ANGLES, 24)
+                np.testing.assert_allclose(sino.array[z], expected, rtol=1e-6, atol=1e-6)
+        finally:
+            sino.release()
+
+
+@pytest.mark.parametrize("blur", ["image", "sinogram", None])
+def test_workers_give_identical_results(blur):
+    with phantom_volume(24, 6, mode="spheres", max_memory=float("inf")) as vol:
+        runs = []
+        for workers in (1, 2):
+            sino, recon = simulate_volume(vol, ANGLES, exposure=0.1, angular_velocity=50, blur=blur,
+                                          workers=workers, rows_per_task=2)
+            runs.append((np.array(sino.array), np.array(recon.array)))
+            sino.release()
+            recon.release()
+    np.testing.assert_array_equal(runs[0][0], runs[1][0])
+    np.testing.assert_array_equal(runs[0][1], runs[1][1])
+
+
+def test_plain_array_with_workers_on_disk(tmp_path):
+    array = np.zeros((4, 16, 16), dtype=np.float32)
+    array[:, 6:10, 6:10] = 1.0
+    sino, recon = simulate_volume(array, ANGLES, workers=2, directory=tmp_path)
+    try:
+        assert sino.on_disk and recon.on_disk
+        assert recon.array[:, 8, 8].min() > 0.5
+    finally:
+        sino.release()
+        recon.release()
+
+
+def test_outputs_are_released_on_error(monkeypatch):
+    allocated = []
+
+    def recording_allocate(*args, **kwargs):
+        vol = allocate(*args, **kwargs)
+        allocated.append(vol)
+        return vol
+
+    monkeypatch.setattr(volume_module, "allocate", recording_allocate)
+    with pytest.raises(ValueError):
+        simulate_volume(np.ones((2, 16, 16)), ANGLES, filter_name="bogus", workers=1)
+    assert len(allocated) == 2
+    assert all(vol.array is None for vol in allocated)
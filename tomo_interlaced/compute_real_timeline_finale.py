@@ -1,3 +1,10 @@
+import numpy as np
+
+from interlaced.pv_pool import MotorSnapshot
+
+motor_snapshot = MotorSnapshot("2bmb:m102")   # canali condivisi, nessuna connessione per chiamata
+
+
 def compute_real_timeline(theta_corrected, counts_per_rev):
     """
 Legge i parametri reali del motore (velocità, accelerazione, risoluzioni…)
@@ -8,26 +15,16 @@ Calcola quanti impulsi PSO x tempo/angolo del trigger
     """
 
     # ------------------------------
-    # IMPORT EPICS PV
-    # ------------------------------
-    
-    pv_vmax = PV("2bmb:m102.VMAX")   # velocità massima (plateau)
-    pv_velo = PV("2bmb:m102.VELO")   # velocità corrente (debug)
-    pv_vbas = PV("2bmb:m102.VBAS")   # velocità base a inizio rampa
-    pv_accl = PV("2bmb:m102.ACCL")   # accelerazione (deg/s^2 o tempo ramp)
-    pv_mres = PV("2bmb:m102.MRES")   # motor resolution
-    pv_eres = PV("2bmb:m102.ERES")   # encoder resolution
-    pv_rres = PV("2bmb:m102.RRES")   # readback resolution
-
-    # ------------------------------
-    # LETTURA PV
+    # LETTURA PV : snapshot del motore 2bmb:m102 (VMAX, VELO, VBAS, ACCL, MRES, ERES, RRES)
+    # letto in blocco una volta sola, poi in cache finche' un monitor non cambia
     # ------------------------------
-    VELO = pv_velo.get()        # plateau target [deg/s]
-    VBAS = pv_vbas.get()        # base velocity [deg/s]
-    ACCL = pv_accl.get()        # accelerazione [deg/s^2]
-    mres = pv_mres.get()
-    eres = pv_eres.get()
-    rres = pv_rres.get()
+    m = motor_snapshot.get()
+    VELO = m["VELO"]        # plateau target [deg/s]
+    VBAS = m["VBAS"]        # base velocity [deg/s]
+    ACCL = m["ACCL"]        # accelerazione [deg/s^2]
+    mres = m["MRES"]
+    eres = m["ERES"]
+    rres = m["RRES"]
 
     # ------------------------------
     # Conversione angoli -> impulsi
@@ -29,11 +29,14 @@ oppure solo start/stop e step (dipende dal tipo di interlaced)
 # ------------------------------------------------------------
 # ------------------------------------------------------------
 
+
 import numpy as np
-from epics import PV
 
-# PV che contiene il numero di impulsi per giro
-pso_counts_pv = PV('PSOCountsPerRotation')
+from interlaced.pv_access import SCAN_PARAMETERS
+from interlaced.pv_pool import get_pv
+
+# PV che contiene il numero di impulsi per giro (canale creato al primo uso)
+PSO_COUNTS_PV = SCAN_PARAMETERS["counts_per_rev"][0]
 
 # --- FUNZIONE DI CONVERSIONE ---
 def angles_to_pulses_epics(angle_string):
@@ -41,7 +44,7 @@ def angles_to_pulses_epics(angle_string):
     Converte una lista di angoli stringa in impulsi PSO usando i counts EPICS
     """
     #  numero di impulsi per giro dal PV
-    counts_per_rev = float(pso_counts_pv.get())
+    counts_per_rev = float(get_pv(PSO_COUNTS_PV).get())
 
     #  parsing della stringa di angoli
     angles_deg = np.array([float(x) for x in angle_string.split(',')])
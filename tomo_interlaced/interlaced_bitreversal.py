@@ -1,7 +1,7 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 def bit_reversal_interlaced(N_theta=32, K=4, r_outer=1.0, r_step=0.15):
+    import matplotlib.pyplot as plt
     def bit_reverse(x, bits):
         return int(f'{x:0{bits}b}'[::-1], 2)
 
@@ -1,9 +1,9 @@
 # prendi un angolo e poi salta di J passi
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 def jump_interlaced(N_theta=32, J=5, K=4, r_outer=1.0, r_step=0.15):
+    import matplotlib.pyplot as plt
     visited = []
     idx = 0
     for _ in range(N_theta):
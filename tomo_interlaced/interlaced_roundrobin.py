@@ -3,9 +3,9 @@ Ogni loop prende un punto, poi passa al successivo, e così via
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 def round_robin_interlaced(N_theta=32, K=4, r_outer=1.0, r_step=0.15):
+    import matplotlib.pyplot as plt
     angles = np.linspace(0, 2*np.pi, N_theta, endpoint=False)
     loops = np.arange(N_theta) % K
     radii = r_outer - loops * r_step
@@ -10,117 +10,28 @@ pulses_end_corrected → impulso di stop
 
 
 import numpy as np
-from epics import PV
 
-# ------------------------------------------------------------------------------------------------------------------------------------------------------
-# TIMBIR e nuovi PVs 
-# ------------------------------------------------------------------------------------------------------------------------------------------------------
-
-pv_N_theta = PV("2bmb:TomoScan:NTheta")          # numero totale proiezioni  NUOVO PV
-pv_K       = PV("2bmb:TomoScan:KLoops")         # numero di loop interlacciati  NUOVO PV
-
-N_theta = int(pv_N_theta.get()) or 32  # numero totale proiezioni 
-K       = int(pv_K.get()) or 4          # numero di loop interlacciati 
-
-# ----------------------------------------------------
-# BIT-REVERSAL
-# ----------------------------------------------------
-def bit_reverse(x, bits):
-  
-    b = f'{x:0{bits}b}'
-    return int(b[::-1], 2)
-# ----------------------------------------------------
-# TIMBIR
-# ----------------------------------------------------
-angles_timbir = []
-loop_indices = []
-bits = int(np.log2(K)) 
-
-for n in range(N_theta):
-    base = n * K
-    loop = (base // N_theta) % K
-    rev = bit_reverse(loop, bits)
-    val = base + rev
-
-    theta = val * 360.0 / N_theta       # angolo 0-360°
-    theta = theta % 180.0               # 0-180° per tomografia
-
-    angles_timbir.append(theta)
-    loop_indices.append(loop)
-
-angles_timbir = np.array(angles_timbir)
-loop_indices = np.array(loop_indices)
-
-print("Angles TIMBIR (degrees):")
-print(np.round(angles_timbir, 4))
- 
-
-# ----------------------------------------------------
-# EPICS PVs per Taxi e PSO
-# ----------------------------------------------------
-pv_start_taxi = PV("2bmb:TomoScan:PSOStartTaxi")         # Posizione di inizio taxi [deg]
-pv_end_taxi   = PV("2bmb:TomoScan:PSOEndTaxi")           # Posizione di fine taxi [deg]
-pv_counts     = PV("2bmb:TomoScan:PSOCountsPerRotation") # Numero di impulsi per giro del PSO
-
-# Lettura dai PV
-start_taxi     = pv_start_taxi.get()           # es: -0.749939 deg angolo di inizio taxi
-end_taxi       = pv_end_taxi.get()             # es: 0.735 deg angolo di fine taxi 
-counts_per_rev = pv_counts.get()               # es: 11_840_200 impulsi/giro impulsi per giro del PSO
+from interlaced.pv_access import SCAN_PARAMETERS, read_scan_parameters
+from interlaced.pv_pool import MotorSnapshot, default_pool
+# TIMBIR e correzione del taxi: nel pacchetto, condivisi con simulamotor.py
+from interlaced.timbir import taxi_correct, timbir_angles
 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 # CONVERSIONE DA ANGOLI AD IMPULSI
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 
- """
+def deg_to_pulse(angles_timbir, counts_per_rev):
+    """
     Converte angoli TIMBIR in impulsi per il motore.
     
     angles_timbir : array/list di angoli in gradi
     counts_per_rev : numero di impulsi per giro completo del motore
     """
-def deg_to_pulse(angles_timbir, counts_per_rev):
     pulse_per_deg = counts_per_rev / 360.0  
     pulse_timbir = np.round(np.array(angles_timbir) * pulse_per_deg, 0).astype(int)
     return pulse_timbir
 
 
-pulses = deg_to_pulse(angles_timbir, counts_per_rev)
-
-print("Pulses TIMBIR:")
-print(pulses)
-
-
-
-
-# ------------------------------------------------------------------------------------------------------------------------------------------------------
-# FUNZIONE TAXI CORRECTION con theta_corrected angoli di timbir corretti 
-# ------------------------------------------------------------------------------------------------------------------------------------------------------
-
-def taxi_correct(angles_deg, start_taxi, end_taxi, counts_per_rev):
-   
-    pulse_per_deg = counts_per_rev / 360.0  #fattore di conversione
-
-    theta_corrected = []
-    pulses_corrected = []
-
-    # correzione start taxi-> shift angolare
-    
-    for theta in angles_deg:
-        theta_corr = theta + abs(start_taxi)
-        theta_corrected.append(theta_corr)
-        pulses_corrected.append(theta_corr * pulse_per_deg)
-
-    # correzione fine taxi
-    theta_end_corrected = 180.0 + end_taxi     # posizione angolare in cui il trigger deve fermarsi
-    pulses_end_corrected = theta_end_corrected * pulse_per_deg    # dopo questo stop alla generezione di trigger 
-    return np.array(pulses_corrected, dtype=int), int(pulses_end_corrected), theta_corrected, theta_end_corrected
-
-# ----------------------------------------------------
-# Applico la correzione taxi
-# ----------------------------------------------------
-pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
-    angles_timbir, start_taxi, end_taxi, counts_per_rev
-)
-
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 # Generazione ritardi Δpulses per memPulseSeq 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -141,10 +52,6 @@ def compute_deltas(pulses_corrected):
 
     return np.array(deltas, dtype=int)
 
-# applico agli impulsi
-# delta_end = pulses_end_corrected - pulses_corrected[-1] # solo se richiesto 
-delta_pulses = compute_deltas(pulses_corrected)
-
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 # Restituisce gli impulsi reali 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -186,8 +93,9 @@ def angles_corrected_to_pulses_epics(theta_corrected):
     Ritorna:
         pulses : array di impulsi PSO interi
     """
-    # Lettura numero di impulsi per giro dal PV
-    counts_per_rev = float(pv_counts.get())
+    # Lettura numero di impulsi per giro dal PV (canale condiviso, con timeout e default)
+    counts_per_rev = float(default_pool().read(
+        {"counts_per_rev": SCAN_PARAMETERS["counts_per_rev"]})["counts_per_rev"])
 
     # Assicuro che sia array NumPy
     theta_corrected = np.array(theta_corrected)
@@ -199,6 +107,8 @@ def angles_corrected_to_pulses_epics(theta_corrected):
     return np.round(pulses).astype(int)
 
 # ----------------------------------------------------
+motor_snapshot = MotorSnapshot("2bmb:m102")   # canali condivisi, nessuna connessione per chiamata
+
 def compute_real_timeline(theta_corrected, counts_per_rev):
     """
 Legge i parametri reali del motore (velocità, accelerazione, risoluzioni…)
@@ -209,26 +119,16 @@ Calcola quanti impulsi PSO x tempo/angolo del trigger
     """
 
     # ------------------------------
-    # IMPORT EPICS PV
+    # LETTURA PV : snapshot del motore 2bmb:m102 (VMAX, VELO, VBAS, ACCL, MRES, ERES, RRES)
+    # letto in blocco una volta sola, poi in cache finche' un monitor non cambia
     # ------------------------------
-    
-    pv_vmax = PV("2bmb:m102.VMAX")   # velocità massima (plateau)
-    pv_velo = PV("2bmb:m102.VELO")   # velocità corrente (debug)
-    pv_vbas = PV("2bmb:m102.VBAS")   # velocità base a inizio rampa
-    pv_accl = PV("2bmb:m102.ACCL")   # accelerazione (deg/s^2 o tempo ramp)
-    pv_mres = PV("2bmb:m102.MRES")   # motor resolution
-    pv_eres = PV("2bmb:m102.ERES")   # encoder resolution
-    pv_rres = PV("2bmb:m102.RRES")   # readback resolution
-
-    # ------------------------------
-    # LETTURA PV
-    # ------------------------------
-    VELO = pv_velo.get()        # plateau target [deg/s]
-    VBAS = pv_vbas.get()        # base velocity [deg/s]
-    ACCL = pv_accl.get()        # accelerazione [deg/s^2]
-    mres = pv_mres.get()
-    eres = pv_eres.get()
-    rres = pv_rres.get()
+    m = motor_snapshot.get()
+    VELO = m["VELO"]        # plateau target [deg/s]
+    VBAS = m["VBAS"]        # base velocity [deg/s]
+    ACCL = m["ACCL"]        # accelerazione [deg/s^2]
+    mres = m["MRES"]
+    eres = m["ERES"]
+    rres = m["RRES"]
 
     # ------------------------------
     # Conversione angoli -> impulsi
@@ -288,3 +188,47 @@ Calcola quanti impulsi PSO x tempo/angolo del trigger
             continue
 
     return np.array(pulses_timeline, dtype=int)
+
+
+# ------------------------------------------------------------------------------------------------------------------------------------------------------
+# ESECUZIONE: TIMBIR -> taxi -> Δpulses (solo da riga di comando, non all'import)
+# ------------------------------------------------------------------------------------------------------------------------------------------------------
+def main():
+    # TIMBIR e nuovi PVs : tutti i parametri di scansione letti in parallelo, con timeout e default
+    params = read_scan_parameters()
+
+    N_theta = params["N_theta"]  # numero totale proiezioni  NUOVO PV
+    K       = params["K"]        # numero di loop interlacciati  NUOVO PV
+
+    angles_timbir, loop_indices = timbir_angles(N_theta, K)
+
+    print("Angles TIMBIR (degrees):")
+    print(np.round(angles_timbir, 4))
+
+    # ----------------------------------------------------
+    # EPICS PVs per Taxi e PSO
+    # ----------------------------------------------------
+    start_taxi     = params["start_taxi"]          # es: -0.749939 deg angolo di inizio taxi
+    end_taxi       = params["end_taxi"]            # es: 0.735 deg angolo di fine taxi 
+    counts_per_rev = params["counts_per_rev"]      # es: 11_840_200 impulsi/giro impulsi per giro del PSO
+
+    pulses = deg_to_pulse(angles_timbir, counts_per_rev)
+
+    print("Pulses TIMBIR:")
+    print(pulses)
+
+    # Applico la correzione taxi
+    pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
+        angles_timbir, start_taxi, end_taxi, counts_per_rev
+    )
+
+    # applico agli impulsi
+    # delta_end = pulses_end_corrected - pulses_corrected[-1] # solo se richiesto 
+    delta_pulses = compute_deltas(pulses_corrected)
+
+    print("Δpulses:", delta_pulses)
+    print("Impulso stop:", pulses_end_corrected)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 
+import numpy as np
 
+from interlaced.pv_access import read_scan_parameters
+# angoli TIMBIR corretti per il taxi (come in puzzle.py)
+from interlaced.timbir import taxi_correct, timbir_angles
 
 # ----------------------------------------------------
 # PROFILO MOTORE E CALCOLO TRIGGER
@@ -34,9 +38,6 @@ def t_real(theta_target, T_acc, T_flat, T_dec, omega_target):
             t_out[i] = T_acc + T_flat + T_dec
     return t_out
 
-# Calcolo tempo trigger per angoli corretti
-t_triggers = t_real(theta_corrected, T_acc, T_flat, T_dec, omega_target)
-
 # Velocità istantanea
 def omega_inst(t, T_acc, T_flat, T_dec, omega_target):
     alpha = omega_target / T_acc
@@ -53,15 +54,31 @@ def omega_inst(t, T_acc, T_flat, T_dec, omega_target):
             omega[i] = 0.0
     return omega
 
-omega_values = omega_inst(t_triggers, T_acc, T_flat, T_dec, omega_target)
 
-# Impulsi reali PSO
-pulses_real = theta_corrected * (counts_per_rev / 360.0)
+def main():
+    params = read_scan_parameters()
+    counts_per_rev = params["counts_per_rev"]
+    angles_timbir, loop_indices = timbir_angles(params["N_theta"], params["K"])
+    _, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
+        angles_timbir, params["start_taxi"], params["end_taxi"], counts_per_rev)
+    theta_corrected = np.asarray(theta_corrected)
+
+    # Calcolo tempo trigger per angoli corretti
+    t_triggers = t_real(theta_corrected, T_acc, T_flat, T_dec, omega_target)
+
+    omega_values = omega_inst(t_triggers, T_acc, T_flat, T_dec, omega_target)
+
+    # Impulsi reali PSO
+    pulses_real = theta_corrected * (counts_per_rev / 360.0)
+
+    # ----------------------------------------------------
+    # STAMPA RISULTATI
+    # ----------------------------------------------------
+    for i in range(len(theta_corrected)):
+        print(f"Angle {theta_corrected[i]:6.2f} deg -> Loop {loop_indices[i]} -> Pulse {pulses_real[i]:.0f} -> t_trigger {t_triggers[i]:.4f} s -> omega {omega_values[i]:.2f} deg/s")
+
+    print(f"Fine taxi: {theta_end_corrected:.3f} deg -> Pulse {pulses_end_corrected}")
 
-# ----------------------------------------------------
-# STAMPA RISULTATI
-# ----------------------------------------------------
-for i in range(len(theta_corrected)):
-    print(f"Angle {theta_corrected[i]:6.2f} deg -> Loop {loop_indices[i]} -> Pulse {pulses_real[i]:.0f} -> t_trigger {t_triggers[i]:.4f} s -> omega {omega_values[i]:.2f} deg/s")
 
-print(f"Fine taxi: {theta_end_corrected:.3f} deg -> Pulse {pulses_end_corrected}")
+if __name__ == "__main__":
+    main()
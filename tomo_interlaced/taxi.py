@@ -17,20 +17,12 @@ eventuali differenze dovute alla dinamica del motore
   conversione impulsi/angoli è consistente con un encoder da 11.840.200 impulsi/giro
 
 """
-from epics import PV
+import math
 
-# PV corretti
-pv_start_taxi = PV("2bmb:TomoScan:PSOStartTaxi")
-pv_end_taxi   = PV("2bmb:TomoScan:PSOEndTaxi")
-pv_counts     = PV("2bmb:TomoScan:PSOCountsPerRotation")
+import numpy as np
 
-# lettura valori dai PV
-start_taxi     = pv_start_taxi.get()      # es: -0.749939
-end_taxi       = pv_end_taxi.get()        # es: 180.735 -> ma tu usi solo l'extra (0.735)
-counts_per_rev = pv_counts.get()          # es: 1.18402e7 (vero per 2-BM-B)
+from interlaced.pv_access import read_scan_parameters
 
-# array angoli ideali  o altro
-angles_deg = [0, 0.1, 0.2]
 
 def taxi_correct(angles_deg, start_taxi, end_taxi, counts_per_rev):
     # conversione angoli-impulsi
@@ -54,14 +46,25 @@ def taxi_correct(angles_deg, start_taxi, end_taxi, counts_per_rev):
 
 # ===========================
 
-pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
-    angles_deg, start_taxi, end_taxi, counts_per_rev
-)
+def main():
+    # PV corretti: 2bmb:TomoScan:PSOStartTaxi, PSOEndTaxi, PSOCountsPerRotation
+    # lettura valori dai PV, in parallelo e con timeout
+    params = read_scan_parameters()
+    start_taxi     = params["start_taxi"]     # es: -0.749939
+    end_taxi       = params["end_taxi"]       # es: 180.735 -> ma tu usi solo l'extra (0.735)
+    counts_per_rev = params["counts_per_rev"] # es: 1.18402e7 (vero per 2-BM-B)
 
-print("theta_corrected:", theta_corrected)
-print("pulses_corrected:", pulses_corrected)
-print("theta_end_corrected:", theta_end_corrected)
-print("pulses_end_corrected:", pulses_end_corrected)
+    # array angoli ideali  o altro
+    angles_deg = [0, 0.1, 0.2]
+
+    pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
+        angles_deg, start_taxi, end_taxi, counts_per_rev
+    )
+
+    print("theta_corrected:", theta_corrected)
+    print("pulses_corrected:", pulses_corrected)
+    print("theta_end_corrected:", theta_end_corrected)
+    print("pulses_end_corrected:", pulses_end_corrected)
 
 
 #----------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -75,8 +78,9 @@ print("pulses_end_corrected:", pulses_end_corrected)
 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 # FUNZIONE TAXI CORRECTION con theta_corrected: angoli di Timbir corretti
+# (metodo di TomoScanPSO: nome distinto per non sovrascrivere taxi_correct sopra)
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
-def taxi_correct(self, angles_deg):
+def taxi_correct_pso(self, angles_deg):
     """
     Uso di rotation_start_new, rotation_stop, rotation_step, taxi_dist calcolati da compute_positions_PSO.
 
@@ -120,23 +124,5 @@ Tutti i calcoli sono in gradi e solo alla fine convertiti in impulsi interi per
     return np.array(pulses_corrected, dtype=int), pulses_end_corrected, theta_corrected, theta_end_corrected
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,7 @@
 import numpy as np
-from epics import PV
 
-# ------------------------------
-# Parametri TIMBIR e PVs
-# ------------------------------
-pv_N_theta = PV("2bmb:TomoScan:NTheta")          
-pv_K       = PV("2bmb:TomoScan:KLoops")         
-pv_start_taxi = PV("2bmb:TomoScan:PSOStartTaxi")         
-pv_end_taxi   = PV("2bmb:TomoScan:PSOEndTaxi")           
-pv_counts     = PV("2bmb:TomoScan:PSOCountsPerRotation") 
-
-N_theta = int(pv_N_theta.get() or 32)
-K       = int(pv_K.get() or 4)
-start_taxi = float(pv_start_taxi.get() or -0.75)
-end_taxi   = float(pv_end_taxi.get() or 0.75)
-counts_per_rev = float(pv_counts.get() or 11_840_200)
+from interlaced.pv_access import read_scan_parameters
+from interlaced.pv_pool import MotorSnapshot
 
 # ----------------------------------------------------
 # BIT-REVERSAL
@@ -26,24 +13,24 @@ def bit_reverse(x, bits):
 # ----------------------------------------------------
 # TIMBIR
 # ----------------------------------------------------
-angles_timbir = []
-loop_indices = []
-bits = int(np.log2(K))
+def timbir_angles(N_theta, K):
+    angles_timbir = []
+    loop_indices = []
+    bits = int(np.log2(K))
 
-for n in range(N_theta):
-    base = n * K
-    loop = (base // N_theta) % K
-    rev = bit_reverse(loop, bits)
-    val = base + rev
+    for n in range(N_theta):
+        base = n * K
+        loop = (base // N_theta) % K
+        rev = bit_reverse(loop, bits)
+        val = base + rev
 
-    theta = val * 360.0 / N_theta       # angolo 0-360°
-    theta = theta % 180.0               # 0-180° per tomografia
+        theta = val * 360.0 / N_theta       # angolo 0-360°
+        theta = theta % 180.0               # 0-180° per tomografia
 
-    angles_timbir.append(theta)
-    loop_indices.append(loop)
+        angles_timbir.append(theta)
+        loop_indices.append(loop)
 
-angles_timbir = np.array(angles_timbir)
-loop_indices = np.array(loop_indices)
+    return np.array(angles_timbir), np.array(loop_indices)
 # ------------------------------
 # Correzione taxi
 # ------------------------------
@@ -66,13 +53,6 @@ def taxi_correct(angles_deg, start_taxi, end_taxi, counts_per_rev):
     pulses_end_corrected = theta_end_corrected * pulse_per_deg    # dopo questo stop alla generezione di trigger 
     return np.array(pulses_corrected, dtype=int), int(pulses_end_corrected), theta_corrected, theta_end_corrected
 
-# ----------------------------------------------------
-# Applico la correzione taxi
-# ----------------------------------------------------
-pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
-    angles_timbir, start_taxi, end_taxi, counts_per_rev
-)
-
 # ------------------------------
 # Calcolo ritardi Δpulses per memPulseSeq
 # ------------------------------
@@ -81,21 +61,18 @@ def compute_deltas(pulses):
     deltas = [pulses[0]] + [pulses[i] - pulses[i-1] for i in range(1, len(pulses))]
     return np.array(deltas, dtype=int)
 
-delta_pulses = compute_deltas(pulses_corrected)
-
 # ------------------------------
 #  accelerazione, plateau, decelerazione
 # ------------------------------
-def compute_real_timeline(theta_corrected, counts_per_rev):
-    # PV reali del rotary
-    pv_vmax = PV("2bmb:m102.VMAX")
-    pv_velo = PV("2bmb:m102.VELO")
-    pv_vbas = PV("2bmb:m102.VBAS")
-    pv_accl = PV("2bmb:m102.ACCL")
+# questo script ha sempre avuto dei default per il motore: warning se usati
+motor_snapshot = MotorSnapshot("2bmb:m102", fields={"VELO": 1.0, "VBAS": 0.1, "ACCL": 0.1})
 
-    VELO = float(pv_velo.get() or 1.0)
-    VBAS = float(pv_vbas.get() or 0.1)
-    ACCL = float(pv_accl.get() or 0.1)
+def compute_real_timeline(theta_corrected, counts_per_rev):
+    # PV reali del rotary (snapshot condiviso, default 1.0 / 0.1 / 0.1 con warning)
+    m = motor_snapshot.get()
+    VELO = float(m["VELO"])
+    VBAS = float(m["VBAS"])
+    ACCL = float(m["ACCL"])
 
     pulse_per_deg = counts_per_rev / 360.0
     pulses_timeline = []
@@ -118,14 +95,39 @@ def compute_real_timeline(theta_corrected, counts_per_rev):
 
     return np.array(pulses_timeline, dtype=int)
 
-pulses_real = compute_real_timeline(theta_corrected, counts_per_rev)
 
-# ------------------------------
-# Output finale
-# ------------------------------
-print("Angoli TIMBIR:", angles_timbir)
-print("Angoli corretti:", theta_corrected)
-print("Impulsi corretti:", pulses_corrected)
-print("Δpulses:", delta_pulses)
-print("Impulsi reali (timeline):", pulses_real)
-print("Impulso stop:", pulses_end_corrected)
+def main():
+    # ------------------------------
+    # Parametri TIMBIR e PVs (letti in parallelo, con timeout e default)
+    # ------------------------------
+    params = read_scan_parameters()
+
+    N_theta = params["N_theta"]
+    K       = params["K"]
+    start_taxi = params["start_taxi"]
+    end_taxi   = params["end_taxi"]
+    counts_per_rev = float(params["counts_per_rev"])
+
+    angles_timbir, loop_indices = timbir_angles(N_theta, K)
+
+    # Applico la correzione taxi
+    pulses_corrected, pulses_end_corrected, theta_corrected, theta_end_corrected = taxi_correct(
+        angles_timbir, start_taxi, end_taxi, counts_per_rev
+    )
+
+    delta_pulses = compute_deltas(pulses_corrected)
+    pulses_real = compute_real_timeline(theta_corrected, counts_per_rev)
+
+    # ------------------------------
+    # Output finale
+    # ------------------------------
+    print("Angoli TIMBIR:", angles_timbir)
+    print("Angoli corretti:", theta_corrected)
+    print("Impulsi corretti:", pulses_corrected)
+    print("Δpulses:", delta_pulses)
+    print("Impulsi reali (timeline):", pulses_real)
+    print("Impulso stop:", pulses_end_corrected)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,21 @@
 import numpy as np
-from epics import PV
+from interlaced.pv_access import SCAN_PARAMETERS, read_scan_parameters
 # ----------------------------------------------------
 # Lettura PV e Nuovi PV da aggiungere
 # ----------------------------------------------------
-pv_N_theta = PV("2bmb:TomoScan:NTheta")   # NUOVO PV
-pv_Kloops = PV("2bmb:TomoScan:KloopsLoops")         # NUOVO PV  
+# 2bmb:TomoScan:NTheta , 2bmb:TomoScan:KloopsLoops   NUOVI PV
+# questo script ha sempre letto K da KloopsLoops (gli script in
+# tomo_interlaced da KLoops, come SCAN_PARAMETERS): il nome resta il suo
+SCAN_PARAMETERS_KLOOPS = dict(SCAN_PARAMETERS, K=("2bmb:TomoScan:KloopsLoops", 4))
 
 # --------------------------------------------------------------------
 # Interlaced TIMBIR
 # --------------------------------------------------------------------
-def generate_timbir_interlaced_angles():
-    pv_N_theta = PV("2bmb:TomoScan:NTheta")   # numero totale proiezioni
-    pv_Kloops = PV("2bmb:TomoScan:KloopsLoops")         # numero di loop interlacciati
-
-    N_theta = int(pv_N_theta.get() or 32)  # numero totale proiezioni 
-    Kloops = int(pv_Kloops.get() or 4)               # numero di loop interlacciati 
+def generate_timbir_interlaced_angles(pv_factory=None, timeout=1.0):
+    # lettura in parallelo con timeout, default 32 / 4 se i PV non rispondono
+    params = read_scan_parameters(pv_factory, timeout, SCAN_PARAMETERS_KLOOPS)
+    N_theta = params["N_theta"]  # numero totale proiezioni 
+    Kloops = params["K"]               # numero di loop interlacciati 
     # ----------------------------------------------------
     # BIT-REVERSAL
     # ----------------------------------------------------
@@ -50,9 +51,10 @@ def generate_timbir_interlaced_angles():
 
 #--------------------------------------------------------
 ''' se serve il passo angolare '''
-# differenze tra angoli consecutivi
-rotation_step_timbir = np.diff(angles_timbir)
-rotation_step = np.mod(diffs, 180.0)
+def timbir_rotation_step(angles_timbir):
+    # differenze tra angoli consecutivi
+    diffs = np.diff(angles_timbir)
+    return np.mod(diffs, 180.0)
 
 # ----------------------------------------------------
 # EPICS PVs Pulses
@@ -67,42 +69,24 @@ delta_encoder_counts =   pulse_timbir
 passo in gradi × counts_per_degree = passo in encoder counts
 '''
 
-   # Compute the actual delta to keep each interval an integer number of encoder counts
-encoder_multiply = float(self.epics_pvs['PSOCountsPerRotation'].get()) / 360.                 # pulse_per_deg  quanti impulsi corrispondono a un grado , cioè quanti encoder counts corrispondono a un grado di rotazione
-raw_delta_encoder_counts = self.rotation_step * encoder_multiply                              # quanti impulsi dovrebbe fare l’encoder per quel passo (rotation_step =rotation_step = passo angolare in gradi)
-delta_encoder_counts = round(raw_delta_encoder_counts)          #why        pulse_timbir                    # arrotonda all’impulso intero più vicino
-
-
-# che cosa si intende per rotation step perche arrotonda 
-# sara' una nuova routine o si andra' a riconnettee a questa
-# ----------------------------------------------------
-self.epics_pvs['PSOEncoderCountsPerStep'].put(delta_encoder_counts)  # ogni step di rotazione vale X counts 
-# Change the rotation step Python variable and PV
-self.rotation_step = delta_encoder_counts / encoder_multiply #trasformo counts in angolo reale per vedere a quanti gradi reali corrispondono nel reale 
-self.epics_pvs['RotationStep'].put(self.rotation_step)  # passo in gradi mandato ad episcs che viene utilizzato 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def update_rotation_step(self):
+    """Metodo di TomoScanPSO (usa self.epics_pvs): va chiamato dalla classe, non all'import."""
+    # Compute the actual delta to keep each interval an integer number of encoder counts
+    encoder_multiply = float(self.epics_pvs['PSOCountsPerRotation'].get()) / 360.                 # pulse_per_deg  quanti impulsi corrispondono a un grado , cioè quanti encoder counts corrispondono a un grado di rotazione
+    raw_delta_encoder_counts = self.rotation_step * encoder_multiply                              # quanti impulsi dovrebbe fare l’encoder per quel passo (rotation_step =rotation_step = passo angolare in gradi)
+    delta_encoder_counts = round(raw_delta_encoder_counts)          #why        pulse_timbir                    # arrotonda all’impulso intero più vicino
 
 
+    # che cosa si intende per rotation step perche arrotonda 
+    # sara' una nuova routine o si andra' a riconnettee a questa
+    # ----------------------------------------------------
+    self.epics_pvs['PSOEncoderCountsPerStep'].put(delta_encoder_counts)  # ogni step di rotazione vale X counts 
+    # Change the rotation step Python variable and PV
+    self.rotation_step = delta_encoder_counts / encoder_multiply #trasformo counts in angolo reale per vedere a quanti gradi reali corrispondono nel reale 
+    self.epics_pvs['RotationStep'].put(self.rotation_step)  # passo in gradi mandato ad episcs che viene utilizzato 
 
 
+if __name__ == "__main__":
+    angles_timbir, _, _ = generate_timbir_interlaced_angles()
+    print("Passo angolare TIMBIR (degrees):")
+    print(np.round(timbir_rotation_step(angles_timbir), 4))